@@ -46,9 +46,92 @@ UPLOAD_PATH = project_root / UPLOAD_DIR
 # Create upload directory if it doesn't exist
 os.makedirs(UPLOAD_PATH, exist_ok=True)
 
+# Directory for derived per-document artifacts (extracted text, indexes).
+# Artifacts are content-addressed by the SHA-256 of the PDF, so identical files share them.
+default_artifact_path = project_root / "backend" / "artifacts"
+ARTIFACT_PATH = Path(os.getenv("ARTIFACT_DIR", str(default_artifact_path))).resolve()
+os.makedirs(ARTIFACT_PATH, exist_ok=True)
+
 # Legacy OpenAI API key (kept for backward compatibility but no longer required)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "not-required-anymore")
 
+# In-memory cache of loaded document indexes and chunk lists (bytes, approximate)
+INDEX_CACHE_MAX_BYTES = int(os.getenv("INDEX_CACHE_MAX_MB", "128")) * 1024 * 1024
+
+# Worker pools for blocking work (see app/utils/executor.py).
+# IO_WORKERS threads run DB, model and HTTP calls off the event loop;
+# CPU_WORKERS processes run PDF parsing (0 runs it inline in the calling thread).
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Background ingestion worker threads (extraction, chunking, embedding, indexing)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+# Per-stage timeouts in seconds
+STAGE_TIMEOUTS = {
+    "upload": float(os.getenv("UPLOAD_TIMEOUT", "120")),
+    "extract": float(os.getenv("EXTRACT_TIMEOUT", "120")),
+    "ask": float(os.getenv("ASK_TIMEOUT", "120")),
+    "summarize": float(os.getenv("SUMMARIZE_TIMEOUT", "180")),
+    "ingest": float(os.getenv("INGEST_TIMEOUT", "600")),
+    "ask_batch": float(os.getenv("ASK_BATCH_TIMEOUT", "600")),
+    "search": float(os.getenv("SEARCH_TIMEOUT", "60")),
+    "default": float(os.getenv("DEFAULT_STAGE_TIMEOUT", "60")),
+}
+
+# Batch questions: maximum questions per request and concurrent LLM calls per batch
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+
+# Cross-document search: switch from exact to HNSW (approximate) search above this many chunks
+SEARCH_HNSW_MIN_VECTORS = int(os.getenv("SEARCH_HNSW_MIN_VECTORS", "20000"))
+
+# Answer cache: entries kept in memory and time-to-live in seconds (0 = answers never expire)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "0"))
+
+# Semantic question cache (embedding backend): cosine similarity above which a previously
+# answered question is reused for a new one (set SEMANTIC_CACHE_ENABLED=false to disable)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+# Embedding micro-batching (embedding backend): texts embedded by concurrent questions and
+# ingestion jobs are merged into batches of up to EMBEDDING_BATCH_MAX_SIZE texts, waiting at
+# most EMBEDDING_BATCH_MAX_WAIT_MS for more to arrive (set EMBEDDING_BATCH_MAX_SIZE=0 to disable)
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# Load the QA backend and its models in a background thread after startup
+# (otherwise they are loaded by the first request that needs them)
+QA_WARMUP = os.getenv("QA_WARMUP", "true").lower() == "true"
+
+# QA backends loaded alongside the default one, as a comma-separated list of
+# "light", "embedding" and "groq" (each request can pick one by tier)
+QA_BACKENDS = [name.strip() for name in os.getenv("QA_BACKENDS", "").split(",") if name.strip()]
+
+# Per-tier latency budgets (mean seconds per question) and the error rate a backend may
+# reach over the health window before requests fall back to a cheaper tier
+QA_LATENCY_BUDGETS = {
+    "fast": float(os.getenv("QA_FAST_LATENCY_BUDGET", "5")),
+    "balanced": float(os.getenv("QA_BALANCED_LATENCY_BUDGET", "60")),
+    "accurate": float(os.getenv("QA_ACCURATE_LATENCY_BUDGET", "30")),
+}
+QA_ERROR_BUDGET = float(os.getenv("QA_ERROR_BUDGET", "0.5"))
+QA_HEALTH_WINDOW = float(os.getenv("QA_HEALTH_WINDOW", "60"))
+QA_HEALTH_MIN_SAMPLES = int(os.getenv("QA_HEALTH_MIN_SAMPLES", "5"))
+
+# Groq HTTP client: concurrent requests, rate limit (Groq free tier: 30 requests per minute)
+# and retries of rate-limited or failed calls with jittered exponential backoff (seconds)
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.5"))
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "30"))
+
+# Context sent to Groq: estimated token budget and number of top BM25 chunks considered
+GROQ_CONTEXT_TOKENS = int(os.getenv("GROQ_CONTEXT_TOKENS", "1000"))
+GROQ_CONTEXT_TOP_K = int(os.getenv("GROQ_CONTEXT_TOP_K", "8"))
+
 # API configuration
 API_PREFIX = "/api"
 
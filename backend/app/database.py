@@ -3,7 +3,8 @@ Database connection and models for the PDF Quest API.
 This file defines the SQLAlchemy models and database connection.
 """
 import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text
+import json
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text, Float, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
@@ -26,13 +27,24 @@ class Document(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
-    file_path = Column(String(255), nullable=False)
+    file_path = Column(String(255), nullable=False, index=True)  # Shared by documents with the same content
     upload_time = Column(DateTime, default=datetime.datetime.utcnow)
     user_id = Column(String(255), nullable=True, index=True)  # Firebase user ID
     
     # Relationship with QAPair
     qa_pairs = relationship("QAPair", back_populates="document", cascade="all, delete-orphan")
 
+    # Relationship with the stored extracted text
+    text_record = relationship("DocumentText", back_populates="document", uselist=False, cascade="all, delete-orphan")
+
+    # Relationship with the background ingestion job
+    ingestion_job = relationship("IngestionJob", back_populates="document", uselist=False, cascade="all, delete-orphan")
+
+    @property
+    def status(self):
+        """Ingestion status; documents uploaded before background ingestion are processed lazily."""
+        return self.ingestion_job.status if self.ingestion_job else "ready"
+
     def to_dict(self):
         """Convert model instance to dictionary."""
         return {
@@ -41,6 +53,81 @@ class Document(Base):
             "file_path": self.file_path,
             "upload_time": self.upload_time.isoformat(),
             "user_id": self.user_id,
+            "status": self.status,
+        }
+
+
+class DocumentText(Base):
+    """
+    DocumentText model for tracking the stored extracted text of a document.
+    The text itself lives in a compressed, content-addressed artifact on disk;
+    this row records the file fingerprint used to detect stale artifacts.
+    """
+    __tablename__ = "document_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, unique=True, index=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the PDF
+    file_size = Column(Integer, nullable=False)
+    file_mtime = Column(Float, nullable=False)
+    char_count = Column(Integer, nullable=False, default=0)
+    extracted_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    # Relationship with Document
+    document = relationship("Document", back_populates="text_record")
+
+    def to_dict(self):
+        """Convert model instance to dictionary."""
+        return {
+            "id": self.id,
+            "document_id": self.document_id,
+            "content_hash": self.content_hash,
+            "file_size": self.file_size,
+            "char_count": self.char_count,
+            "extracted_at": self.extracted_at.isoformat(),
+        }
+
+
+class IngestionJob(Base):
+    """
+    IngestionJob model for tracking the background processing of an uploaded document
+    (text extraction, cleaning, chunking, embedding and indexing).
+    """
+    __tablename__ = "ingestion_jobs"
+
+    # Job statuses
+    QUEUED = "queued"
+    RUNNING = "running"
+    READY = "ready"
+    FAILED = "failed"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, unique=True, index=True)
+    status = Column(String(20), nullable=False, default=QUEUED, index=True)
+    stage = Column(String(50), nullable=True)  # Stage currently running
+    content_hash = Column(String(64), nullable=True)  # SHA-256 computed while streaming the upload
+    stage_timings = Column(Text, nullable=True)  # JSON object: stage name -> seconds
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # Refreshed by the worker while the job runs
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationship with Document
+    document = relationship("Document", back_populates="ingestion_job")
+
+    def to_dict(self):
+        """Convert model instance to dictionary."""
+        return {
+            "id": self.id,
+            "document_id": self.document_id,
+            "status": self.status,
+            "stage": self.stage,
+            "stage_timings": json.loads(self.stage_timings) if self.stage_timings else {},
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
         }
 
 
@@ -59,6 +146,12 @@ class QAPair(Base):
     # Relationship with Document
     document = relationship("Document", back_populates="qa_pairs")
 
+    # Answer cache entries pointing at this answer
+    cache_entries = relationship("AnswerCacheEntry", back_populates="qa_pair", cascade="all, delete-orphan")
+
+    # Embedding of the question, kept for the semantic cache
+    question_vector = relationship("QuestionVector", back_populates="qa_pair", uselist=False, cascade="all, delete-orphan")
+
     def to_dict(self):
         """Convert model instance to dictionary."""
         return {
@@ -70,6 +163,41 @@ class QAPair(Base):
         }
 
 
+class AnswerCacheEntry(Base):
+    """
+    AnswerCacheEntry model for the database tier of the answer cache.
+    Maps a cache key (normalized question, document content hash, backend and model)
+    to the QAPair holding the answer.
+    """
+    __tablename__ = "answer_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, index=True)  # SHA-256 of the key fields
+    qa_pair_id = Column(Integer, ForeignKey("qa_pairs.id"), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    backend = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)  # Expired entries are pruned by age
+
+    # Relationship with QAPair
+    qa_pair = relationship("QAPair", back_populates="cache_entries")
+
+
+class QuestionVector(Base):
+    """
+    QuestionVector model for the embeddings of answered questions.
+    Lets the semantic cache rebuild its question indexes without embedding the questions again.
+    """
+    __tablename__ = "question_vectors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    qa_pair_id = Column(Integer, ForeignKey("qa_pairs.id"), nullable=False, unique=True, index=True)
+    vector = Column(LargeBinary, nullable=False)  # Normalized float32 embedding
+
+    # Relationship with QAPair
+    qa_pair = relationship("QAPair", back_populates="question_vector")
+
+
 class UserProfile(Base):
     """
     UserProfile model for storing user profile information.
@@ -7,8 +7,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.routers import documents, qa, users
+from app.routers import documents, qa, users, search
 from app.database import create_tables
+from app.utils.executor import shutdown_executors
+from app.services.ingestion_service import resume_pending_jobs, shutdown_ingestion
+from app.services.qa_backends import start_background_warm_up, shutdown_backends
+from app.config import QA_WARMUP
 
 # Create the FastAPI application
 app = FastAPI(
@@ -43,12 +47,25 @@ app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
 app.include_router(documents.router)
 app.include_router(qa.router)
 app.include_router(users.router)
+app.include_router(search.router)
 
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
     """Create database tables on application startup if they don't exist."""
     create_tables()
+    # Pick up ingestion jobs interrupted by a restart
+    resume_pending_jobs()
+    # Load the QA backend and its models in the background, so startup is not delayed
+    if QA_WARMUP:
+        start_background_warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the worker pools used for blocking work."""
+    shutdown_ingestion()
+    shutdown_executors()
+    shutdown_backends()
 
 # Root endpoint
 @app.get("/")
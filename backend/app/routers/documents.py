@@ -6,9 +6,10 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, s
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
-from app.services import document_service
-from app.config import MAX_UPLOAD_SIZE
+from app.database import get_db, IngestionJob
+from app.services import document_service, ingestion_service
+from app.utils.upload_utils import FileTooLargeError
+from app.utils.executor import run_with_session, StageTimeoutError
 
 # Create router
 router = APIRouter(
@@ -17,18 +18,30 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def _save_upload(file, user_id, previous_id, db):
+    """Save an upload with the worker's session and return the document information."""
+    previous = document_service.get_document_by_id(previous_id, db) if previous_id is not None else None
+    return document_service.save_uploaded_file(file, db, user_id, previous).to_dict()
+
+
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_pdf(
     file: UploadFile = File(...),
     user_id: str = Form(None),
+    replaces: int = Form(None),
     db: Session = Depends(get_db)
 ):
     """
     Upload a PDF file.
     
+    Uploading a file with the same name as one of the user's documents (or
+    declaring the document it `replaces`) stores it as a new version of that
+    document: only the pages that changed are extracted and embedded again.
+    
     Args:
         file: The PDF file to upload
         user_id: The ID of the user uploading the file (optional)
+        replaces: ID of the document this file is a new version of (optional)
         db: Database session
         
     Returns:
@@ -44,27 +57,51 @@ async def upload_pdf(
             detail="Only PDF files are allowed"
         )
     
-    # Check file size
-    file_size = 0
-    file_content = await file.read()
-    file_size = len(file_content)
-    await file.seek(0)  # Reset file pointer
-    
-    if file_size > MAX_UPLOAD_SIZE:
+    try:
+        previous = document_service.find_previous_version(db, file.filename, user_id, replaces)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size exceeds the maximum allowed size of {MAX_UPLOAD_SIZE / (1024 * 1024)} MB"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except PermissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(e)
         )
     
     try:
-        # Save the file and create a document
-        document = document_service.save_uploaded_file(file, db, user_id)
+        # Save the file and create a document (the size limit is enforced while streaming)
+        document = await run_with_session(
+            _save_upload, file, user_id, previous.id if previous else None, stage="upload"
+        )
+        
+        # Start background ingestion (extraction, chunking, indexing), unless the
+        # same PDF was already processed for another document
+        if document["status"] == IngestionJob.QUEUED:
+            ingestion_service.enqueue_ingestion(document["id"])
         
         # Return document information
         return {
-            "message": "File uploaded successfully",
-            "document": document.to_dict()
+            "message": "New version uploaded successfully" if previous else "File uploaded successfully",
+            "replaced": previous is not None,
+            "document": document
         }
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except document_service.DocumentBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except StageTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -124,17 +161,48 @@ async def get_document(
     return document.to_dict()
 
 
-@router.delete("/{document_id}")
-async def delete_document(
+@router.get("/{document_id}/status")
+async def get_document_status(
     document_id: int,
     db: Session = Depends(get_db)
 ):
+    """
+    Get the ingestion status of a document.
+    
+    Args:
+        document_id: The ID of the document
+        db: Database session
+        
+    Returns:
+        dict: Job status, current stage and per-stage timings
+        
+    Raises:
+        HTTPException: If the document is not found
+    """
+    document = document_service.get_document_by_id(document_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document with ID {document_id} not found"
+        )
+    
+    job = ingestion_service.get_ingestion_job(document_id, db)
+    
+    if not job:
+        # Documents uploaded before background ingestion are processed on first question
+        return {"document_id": document_id, "status": document.status}
+    
+    return job.to_dict()
+
+
+@router.delete("/{document_id}")
+async def delete_document(document_id: int):
     """
     Delete a document.
     
     Args:
         document_id: The ID of the document to delete
-        db: Database session
         
     Returns:
         dict: Success message
@@ -142,7 +210,7 @@ async def delete_document(
     Raises:
         HTTPException: If the document is not found
     """
-    result = document_service.delete_document(document_id, db)
+    result = await run_with_session(document_service.delete_document, document_id)
     
     if not result:
         raise HTTPException(
@@ -2,28 +2,27 @@
 Question-answering router for the PDF Quest API.
 This file defines the endpoints for asking questions about documents and generating summaries.
 """
-import os
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 
 from app.database import get_db
-from app.services import document_service
+from app.services import document_service, ingestion_service, qa_backends
+from app.config import BATCH_MAX_QUESTIONS
+from app.services.index_cache import index_cache
+from app.services.answer_cache import answer_cache, answer_with_cache, answer_batch_with_cache, stream_with_cache
+from app.utils.executor import run_in_thread, run_with_session, StageTimeoutError
 
-# Use Groq AI if API key is available, otherwise use lightweight service
-USE_GROQ_AI = os.getenv("GROQ_API_KEY", "") != ""
-
-if USE_GROQ_AI:
-    from app.services import qa_service_groq as qa_service
+# Backends are registered in qa_backends and only imported on first use
+if qa_backends.QA_BACKEND == "groq":
     print("✅ Using Groq AI for question answering (accurate, fast)")
+elif qa_backends.QA_BACKEND == "light":
+    print("⚠️ Using lightweight keyword matching (limited accuracy)")
 else:
-    USE_LIGHT_MODE = os.getenv("USE_LIGHT_MODE", "false").lower() == "true"
-    if USE_LIGHT_MODE:
-        from app.services import qa_service_light as qa_service
-        print("⚠️ Using lightweight keyword matching (limited accuracy)")
-    else:
-        from app.services import qa_service
-        print("⚠️ Using basic QA service")
+    print("⚠️ Using basic QA service")
 
 # Create router
 router = APIRouter(
@@ -32,11 +31,35 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+async def _get_qa_service(stage: str):
+    """Get the QA backend module, importing it in a worker thread on first use."""
+    return await run_in_thread(qa_backends.get_qa_backend, stage=stage)
+
+
+def _with_backend(result: dict, backend_name: str):
+    """Record which backend (and tier) produced a result."""
+    result["backend"] = backend_name
+    result["tier"] = qa_backends.BACKEND_TIERS[backend_name]
+    return result
+
+
+# Cost/latency tier a request may ask for (None uses the configured backend)
+Tier = Optional[Literal["fast", "balanced", "accurate"]]
+
+
 # Define request models
 class QuestionRequest(BaseModel):
     """Request model for asking a question."""
     document_id: int
     question: str
+    tier: Tier = None
+
+
+class BatchQuestionRequest(BaseModel):
+    """Request model for asking several questions about one document."""
+    document_id: int
+    questions: List[str]
+    tier: Tier = None
 
 # Define endpoints
 @router.post("/ask")
@@ -67,26 +90,43 @@ async def ask_question(
                 detail=f"Document with ID {request.document_id} not found"
             )
         
-        # Get the answer using appropriate service
-        if USE_GROQ_AI:
-            result = qa_service.answer_question_with_ai(
-                document_id=request.document_id,
-                question=request.question,
-                db=db
-            )
-        else:
-            result = qa_service.simple_answer_question(
-                document_id=request.document_id,
-                question=request.question,
-                db=db
-            )
+        # Wait for background ingestion instead of duplicating its work
+        await ingestion_service.wait_for_ingestion(request.document_id, stage="ask")
+        
+        # Get the answer from the backend of the requested tier, falling back to cheaper
+        # tiers (in a worker thread, off the event loop), serving repeated questions from
+        # the answer cache
+        result, backend_name = await run_with_session(
+            lambda db: qa_backends.call_with_fallback(
+                request.tier,
+                lambda qa_service: answer_with_cache(
+                    qa_service,
+                    document_id=request.document_id,
+                    question=request.question,
+                    db=db
+                )
+            ),
+            stage="ask"
+        )
         
-        return result
+        return _with_backend(result, backend_name)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except StageTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except qa_backends.BackendUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -94,6 +134,166 @@ async def ask_question(
         )
 
 
+@router.post("/ask-batch")
+async def ask_questions_batch(
+    request: BatchQuestionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Ask many questions about a document in one request.
+    
+    The document is loaded once for the whole batch and all QA pairs are stored together.
+    
+    Args:
+        request: The batch question request
+        db: Database session
+        
+    Returns:
+        dict: The answers, in the same order as the questions
+        
+    Raises:
+        HTTPException: If the batch is invalid, the document is not found or if there's an error
+    """
+    if not request.questions or len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch must contain between 1 and {BATCH_MAX_QUESTIONS} questions"
+        )
+    
+    try:
+        # Check if the document exists
+        document = document_service.get_document_by_id(request.document_id, db)
+        
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Document with ID {request.document_id} not found"
+            )
+        
+        # Wait for background ingestion instead of duplicating its work
+        await ingestion_service.wait_for_ingestion(request.document_id, stage="ask_batch")
+        
+        results, backend_name = await run_with_session(
+            lambda db: qa_backends.call_with_fallback(
+                request.tier,
+                lambda qa_service: answer_batch_with_cache(
+                    qa_service,
+                    document_id=request.document_id,
+                    questions=request.questions,
+                    db=db
+                ),
+                count=len(request.questions)
+            ),
+            stage="ask_batch"
+        )
+        
+        return {
+            "document_id": request.document_id,
+            "document_name": document.filename,
+            "results": [_with_backend(result, backend_name) for result in results]
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except StageTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except qa_backends.BackendUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error answering questions: {str(e)}"
+        )
+
+
+def _format_sse(event: str, data: dict):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Ask a question about a document and stream the answer as server-sent events.
+    
+    Emits a "token" event ({"token": ...}) for each generated piece of the answer,
+    then a "done" event with the same payload as /qa/ask once the QA pair is stored.
+    Errors after the stream has started are reported as an "error" event.
+    
+    Args:
+        request: The question request
+        db: Database session
+        
+    Returns:
+        StreamingResponse: A text/event-stream response
+        
+    Raises:
+        HTTPException: If the document is not found or no backend can serve the tier
+    """
+    document = document_service.get_document_by_id(request.document_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document with ID {request.document_id} not found"
+        )
+    
+    try:
+        # Wait for background ingestion instead of duplicating its work
+        await ingestion_service.wait_for_ingestion(request.document_id, stage="ask")
+        # Load the candidate backends up front, so an unavailable tier is a plain HTTP error
+        await run_in_thread(qa_backends.get_candidates, request.tier, stage="ask")
+    except StageTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except qa_backends.BackendUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    
+    def event_stream():
+        # A sync generator: Starlette iterates it in a worker thread, off the event loop
+        try:
+            for backend_name, event, data in qa_backends.stream_with_fallback(
+                request.tier,
+                lambda qa_service: stream_with_cache(
+                    qa_service,
+                    document_id=request.document_id,
+                    question=request.question,
+                    db=db
+                )
+            ):
+                if event == "token":
+                    yield _format_sse("token", {"token": data})
+                else:
+                    yield _format_sse(event, _with_backend(data, backend_name))
+        except Exception as e:
+            print(f"Error streaming answer: {str(e)}")
+            yield _format_sse("error", {"detail": f"Error answering question: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/history/{document_id}")
 async def get_qa_history(
     document_id: int,
@@ -115,6 +315,8 @@ async def get_qa_history(
         HTTPException: If the document is not found or if there's an error
     """
     try:
+        qa_service = await _get_qa_service("default")
+        
         # Get the QA history
         history = qa_service.get_qa_history(
             document_id=document_id,
@@ -138,13 +340,20 @@ async def get_qa_history(
 @router.post("/summarize/{document_id}")
 async def summarize_document(
     document_id: int,
+    length: Literal["short", "medium", "long"] = "short",
+    style: Literal["paragraph", "bullets"] = "paragraph",
     db: Session = Depends(get_db)
 ):
     """
-    Generate a summary of a document (disabled in light mode).
+    Generate a summary of a document (only backends that provide summarize_document,
+    i.e. the embedding backend, by itself or as a fallback of the default tier).
+    
+    Summaries are stored, so repeat calls with the same options return immediately.
     
     Args:
         document_id: The ID of the document
+        length: Summary length
+        style: Summary style (prose or bullet points)
         db: Database session
         
     Returns:
@@ -153,12 +362,6 @@ async def summarize_document(
     Raises:
         HTTPException: If the document is not found or if there's an error
     """
-    if USE_LIGHT_MODE:
-        raise HTTPException(
-            status_code=status.HTTP_501_NOT_IMPLEMENTED,
-            detail="Document summarization is not available in lightweight mode. Upgrade to full version for this feature."
-        )
-    
     try:
         # Check if the document exists
         document = document_service.get_document_by_id(document_id, db)
@@ -169,24 +372,88 @@ async def summarize_document(
                 detail=f"Document with ID {document_id} not found"
             )
         
-        # Generate the summary
-        summary = qa_service.summarize_document(
-            document_id=document_id,
-            db=db
+        # Wait for background ingestion instead of duplicating its work
+        await ingestion_service.wait_for_ingestion(document_id, stage="summarize")
+        
+        # Generate the summary (in a worker thread, off the event loop)
+        summary, _ = await run_with_session(
+            lambda db: qa_backends.call_with_fallback(
+                None,
+                lambda qa_service: qa_service.summarize_document(
+                    document_id=document_id,
+                    db=db,
+                    length=length,
+                    style=style
+                ),
+                required="summarize_document"
+            ),
+            stage="summarize"
         )
         
         return {
             "document_id": document_id,
             "document_name": document.filename,
+            "length": length,
+            "style": style,
             "summary": summary
         }
+    except HTTPException:
+        raise
+    except qa_backends.BackendUnavailableError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=(
+                f"Document summarization is not available with the '{qa_backends.QA_BACKEND}' QA backend "
+                f"('{qa_backends.DEFAULT_TIER}' tier) or the backends it falls back to."
+            )
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except StageTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating summary: {str(e)}"
         )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get hit/miss counters for the in-memory index cache, the answer cache and
+    (embedding mode) the semantic question cache.
+    
+    Returns:
+        dict: Cache statistics
+    """
+    stats = {
+        "index_cache": index_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+    }
+    
+    # Only the embedding backend has a semantic question cache (reported once it is loaded)
+    semantic_cache = None
+    if qa_backends.is_loaded("embedding"):
+        semantic_cache = qa_backends.get_qa_backend("embedding").semantic_cache
+    if semantic_cache is not None:
+        stats["semantic_cache"] = semantic_cache.stats()
+    
+    return stats
+
+
+@router.get("/backend")
+async def get_backend_status():
+    """
+    Get the enabled QA backends with their tier, health and budgets, plus import and warm-up times.
+    
+    Returns:
+        dict: Backend status
+    """
+    return qa_backends.get_status()
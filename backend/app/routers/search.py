@@ -0,0 +1,74 @@
+"""
+Search router for the PDF Quest API.
+This file defines the endpoint for semantic search across all of a user's documents.
+"""
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.services import qa_backends
+from app.utils.executor import run_in_thread, run_with_session, StageTimeoutError
+
+# Search needs the embedding model, which is only loaded by the full QA service
+USE_EMBEDDINGS = "embedding" in qa_backends.ENABLED_BACKENDS
+
+# Imported on first use, as it loads the embedding model
+SEARCH_SERVICE_MODULE = "app.services.search_service"
+
+# Create router
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/")
+async def search_documents(
+    user_id: str,
+    query: str,
+    k: int = Query(5, ge=1, le=50)
+):
+    """
+    Search all of a user's documents for the passages most relevant to a query.
+    
+    Args:
+        user_id: The ID of the user whose documents are searched
+        query: The search query
+        k: Maximum number of results
+        
+    Returns:
+        dict: Ranked chunks with document IDs and page numbers
+        
+    Raises:
+        HTTPException: If search is unavailable in this mode or if there's an error
+    """
+    if not USE_EMBEDDINGS:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Semantic search is not available in lightweight mode. Upgrade to full version for this feature."
+        )
+    
+    try:
+        search_service = await run_in_thread(qa_backends.load_module, SEARCH_SERVICE_MODULE, stage="search")
+        results = await run_with_session(
+            search_service.search_documents,
+            user_id=user_id,
+            query=query,
+            k=k,
+            stage="search"
+        )
+        
+        return {
+            "user_id": user_id,
+            "query": query,
+            "results": results
+        }
+    except StageTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching documents: {str(e)}"
+        )
@@ -0,0 +1,310 @@
+"""
+Answer cache for the PDF Quest API.
+This file provides the cache placed in front of every QA backend. Answers are keyed on the
+normalized question, the document content hash, the backend and the model, and kept in two
+tiers: an in-memory LRU and a database tier pointing at the stored QAPair rows.
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+
+from app.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL
+from app.database import AnswerCacheEntry, QAPair
+from app.services.document_service import get_document_by_id, get_document_content_hash
+from app.services.qa_common import store_qa_pair, store_qa_pairs
+
+# Punctuation and whitespace that do not change the meaning of a question
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+# Minimum seconds between two deletions of expired answer_cache rows (per process)
+PRUNE_INTERVAL = 300
+
+
+def normalize_question(question: str):
+    """Normalize a question so trivially different phrasings share a cache key."""
+    question = unicodedata.normalize("NFKC", question).lower().strip()
+    question = _WHITESPACE.sub(" ", question)
+    return _TRAILING_PUNCTUATION.sub("", question)
+
+
+def make_cache_key(question: str, content_hash: str, backend: str, model: str):
+    """Build the cache key for a question about a document content."""
+    key = "\x1f".join([normalize_question(question), content_hash, backend, model])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Two-tier answer cache: an in-memory LRU in front of the answer_cache table.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # cache_key -> (answer, stored_at)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._last_pruned = 0.0
+
+    def _remember(self, cache_key, answer, stored_at):
+        with self._lock:
+            self._memory[cache_key] = (answer, stored_at)
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup_memory(self, cache_key):
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is None:
+                return None
+            answer, stored_at = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._memory[cache_key]
+                return None
+            self._memory.move_to_end(cache_key)
+            return answer
+
+    def lookup_many(self, cache_keys, db: Session):
+        """
+        Look up several keys, checking memory first and the database for the rest.
+
+        Returns:
+            dict: cache_key -> cached answer, for the keys that were found
+        """
+        found = {}
+        missing = []
+        for cache_key in cache_keys:
+            answer = self._lookup_memory(cache_key)
+            if answer is not None:
+                found[cache_key] = answer
+            else:
+                missing.append(cache_key)
+        memory_hits = len(found)
+
+        if missing:
+            query = db.query(AnswerCacheEntry.cache_key, QAPair.answer, AnswerCacheEntry.created_at).join(
+                QAPair, QAPair.id == AnswerCacheEntry.qa_pair_id
+            ).filter(AnswerCacheEntry.cache_key.in_(set(missing)))
+            if self.ttl_seconds:
+                query = query.filter(
+                    AnswerCacheEntry.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+                )
+            # Oldest first, so the most recent answer for a key wins
+            stored_at = {}
+            for cache_key, answer, created_at in query.order_by(AnswerCacheEntry.created_at).all():
+                found[cache_key] = answer
+                stored_at[cache_key] = created_at
+            for cache_key in missing:
+                if cache_key in found:
+                    # Keep the entry's age, so the memory tier expires it with the database tier
+                    # (created_at is a naive UTC datetime)
+                    self._remember(
+                        cache_key, found[cache_key], stored_at[cache_key].replace(tzinfo=timezone.utc).timestamp()
+                    )
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.db_hits += len(found) - memory_hits
+            self.misses += len(cache_keys) - len(found)
+        return found
+
+    def lookup(self, cache_key, db: Session):
+        """
+        Look up one key.
+
+        Returns:
+            str: The cached answer, or None on a miss
+        """
+        return self.lookup_many([cache_key], db).get(cache_key)
+
+    def store_many(self, entries, db: Session):
+        """
+        Cache answers that were just generated and stored as QA pairs.
+
+        Replaces the cached answers of the same keys, and every PRUNE_INTERVAL also
+        deletes the expired entries, so the table does not grow without bound.
+
+        Args:
+            entries (list): Tuples of (cache_key, result, content_hash, backend, model),
+                where result is the QA result dict holding "answer" and "qa_pair_id"
+            db (Session): Database session
+        """
+        if not entries:
+            return
+        now = time.time()
+
+        # One row per key: a new answer replaces the previous one (the last wins within a batch)
+        latest = {entry[0]: entry for entry in entries}
+        db.query(AnswerCacheEntry).filter(
+            AnswerCacheEntry.cache_key.in_(list(latest))
+        ).delete(synchronize_session=False)
+        db.add_all([
+            AnswerCacheEntry(
+                cache_key=cache_key,
+                qa_pair_id=result["qa_pair_id"],
+                content_hash=content_hash,
+                backend=backend,
+                model=model,
+            )
+            for cache_key, result, content_hash, backend, model in latest.values()
+        ])
+        if self.ttl_seconds and now - self._last_pruned >= PRUNE_INTERVAL:
+            self._last_pruned = now
+            db.query(AnswerCacheEntry).filter(
+                AnswerCacheEntry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            ).delete(synchronize_session=False)
+        db.commit()
+        for cache_key, result, _, _, _ in entries:
+            self._remember(cache_key, result["answer"], now)
+
+    def clear(self):
+        """Drop the in-memory tier."""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        """Get hit/miss counters."""
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+
+# Shared cache instance used in front of all QA backends
+answer_cache = AnswerCache(ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL)
+
+
+def _is_cacheable(qa_module, answer):
+    """Error and configuration messages returned as answers must not be cached."""
+    return bool(answer) and answer not in getattr(qa_module, "UNCACHEABLE_ANSWERS", ())
+
+
+def _prepare(document_id: int, db: Session):
+    """Look up a document and its content hash."""
+    document = get_document_by_id(document_id, db)
+    if not document:
+        raise ValueError(f"Document with ID {document_id} not found")
+    return document, get_document_content_hash(document, db)
+
+
+def answer_with_cache(qa_module, document_id: int, question: str, db: Session):
+    """
+    Answer a question, serving repeated questions from the answer cache.
+
+    A cache hit still records the question in the QA history.
+
+    Args:
+        qa_module: The QA backend module (see qa_backends)
+        document_id (int): The ID of the document
+        question (str): The question to answer
+        db (Session): Database session
+
+    Returns:
+        dict: The answer and related information, with "cached" set on hits
+    """
+    document, content_hash = _prepare(document_id, db)
+    cache_key = make_cache_key(question, content_hash, qa_module.BACKEND_NAME, qa_module.MODEL_NAME)
+
+    answer = answer_cache.lookup(cache_key, db)
+    if answer is not None:
+        result = store_qa_pair(document, question, answer, db)
+        result["cached"] = True
+        return result
+
+    result = qa_module.answer_question(document_id=document_id, question=question, db=db)
+    if _is_cacheable(qa_module, result["answer"]):
+        answer_cache.store_many(
+            [(cache_key, result, content_hash, qa_module.BACKEND_NAME, qa_module.MODEL_NAME)], db
+        )
+    result["cached"] = False
+    return result
+
+
+def answer_batch_with_cache(qa_module, document_id: int, questions: list, db: Session):
+    """
+    Answer many questions about one document, only sending cache misses to the backend.
+
+    Returns:
+        list: One result per question, in order, with "cached" set on hits
+    """
+    document, content_hash = _prepare(document_id, db)
+    cache_keys = [
+        make_cache_key(question, content_hash, qa_module.BACKEND_NAME, qa_module.MODEL_NAME)
+        for question in questions
+    ]
+    cached = answer_cache.lookup_many(cache_keys, db)
+
+    hit_positions = [i for i, cache_key in enumerate(cache_keys) if cache_key in cached]
+    miss_positions = [i for i, cache_key in enumerate(cache_keys) if cache_key not in cached]
+    results = [None] * len(questions)
+
+    if hit_positions:
+        hit_results = store_qa_pairs(
+            document,
+            [questions[i] for i in hit_positions],
+            [cached[cache_keys[i]] for i in hit_positions],
+            db
+        )
+        for i, result in zip(hit_positions, hit_results):
+            result["cached"] = True
+            results[i] = result
+
+    if miss_positions:
+        miss_results = qa_module.answer_questions_batch(
+            document_id=document_id,
+            questions=[questions[i] for i in miss_positions],
+            db=db
+        )
+        entries = []
+        for i, result in zip(miss_positions, miss_results):
+            result["cached"] = False
+            results[i] = result
+            if _is_cacheable(qa_module, result["answer"]):
+                entries.append((cache_keys[i], result, content_hash, qa_module.BACKEND_NAME, qa_module.MODEL_NAME))
+        answer_cache.store_many(entries, db)
+
+    return results
+
+
+def stream_with_cache(qa_module, document_id: int, question: str, db: Session):
+    """
+    Streaming variant of answer_with_cache: a hit is sent as a single token.
+
+    Yields:
+        tuple: ("token", text) events, then ("done", result)
+    """
+    document, content_hash = _prepare(document_id, db)
+    cache_key = make_cache_key(question, content_hash, qa_module.BACKEND_NAME, qa_module.MODEL_NAME)
+
+    answer = answer_cache.lookup(cache_key, db)
+    if answer is not None:
+        result = store_qa_pair(document, question, answer, db)
+        result["cached"] = True
+        yield ("token", answer)
+        yield ("done", result)
+        return
+
+    for event, data in qa_module.stream_answer_question(document_id=document_id, question=question, db=db):
+        if event == "done":
+            if _is_cacheable(qa_module, data["answer"]):
+                answer_cache.store_many(
+                    [(cache_key, data, content_hash, qa_module.BACKEND_NAME, qa_module.MODEL_NAME)], db
+                )
+            data["cached"] = False
+        yield (event, data)
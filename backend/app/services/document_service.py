@@ -2,38 +2,132 @@
 Document service for the PDF Quest API.
 This file provides functions for processing and storing PDF documents.
 """
+import json
 import os
+import threading
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import Session
 
-from app.database import Document
-from app.utils.pdf_utils import extract_text_from_pdf, get_pdf_metadata
-from app.config import UPLOAD_DIR
+from app.database import Document, DocumentText, IngestionJob
+from app.services.index_cache import index_cache
+from app.utils.pdf_utils import (
+    compute_page_hashes,
+    extract_pages_with_hashes,
+    extract_text_with_offsets,
+    get_pdf_metadata,
+    join_pages,
+    split_pages,
+)
+from app.utils.artifact_store import (
+    compute_file_hash,
+    read_text_artifact,
+    open_text_artifact,
+    write_text_artifact,
+    read_page_offsets,
+    write_page_offsets,
+    read_page_hashes,
+    write_page_hashes,
+    write_revision_info,
+    has_text_artifact,
+    delete_artifacts,
+)
+from app.utils.upload_utils import save_stream_atomically
+from app.config import UPLOAD_DIR, MAX_UPLOAD_SIZE
 
-def save_uploaded_file(file, db: Session, user_id: str = None):
+
+# Uploaded PDFs are stored once per content, named by their SHA-256
+BLOB_EXTENSION = ".pdf"
+
+# Blobs stored for uploads whose document is not committed yet (path -> count). The lock
+# also serializes deleting unreferenced blobs, so a delete cannot remove a blob that a
+# concurrent upload of the same PDF has just found and is about to reference
+_blob_lock = threading.Lock()
+_pending_blobs = {}
+
+
+class DocumentBusyError(Exception):
+    """Raised when a document cannot be replaced because it is still being processed."""
+
+
+def find_previous_version(db: Session, filename: str, user_id: str = None, replaces: int = None):
+    """
+    Find the document an upload is a new version of.
+    
+    An explicit `replaces` ID wins; otherwise the user's most recent document
+    with the same filename is used. Anonymous uploads are only matched by ID.
+    
+    Args:
+        db: Database session
+        filename: Name of the uploaded file
+        user_id: The ID of the user uploading the file (optional)
+        replaces: ID of the document the upload replaces (optional)
+        
+    Returns:
+        Document: The previous version, or None for a new document
+        
+    Raises:
+        ValueError: If the `replaces` document is not found
+        PermissionError: If the `replaces` document belongs to another user
+    """
+    if replaces is not None:
+        document = get_document_by_id(replaces, db)
+        if not document:
+            raise ValueError(f"Document with ID {replaces} not found")
+        if document.user_id != user_id:
+            raise PermissionError(f"Document with ID {replaces} belongs to another user")
+        return document
+    
+    if not user_id:
+        return None
+    
+    return db.query(Document).filter(
+        Document.user_id == user_id,
+        Document.filename == filename
+    ).order_by(Document.upload_time.desc()).first()
+
+
+def save_uploaded_file(file, db: Session, user_id: str = None, previous: Document = None):
     """
     Save an uploaded PDF file and store its metadata in the database.
     
+    A new version of an existing document replaces that document's file; its
+    ingestion then only re-processes the pages that changed.
+    
     Args:
         file: The uploaded file object
         db: Database session
         user_id: The ID of the user uploading the file (optional)
+        previous: The document the upload is a new version of (see find_previous_version)
         
     Returns:
-        Document: The created document object
+        Document: The created (or updated) document object
+        
+    Raises:
+        FileTooLargeError: If the file exceeds MAX_UPLOAD_SIZE
+        DocumentBusyError: If the previous version is still being processed
     """
-    # Create a unique filename to prevent collisions
-    original_filename = file.filename
-    file_extension = os.path.splitext(original_filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    if previous is not None and previous.status in (IngestionJob.QUEUED, IngestionJob.RUNNING):
+        raise DocumentBusyError(
+            f"Document with ID {previous.id} is still being processed, please try again shortly"
+        )
     
-    # Create the file path
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    original_filename = file.filename
+    file_path, content_hash = _store_upload(file.file)
+    try:
+        return _create_or_replace_document(file_path, content_hash, original_filename, user_id, previous, db)
+    finally:
+        _finish_pending_blob(file_path)
+
+
+def _create_or_replace_document(file_path: str, content_hash: str, original_filename: str, user_id: str,
+                                previous: Document, db: Session):
+    """Create the document of a stored upload, or point its previous version at it."""
+    # A PDF that was already processed for another document needs no ingestion at all
+    ingested = _find_ingested_text(content_hash, db)
     
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(file.file.read())
+    if previous is not None:
+        return _replace_document_file(previous, original_filename, file_path, content_hash, ingested, db)
     
     # Create a new document in the database
     db_document = Document(
@@ -43,6 +137,12 @@ def save_uploaded_file(file, db: Session, user_id: str = None):
         user_id=user_id
     )
     
+    # Queue the expensive processing (extraction, chunking, indexing) for the
+    # background ingestion pipeline instead of doing it on the request path
+    db_document.ingestion_job = IngestionJob(status=IngestionJob.QUEUED, content_hash=content_hash)
+    if ingested is not None:
+        _reuse_ingested_text(db_document, ingested)
+    
     # Add and commit to the database
     db.add(db_document)
     db.commit()
@@ -51,6 +151,124 @@ def save_uploaded_file(file, db: Session, user_id: str = None):
     return db_document
 
 
+def get_blob_path(content_hash: str):
+    """Get the path where the uploaded PDF with a content hash is stored."""
+    # Shard by the first two characters to keep directories small
+    return os.path.join(UPLOAD_DIR, content_hash[:2], f"{content_hash}{BLOB_EXTENSION}")
+
+
+def _store_upload(source):
+    """
+    Stream an upload into the content-addressed file store.
+    
+    The blob is marked pending until the caller has committed the document that
+    references it (see _finish_pending_blob), so release_file leaves it alone.
+    
+    Returns:
+        tuple: (file path, SHA-256 content hash); identical uploads share one file
+    
+    Raises:
+        FileTooLargeError: If the file exceeds MAX_UPLOAD_SIZE
+    """
+    # Stream the file to disk in fixed-size chunks, checking the size limit as we go
+    incoming_path = os.path.join(UPLOAD_DIR, f".incoming-{uuid.uuid4()}{BLOB_EXTENSION}")
+    _, content_hash = save_stream_atomically(source, incoming_path, MAX_UPLOAD_SIZE)
+    
+    file_path = get_blob_path(content_hash)
+    with _blob_lock:
+        if os.path.exists(file_path):
+            # Keep the stored copy untouched: its modification time is part of the text fingerprints
+            os.remove(incoming_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(incoming_path, file_path)
+        _pending_blobs[file_path] = _pending_blobs.get(file_path, 0) + 1
+    
+    return file_path, content_hash
+
+
+def _finish_pending_blob(file_path: str):
+    """Stop protecting a stored blob once its upload is committed (or failed)."""
+    with _blob_lock:
+        if _pending_blobs[file_path] > 1:
+            _pending_blobs[file_path] -= 1
+        else:
+            del _pending_blobs[file_path]
+
+
+def _find_ingested_text(content_hash: str, db: Session):
+    """Find the text record of a fully ingested document with the given content, if any."""
+    records = db.query(DocumentText).filter(DocumentText.content_hash == content_hash).all()
+    for record in records:
+        if record.document.status == IngestionJob.READY and has_text_artifact(content_hash):
+            return record
+    return None
+
+
+def _reuse_ingested_text(document: Document, ingested: DocumentText):
+    """Mark a document as ingested, sharing the artifacts of another document with the same content."""
+    stat = os.stat(document.file_path)
+    record = document.text_record
+    if record is None:
+        record = DocumentText(document=document)
+    record.content_hash = ingested.content_hash
+    record.file_size = stat.st_size
+    record.file_mtime = stat.st_mtime
+    record.char_count = ingested.char_count
+    record.extracted_at = ingested.extracted_at
+    
+    job = document.ingestion_job
+    job.status = IngestionJob.READY
+    job.stage_timings = json.dumps({})
+    job.finished_at = datetime.utcnow()
+
+
+def _replace_document_file(
+    document: Document,
+    filename: str,
+    file_path: str,
+    content_hash: str,
+    ingested: DocumentText,
+    db: Session
+):
+    """Point a document at the file of its new version and queue its ingestion again."""
+    old_file_path = document.file_path
+    old_content_hash = document.text_record.content_hash if document.text_record else None
+    
+    document.filename = filename
+    document.file_path = file_path
+    document.upload_time = datetime.utcnow()
+    
+    # The text record keeps the previous content hash until extraction, which
+    # uses it to find the pages that did not change
+    job = document.ingestion_job
+    if job is None:
+        job = IngestionJob(document=document)
+        db.add(job)
+    job.status = IngestionJob.QUEUED
+    job.content_hash = content_hash
+    job.stage = None
+    job.stage_timings = None
+    job.error = None
+    job.created_at = datetime.utcnow()
+    job.started_at = None
+    job.finished_at = None
+    if ingested is not None:
+        _reuse_ingested_text(document, ingested)
+    
+    db.commit()
+    db.refresh(document)
+    
+    index_cache.invalidate_document(document.id)
+    if old_file_path != file_path:
+        release_file(old_file_path, db)
+    if ingested is not None and old_content_hash and old_content_hash != content_hash:
+        # No ingestion will run to release the previous version's artifacts
+        release_artifacts(old_content_hash, db)
+    
+    return document
+
+
 def get_document_by_id(document_id: int, db: Session):
     """
     Get a document by its ID.
@@ -104,17 +322,59 @@ def delete_document(document_id: int, db: Session):
     if not document:
         return False
     
-    # Delete the file if it exists
-    if os.path.exists(document.file_path):
-        os.remove(document.file_path)
+    content_hash = document.text_record.content_hash if document.text_record else None
+    file_path = document.file_path
     
     # Delete the document from the database
     db.delete(document)
     db.commit()
     
+    # Drop any loaded indexes or chunk lists for the document
+    index_cache.invalidate_document(document_id)
+    
+    # The file and artifacts are shared by documents with the same content:
+    # they are only removed with the last document referencing them
+    release_file(file_path, db)
+    if content_hash:
+        release_artifacts(content_hash, db)
+    
     return True
 
 
+def release_file(file_path: str, db: Session):
+    """
+    Delete an uploaded PDF once no document uses it.
+    
+    Blobs of uploads still being saved count as used, as their documents are not
+    committed yet.
+    
+    Args:
+        file_path: Path of the stored PDF
+        db: Database session
+    """
+    with _blob_lock:
+        if file_path in _pending_blobs:
+            return
+        still_referenced = db.query(Document).filter(Document.file_path == file_path).first()
+        if not still_referenced and os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def release_artifacts(content_hash: str, db: Session):
+    """
+    Delete the artifacts of a content hash once no document uses them.
+    
+    Artifacts are content-addressed, so they are shared by every document with the same PDF.
+    
+    Args:
+        content_hash: SHA-256 hex digest of the PDF
+        db: Database session
+    """
+    still_referenced = db.query(DocumentText).filter(DocumentText.content_hash == content_hash).first()
+    if not still_referenced:
+        delete_artifacts(content_hash)
+
+
 def get_document_text(document_id: int, db: Session):
     """
     Get the text content of a document.
@@ -135,7 +395,185 @@ def get_document_text(document_id: int, db: Session):
     if not document:
         raise ValueError(f"Document with ID {document_id} not found")
     
-    # Extract text from the PDF
-    text = extract_text_from_pdf(document.file_path)
+    return load_document_text(document, db)
+
+
+def _is_text_record_fresh(document: Document):
+    """Check whether the stored text fingerprint still matches the PDF on disk."""
+    record = document.text_record
+    if record is None:
+        return False
+    stat = os.stat(document.file_path)
+    return record.file_size == stat.st_size and record.file_mtime == stat.st_mtime
+
+
+def get_document_content_hash(document: Document, db: Session):
+    """
+    Get the SHA-256 content hash of a document's PDF.
+    
+    Uses the stored fingerprint when the file is unchanged, so the PDF is
+    neither re-hashed nor re-parsed on the common path.
+    
+    Args:
+        document: The document object
+        db: Database session
+        
+    Returns:
+        str: Hex digest identifying the document content
+    """
+    if not _is_text_record_fresh(document):
+        load_document_text(document, db)
+    return document.text_record.content_hash
+
+
+def _load_pages_by_hash(content_hash):
+    """
+    Load the stored pages of a document, keyed by page hash.
+    
+    Returns:
+        dict: page hash -> page text, or None if the pages were not recorded
+    """
+    page_hashes = read_page_hashes(content_hash)
+    page_offsets = read_page_offsets(content_hash)
+    text = read_text_artifact(content_hash)
+    if page_hashes is None or page_offsets is None or text is None or len(page_hashes) != len(page_offsets):
+        return None
+    return dict(zip(page_hashes, split_pages(text, page_offsets)))
+
+
+def _extract_pages(file_path, base_content_hash=None):
+    """
+    Extract the pages of a PDF, reusing the unchanged pages of a previous version.
+    
+    Pages are matched by hash rather than position, so inserted or removed
+    pages do not cause the following pages to be extracted again.
+    
+    Args:
+        file_path (str): Path to the PDF file
+        base_content_hash (str): Content hash of the previous version (optional)
+        
+    Returns:
+        tuple: (pages, changed_pages) where pages is a list of (text, page hash)
+        and changed_pages lists the extracted pages (None if all were extracted)
+    """
+    base_pages = _load_pages_by_hash(base_content_hash) if base_content_hash else None
+    if not base_pages:
+        return extract_pages_with_hashes(file_path), None
+    
+    page_hashes = compute_page_hashes(file_path)
+    changed_pages = [page_num for page_num, page_hash in enumerate(page_hashes) if page_hash not in base_pages]
+    extracted = dict(zip(changed_pages, extract_pages_with_hashes(file_path, changed_pages) if changed_pages else []))
+    
+    pages = [
+        extracted[page_num] if page_num in extracted else (base_pages[page_hash], page_hash)
+        for page_num, page_hash in enumerate(page_hashes)
+    ]
+    return pages, changed_pages
+
+
+def load_document_text(document: Document, db: Session, content_hash: str = None):
+    """
+    Load the text of a document from its stored artifact, extracting it if needed.
+    
+    The artifact is reused as long as the PDF's size and modification time match
+    the recorded fingerprint. If they differ, the file is re-hashed and only
+    re-extracted when its content actually changed.
+    
+    Args:
+        document: The document object
+        db: Database session
+        content_hash: SHA-256 of the file if already known (e.g. computed during upload)
+        
+    Returns:
+        str: The text content of the document
+    
+    Raises:
+        FileNotFoundError: If the PDF file does not exist
+    """
+    record = document.text_record
+    
+    # Fast path: the file is unchanged since the text was stored
+    if _is_text_record_fresh(document):
+        text = read_text_artifact(record.content_hash)
+        if text is not None:
+            return text
+    
+    # The fingerprint changed (or no artifact yet): identify the content by its hash
+    stat = os.stat(document.file_path)
+    if content_hash is None:
+        content_hash = compute_file_hash(document.file_path)
+    text = read_text_artifact(content_hash)
+    
+    if text is None:
+        # A new version of the document: only the pages that changed are parsed again
+        base_content_hash = record.content_hash if record is not None and record.content_hash != content_hash else None
+        
+        # Pages are parsed in the worker process pool; offsets are kept for page citations
+        pages, changed_pages = _extract_pages(document.file_path, base_content_hash)
+        text, page_offsets = join_pages([page_text for page_text, _ in pages])
+        write_page_offsets(content_hash, page_offsets)
+        write_page_hashes(content_hash, [page_hash for _, page_hash in pages])
+        if base_content_hash:
+            write_revision_info(content_hash, base_content_hash, changed_pages)
+        write_text_artifact(content_hash, text)
+    
+    # Record the fingerprint for the next call
+    if record is None:
+        record = DocumentText(document=document)
+        db.add(record)
+    record.content_hash = content_hash
+    record.file_size = stat.st_size
+    record.file_mtime = stat.st_mtime
+    record.char_count = len(text)
+    record.extracted_at = datetime.utcnow()
+    db.commit()
     
     return text
+
+
+def open_document_text(document: Document, db: Session):
+    """
+    Memory-map the stored text of a document, extracting it first if needed.
+    
+    Only the slices read from the returned buffer are decoded, so answering a
+    question does not load the whole document.
+    
+    Args:
+        document: The document object
+        db: Database session
+        
+    Returns:
+        TextBuffer: The document text, sliced with byte offsets
+    
+    Raises:
+        FileNotFoundError: If the PDF file does not exist
+    """
+    content_hash = get_document_content_hash(document, db)
+    buffer = open_text_artifact(content_hash)
+    if buffer is None:
+        # The artifact was removed: extract the text again
+        load_document_text(document, db, content_hash)
+        buffer = open_text_artifact(content_hash)
+    return buffer
+
+
+def get_document_page_offsets(document: Document, db: Session):
+    """
+    Get the character offset where each page starts in a document's text.
+    
+    Args:
+        document: The document object
+        db: Database session
+        
+    Returns:
+        list: Start offset of each page (use pdf_utils.page_number_for_offset to map offsets to pages)
+    """
+    content_hash = get_document_content_hash(document, db)
+    page_offsets = read_page_offsets(content_hash)
+    
+    if page_offsets is None:
+        # Text stored before page offsets were recorded: extract them once
+        _, page_offsets = extract_text_with_offsets(document.file_path)
+        write_page_offsets(content_hash, page_offsets)
+    
+    return page_offsets
@@ -0,0 +1,153 @@
+"""
+In-memory index cache for the PDF Quest API.
+This file provides a size-bounded LRU cache for loaded per-document objects
+(FAISS stores, TF-IDF matrices, cleaned chunk lists) shared by the QA services.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from app.config import INDEX_CACHE_MAX_BYTES
+
+
+class IndexCache:
+    """
+    Thread-safe LRU cache with an approximate byte budget.
+
+    Entries are keyed by (kind, document_id, content_hash) so a changed document
+    never serves a stale entry, and all entries of a document can be dropped at once.
+    Concurrent misses on the same key run the loader once (see get_or_load).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size_bytes)
+        self._loading = {}  # key -> Future of the value being loaded
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, kind, document_id, content_hash):
+        """
+        Get a cached value and mark it as most recently used.
+
+        Returns:
+            The cached value, or None if it is not cached
+        """
+        key = (kind, document_id, content_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, kind, document_id, content_hash, value, size_bytes):
+        """
+        Cache a value, evicting least recently used entries to stay within budget.
+
+        Values larger than the whole budget are not cached.
+        """
+        if size_bytes > self.max_bytes:
+            return
+        key = (kind, document_id, content_hash)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size_bytes)
+            self.current_bytes += size_bytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, kind, document_id, content_hash, loader, sizer):
+        """
+        Get a cached value, loading and caching it on a miss.
+
+        Only one caller runs the loader for a key; callers missing the same key
+        meanwhile wait for its result (or its exception).
+
+        Args:
+            kind (str): Type of cached object (e.g. "faiss", "chunks")
+            document_id (int): The ID of the document
+            content_hash (str): Content hash of the document
+            loader: Callable returning the value to cache
+            sizer: Callable estimating the size of the value in bytes
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        key = (kind, document_id, content_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            future = self._loading.get(key)
+            if future is None:
+                future = self._loading[key] = Future()
+                loading = True
+                self.misses += 1
+            else:
+                # Served by the load already in progress
+                loading = False
+                self.hits += 1
+
+        if not loading:
+            return future.result()
+
+        try:
+            value = loader()
+            self.put(kind, document_id, content_hash, value, sizer(value))
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def invalidate_document(self, document_id):
+        """Drop every cached entry belonging to a document."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == document_id]:
+                _, size = self._entries.pop(key)
+                self.current_bytes -= size
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Get cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def estimate_strings_size(strings):
+    """Estimate the memory used by a list of strings in bytes."""
+    return sys.getsizeof(strings) + sum(sys.getsizeof(s) for s in strings)
+
+
+# Shared cache instance used by all QA services
+index_cache = IndexCache(INDEX_CACHE_MAX_BYTES)
@@ -0,0 +1,270 @@
+"""
+Ingestion service for the PDF Quest API.
+This file runs the background pipeline that prepares uploaded documents for questions:
+text extraction first, then every stage registered by the QA services (cleaning,
+chunking, embedding, indexing). Progress is tracked in the ingestion_jobs table.
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import INGEST_WORKERS
+from app.database import SessionLocal, IngestionJob
+from app.services.document_service import get_document_by_id, load_document_text, release_artifacts
+from app.services.qa_backends import load_enabled_backends
+from app.utils.artifact_store import read_revision_info
+from app.utils.executor import get_stage_timeout, StageTimeoutError
+
+# Stages run after text extraction, in registration order: list of (name, function)
+_stages = []
+
+# Worker queue for ingestion jobs
+_ingest_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="pdfquest-ingest")
+
+# Jobs queued or running in this process: document_id -> Future
+_inflight = {}
+_inflight_lock = threading.RLock()
+
+# How often to check the database for jobs running in another worker process
+POLL_INTERVAL = 0.5
+
+# How often a running job records that its worker is alive, and how long without a
+# heartbeat before the job is considered interrupted (its worker stopped or crashed)
+HEARTBEAT_INTERVAL = 10
+HEARTBEAT_TIMEOUT = 60
+
+
+def register_ingest_stage(name, stage):
+    """
+    Register a pipeline stage to run on every uploaded document.
+
+    Args:
+        name (str): Stage name used for status and timings
+        stage: Callable taking (document, document_text, content_hash)
+    """
+    if all(existing_name != name for existing_name, _ in _stages):
+        _stages.append((name, stage))
+
+
+def enqueue_ingestion(document_id: int):
+    """
+    Queue a document's ingestion job on the background worker.
+
+    Args:
+        document_id: The ID of the document
+
+    Returns:
+        Future: Resolves when the job has finished (successfully or not)
+    """
+    with _inflight_lock:
+        future = _inflight.get(document_id)
+        if future is None:
+            future = _ingest_pool.submit(run_ingestion, document_id)
+            _inflight[document_id] = future
+            future.add_done_callback(lambda _: _forget(document_id))
+        return future
+
+
+def _forget(document_id):
+    with _inflight_lock:
+        _inflight.pop(document_id, None)
+
+
+def _claim_job(document_id: int, db: Session):
+    """Atomically move a queued job to running, so only one worker processes it."""
+    now = datetime.utcnow()
+    claimed = db.query(IngestionJob).filter(
+        IngestionJob.document_id == document_id,
+        IngestionJob.status == IngestionJob.QUEUED
+    ).update(
+        {"status": IngestionJob.RUNNING, "started_at": now, "heartbeat_at": now},
+        synchronize_session=False
+    )
+    db.commit()
+    if not claimed:
+        return None
+    return db.query(IngestionJob).filter(IngestionJob.document_id == document_id).first()
+
+
+def _send_heartbeats(document_id: int, stop: threading.Event):
+    """Refresh a running job's heartbeat until `stop` is set."""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        db = SessionLocal()
+        try:
+            db.query(IngestionJob).filter(
+                IngestionJob.document_id == document_id,
+                IngestionJob.status == IngestionJob.RUNNING
+            ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"Error recording ingestion heartbeat for document {document_id}: {str(e)}")
+        finally:
+            db.close()
+
+
+def run_ingestion(document_id: int):
+    """
+    Run every ingestion stage for a document, recording progress and timings.
+
+    Runs on the ingestion worker with its own database session.
+
+    Args:
+        document_id: The ID of the document
+    """
+    db = SessionLocal()
+    try:
+        job = _claim_job(document_id, db)
+        if job is None:
+            # Already processed, or being processed by another worker
+            return
+
+        stop_heartbeats = threading.Event()
+        threading.Thread(
+            target=_send_heartbeats, args=(document_id, stop_heartbeats),
+            name=f"pdfquest-ingest-heartbeat-{document_id}", daemon=True
+        ).start()
+
+        timings = {}
+        try:
+            document = get_document_by_id(document_id, db)
+            if not document:
+                raise ValueError(f"Document with ID {document_id} not found")
+
+            def run_stage(name, func):
+                job.stage = name
+                db.commit()
+                start = time.perf_counter()
+                result = func()
+                timings[name] = round(time.perf_counter() - start, 4)
+                job.stage_timings = json.dumps(timings)
+                db.commit()
+                return result
+
+            text = run_stage("extract", lambda: load_document_text(document, db, content_hash=job.content_hash))
+            content_hash = document.text_record.content_hash
+
+            # QA backends register their stages when they are first imported
+            load_enabled_backends()
+
+            for name, stage in _stages:
+                run_stage(name, lambda: stage(document, text, content_hash))
+
+            # A new version of a document no longer needs the previous version's artifacts
+            revision = read_revision_info(content_hash)
+            if revision:
+                release_artifacts(revision["base_content_hash"], db)
+
+            job.status = IngestionJob.READY
+            job.stage = None
+        except Exception as e:
+            print(f"Ingestion failed for document {document_id}: {str(e)}")
+            db.rollback()
+            job.status = IngestionJob.FAILED
+            job.error = str(e)
+        finally:
+            stop_heartbeats.set()
+
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        # The job row itself could not be updated (e.g. the document was deleted meanwhile)
+        print(f"Error running ingestion for document {document_id}: {str(e)}")
+    finally:
+        db.close()
+
+
+def get_ingestion_job(document_id: int, db: Session):
+    """
+    Get the ingestion job of a document.
+
+    Args:
+        document_id: The ID of the document
+        db: Database session
+
+    Returns:
+        IngestionJob: The job, or None if the document has none
+    """
+    return db.query(IngestionJob).filter(IngestionJob.document_id == document_id).first()
+
+
+def _get_job_status(document_id: int):
+    db = SessionLocal()
+    try:
+        job = get_ingestion_job(document_id, db)
+        return job.status if job else None
+    finally:
+        db.close()
+
+
+async def wait_for_ingestion(document_id: int, stage: str = "ingest"):
+    """
+    Wait until a document's ingestion job is no longer queued or running.
+
+    Questions use this so they reuse the job's work instead of duplicating it.
+    A failed job is not an error here: callers fall back to lazy processing.
+
+    Args:
+        document_id: The ID of the document
+        stage: Stage name used to pick the timeout
+
+    Raises:
+        StageTimeoutError: If the job does not finish within the timeout
+    """
+    timeout = get_stage_timeout(stage)
+
+    with _inflight_lock:
+        future = _inflight.get(document_id)
+
+    if future is not None:
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(f"Document {document_id} is still being processed, please try again shortly")
+        return
+
+    # The job may be running in another worker process: poll its status
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        status = await loop.run_in_executor(None, _get_job_status, document_id)
+        if status not in (IngestionJob.QUEUED, IngestionJob.RUNNING):
+            return
+        if loop.time() >= deadline:
+            raise StageTimeoutError(f"Document {document_id} is still being processed, please try again shortly")
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def resume_pending_jobs():
+    """
+    Re-queue jobs left unfinished by a previous run (called on application startup).
+
+    Every worker process calls this, so running jobs are only re-queued once their
+    heartbeat has stopped, and each queued job is still claimed by exactly one worker.
+    """
+    db = SessionLocal()
+    try:
+        # Jobs whose worker stopped or crashed go back to the queue; jobs still
+        # heartbeating belong to another live worker
+        stale = datetime.utcnow() - timedelta(seconds=HEARTBEAT_TIMEOUT)
+        db.query(IngestionJob).filter(
+            IngestionJob.status == IngestionJob.RUNNING,
+            or_(IngestionJob.heartbeat_at.is_(None), IngestionJob.heartbeat_at < stale)
+        ).update({"status": IngestionJob.QUEUED}, synchronize_session=False)
+        db.commit()
+
+        pending = db.query(IngestionJob.document_id).filter(IngestionJob.status == IngestionJob.QUEUED).all()
+    finally:
+        db.close()
+
+    for (document_id,) in pending:
+        enqueue_ingestion(document_id)
+
+
+def shutdown_ingestion():
+    """Stop accepting ingestion jobs (called on application shutdown)."""
+    _ingest_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,428 @@
+"""
+QA backend registry for the PDF Quest API.
+This file registers the question-answering backends and imports them on first use, so
+heavy libraries (langchain, sentence-transformers, scikit-learn) are not loaded
+while the application starts. Import times are recorded for each module.
+
+Every backend module provides the same functions: answer_question, answer_questions_batch,
+stream_answer_question and get_qa_history (summarize_document is optional), plus the
+BACKEND_NAME and MODEL_NAME used by the answer cache.
+
+Backends are grouped in cost/latency tiers. A request names a tier and is routed to the
+matching backend, or to a cheaper one when that backend is over its latency or error budget.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from app.config import (
+    QA_BACKENDS,
+    QA_LATENCY_BUDGETS,
+    QA_ERROR_BUDGET,
+    QA_HEALTH_WINDOW,
+    QA_HEALTH_MIN_SAMPLES,
+)
+
+# Backend name -> module implementing it
+BACKEND_MODULES = {
+    "groq": "app.services.qa_service_groq",
+    "light": "app.services.qa_service_light",
+    "embedding": "app.services.qa_service",
+}
+
+# Tiers from cheapest to most expensive: tier -> backend name
+TIERS = {
+    "fast": "light",
+    "balanced": "embedding",
+    "accurate": "groq",
+}
+TIER_ORDER = list(TIERS)
+BACKEND_TIERS = {backend: tier for tier, backend in TIERS.items()}
+
+# Use Groq AI if an API key is available, otherwise the lightweight or embedding service
+USE_GROQ_AI = os.getenv("GROQ_API_KEY", "") != ""
+USE_LIGHT_MODE = not USE_GROQ_AI and os.getenv("USE_LIGHT_MODE", "false").lower() == "true"
+
+if USE_GROQ_AI:
+    QA_BACKEND = "groq"
+elif USE_LIGHT_MODE:
+    QA_BACKEND = "light"
+else:
+    QA_BACKEND = "embedding"
+
+DEFAULT_TIER = BACKEND_TIERS[QA_BACKEND]
+
+# Backends requests may be routed to: the default one plus those listed in QA_BACKENDS
+ENABLED_BACKENDS = [QA_BACKEND] + [
+    name for name in dict.fromkeys(QA_BACKENDS) if name in BACKEND_MODULES and name != QA_BACKEND
+]
+if not os.getenv("GROQ_API_KEY", ""):
+    # Groq cannot answer without an API key
+    ENABLED_BACKENDS = [name for name in ENABLED_BACKENDS if name != "groq"]
+
+
+class BackendUnavailableError(RuntimeError):
+    """Raised when no enabled backend can serve a request."""
+
+# Re-entrant: importing one backend module may load another through this registry
+_load_lock = threading.RLock()
+
+# Modules fully imported through load_module
+_loaded = set()
+
+# Module name -> seconds spent importing it (including its dependencies)
+_import_timings = {}
+
+# Backend name -> seconds spent warming it up
+_warmup_timings = {}
+
+# Backend name -> error raised while importing it (e.g. its dependencies are not installed)
+_load_errors = {}
+
+
+def load_module(module_name: str):
+    """
+    Import a module on first use, recording how long the import took.
+
+    Args:
+        module_name (str): Dotted module name
+
+    Returns:
+        module: The imported module
+    """
+    if module_name in _loaded:
+        return sys.modules[module_name]
+
+    # One thread imports at a time, so concurrent first requests share a single import
+    with _load_lock:
+        first_import = module_name not in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if first_import:
+            _import_timings[module_name] = round(time.perf_counter() - start, 4)
+            print(f"Loaded {module_name} in {_import_timings[module_name]:.2f}s")
+        _loaded.add(module_name)
+    return module
+
+
+def get_qa_backend(name: str = None):
+    """
+    Get the module of a QA backend, importing it on first use.
+
+    Args:
+        name (str): Backend name (defaults to the configured backend)
+
+    Returns:
+        module: The backend module
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = name or QA_BACKEND
+    if name not in BACKEND_MODULES:
+        raise ValueError(f"Unknown QA backend: {name}")
+    return load_module(BACKEND_MODULES[name])
+
+
+def is_loaded(name: str = None):
+    """Check whether a QA backend has been imported."""
+    return BACKEND_MODULES[name or QA_BACKEND] in _loaded
+
+
+def _try_load(name: str):
+    """
+    Import an enabled backend, remembering a failed import so it is not retried.
+
+    Returns:
+        module: The backend module, or None if it cannot be imported
+    """
+    if name in _load_errors:
+        return None
+    try:
+        return get_qa_backend(name)
+    except ImportError as e:
+        _load_errors[name] = str(e)
+        print(f"QA backend '{name}' is unavailable: {str(e)}")
+        return None
+
+
+def load_enabled_backends():
+    """
+    Import every enabled backend (so each registers its ingestion stages).
+
+    Returns:
+        list: Names of the backends that could be loaded
+    """
+    # The default backend must load; errors from it are raised
+    get_qa_backend(QA_BACKEND)
+    return [name for name in ENABLED_BACKENDS if _try_load(name) is not None]
+
+
+class BackendHealth:
+    """
+    Latency and error counters of one backend over a sliding time window.
+    """
+
+    def __init__(self, window_seconds, max_samples=200):
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=max_samples)  # (timestamp, seconds per question, failed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.fallbacks = 0
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def record(self, seconds, failed):
+        with self._lock:
+            self._samples.append((time.time(), seconds, failed))
+            self.requests += 1
+            if failed:
+                self.errors += 1
+
+    def _recent(self):
+        cutoff = time.time() - self.window_seconds
+        return [sample for sample in self._samples if sample[0] >= cutoff]
+
+    def snapshot(self):
+        """Get the mean latency and error rate over the window."""
+        with self._lock:
+            recent = self._recent()
+            fallbacks = self.fallbacks
+        if not recent:
+            return {"samples": 0, "mean_latency": None, "error_rate": None, "fallbacks": fallbacks}
+        return {
+            "samples": len(recent),
+            "mean_latency": sum(sample[1] for sample in recent) / len(recent),
+            "error_rate": sum(1 for sample in recent if sample[2]) / len(recent),
+            "fallbacks": fallbacks,
+        }
+
+    def is_over_budget(self, latency_budget, error_budget, min_samples):
+        """
+        Check whether recent requests exceeded the latency or error budget.
+
+        Once the window passes without new samples the backend is tried again.
+        """
+        snapshot = self.snapshot()
+        if snapshot["samples"] < min_samples:
+            return False
+        return snapshot["mean_latency"] > latency_budget or snapshot["error_rate"] > error_budget
+
+
+_health = {name: BackendHealth(QA_HEALTH_WINDOW) for name in BACKEND_MODULES}
+
+
+def _is_error_answer(backend, result):
+    """Error messages a backend returns in place of an answer count against its error budget."""
+    answers = result if isinstance(result, list) else [result]
+    error_answers = getattr(backend, "UNCACHEABLE_ANSWERS", ())
+    return any(isinstance(r, dict) and r.get("answer") in error_answers for r in answers)
+
+
+def get_candidates(tier: str = None, required: str = None):
+    """
+    Get the backends to try for a request, best first.
+
+    The backend of the requested tier comes first, followed by the cheaper tiers.
+    Backends over budget are skipped, except the last one left, which is always tried.
+
+    Args:
+        tier (str): Requested tier (defaults to the tier of the configured backend)
+        required (str): Name of a function the backend must provide (e.g. "summarize_document")
+
+    Returns:
+        list: Backend names
+
+    Raises:
+        ValueError: If the tier is unknown
+        BackendUnavailableError: If no enabled backend at or below the tier can serve it
+    """
+    tier = tier or DEFAULT_TIER
+    if tier not in TIERS:
+        raise ValueError(f"Unknown tier '{tier}', expected one of: {', '.join(TIER_ORDER)}")
+
+    names = [TIERS[t] for t in reversed(TIER_ORDER[:TIER_ORDER.index(tier) + 1])]
+    available = []
+    for name in names:
+        if name not in ENABLED_BACKENDS:
+            continue
+        backend = _try_load(name)
+        if backend is None or (required and not hasattr(backend, required)):
+            continue
+        available.append(name)
+
+    if not available:
+        raise BackendUnavailableError(f"No QA backend is available for the '{tier}' tier")
+
+    within_budget = [
+        name for name in available
+        if not _health[name].is_over_budget(
+            QA_LATENCY_BUDGETS[BACKEND_TIERS[name]], QA_ERROR_BUDGET, QA_HEALTH_MIN_SAMPLES
+        )
+    ]
+    return within_budget or available[-1:]
+
+
+def _record(name, start, count, failed):
+    _health[name].record((time.perf_counter() - start) / max(count, 1), failed)
+
+
+def call_with_fallback(tier: str, call, count: int = 1, required: str = None):
+    """
+    Run a request on the backend of a tier, falling back to cheaper tiers.
+
+    A backend raising an unexpected error is recorded against its error budget and the
+    next candidate is tried. ValueError (e.g. document not found) is raised immediately.
+
+    Args:
+        tier (str): Requested tier (None for the default tier)
+        call: Callable taking the backend module and returning its result
+        count (int): Number of questions in the request, to record latency per question
+        required (str): Name of a function the backend must provide
+
+    Returns:
+        tuple: (result, name of the backend that produced it)
+    """
+    candidates = get_candidates(tier, required)
+    for i, name in enumerate(candidates):
+        backend = get_qa_backend(name)
+        start = time.perf_counter()
+        try:
+            result = call(backend)
+        except ValueError:
+            raise
+        except Exception as e:
+            _record(name, start, count, True)
+            if i == len(candidates) - 1:
+                raise
+            print(f"QA backend '{name}' failed, falling back to '{candidates[i + 1]}': {str(e)}")
+            _health[name].record_fallback()
+            continue
+        _record(name, start, count, _is_error_answer(backend, result))
+        return result, name
+
+
+def stream_with_fallback(tier: str, make_stream):
+    """
+    Streaming variant of call_with_fallback.
+
+    A backend may only be replaced before it has sent anything; errors after the
+    first event are raised.
+
+    Args:
+        tier (str): Requested tier (None for the default tier)
+        make_stream: Callable taking the backend module and returning an event generator
+
+    Yields:
+        tuple: (backend name, event, data)
+    """
+    candidates = get_candidates(tier)
+    for i, name in enumerate(candidates):
+        backend = get_qa_backend(name)
+        start = time.perf_counter()
+        started = False
+        try:
+            for event, data in make_stream(backend):
+                started = True
+                if event == "done":
+                    _record(name, start, 1, _is_error_answer(backend, data))
+                yield name, event, data
+            return
+        except ValueError:
+            raise
+        except Exception as e:
+            _record(name, start, 1, True)
+            if started or i == len(candidates) - 1:
+                raise
+            print(f"QA backend '{name}' failed, falling back to '{candidates[i + 1]}': {str(e)}")
+            _health[name].record_fallback()
+
+
+def warm_up(name: str = None):
+    """
+    Import a QA backend and load its models ahead of the first request.
+
+    Errors are logged rather than raised: a failed warm-up leaves loading to the first request.
+
+    Args:
+        name (str): Backend name (defaults to the configured backend)
+    """
+    name = name or QA_BACKEND
+    try:
+        start = time.perf_counter()
+        backend = get_qa_backend(name)
+        if hasattr(backend, "warm_up"):
+            backend.warm_up()
+        _warmup_timings[name] = round(time.perf_counter() - start, 4)
+        print(f"QA backend '{name}' warmed up in {_warmup_timings[name]:.2f}s")
+    except Exception as e:
+        print(f"Error warming up QA backend '{name}': {str(e)}")
+
+
+def warm_up_enabled_backends():
+    """Warm up every enabled backend, the default one first."""
+    for name in ENABLED_BACKENDS:
+        warm_up(name)
+
+
+def start_background_warm_up():
+    """Warm up the enabled QA backends in a daemon thread so startup is not delayed."""
+    thread = threading.Thread(target=warm_up_enabled_backends, name="pdfquest-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _get_backend_stats(name):
+    """Get backend-specific counters (e.g. HTTP retries), once the backend is loaded."""
+    if not is_loaded(name):
+        return None
+    backend = get_qa_backend(name)
+    return backend.get_stats() if hasattr(backend, "get_stats") else None
+
+
+def shutdown_backends():
+    """Release the resources held by loaded backends (called on application shutdown)."""
+    for name in BACKEND_MODULES:
+        if is_loaded(name):
+            backend = get_qa_backend(name)
+            if hasattr(backend, "shutdown"):
+                backend.shutdown()
+
+
+def get_status():
+    """
+    Get the enabled backends, their tiers and health, and the measured import and warm-up times.
+
+    Returns:
+        dict: Backend status
+    """
+    backends = {}
+    for name in ENABLED_BACKENDS:
+        health = _health[name].snapshot()
+        tier = BACKEND_TIERS[name]
+        backends[name] = {
+            "tier": tier,
+            "loaded": is_loaded(name),
+            "load_error": _load_errors.get(name),
+            "warmed_up": name in _warmup_timings,
+            "stats": _get_backend_stats(name),
+            "latency_budget": QA_LATENCY_BUDGETS[tier],
+            "over_budget": _health[name].is_over_budget(
+                QA_LATENCY_BUDGETS[tier], QA_ERROR_BUDGET, QA_HEALTH_MIN_SAMPLES
+            ),
+            **health,
+        }
+    return {
+        "backend": QA_BACKEND,
+        "default_tier": DEFAULT_TIER,
+        "error_budget": QA_ERROR_BUDGET,
+        "backends": backends,
+        "import_seconds": dict(_import_timings),
+        "warmup_seconds": dict(_warmup_timings),
+    }
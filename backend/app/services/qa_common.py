@@ -0,0 +1,72 @@
+"""
+Shared helpers for the question-answering services.
+This file provides the QA pair storage used by every QA backend.
+"""
+from sqlalchemy.orm import Session
+
+from app.database import QAPair
+
+
+def _qa_result(document, qa_pair: QAPair):
+    """Build the API response for a stored QA pair."""
+    return {
+        "question": qa_pair.question,
+        "answer": qa_pair.answer,
+        "document_id": document.id,
+        "document_name": document.filename,
+        "qa_pair_id": qa_pair.id
+    }
+
+
+def store_qa_pair(document, question: str, answer: str, db: Session):
+    """
+    Store a question-answer pair and build the response for it.
+
+    Args:
+        document: The document the question was asked about
+        question (str): The question
+        answer (str): The generated answer
+        db (Session): Database session
+
+    Returns:
+        dict: The answer and related information
+    """
+    qa_pair = QAPair(
+        document_id=document.id,
+        question=question,
+        answer=answer
+    )
+
+    db.add(qa_pair)
+    db.commit()
+    db.refresh(qa_pair)
+
+    return _qa_result(document, qa_pair)
+
+
+def store_qa_pairs(document, questions, answers, db: Session):
+    """
+    Store many question-answer pairs for one document in a single bulk insert.
+
+    Args:
+        document: The document the questions were asked about
+        questions (list): The questions
+        answers (list): The generated answers, in the same order
+        db (Session): Database session
+
+    Returns:
+        list: The answer and related information for each question, in order
+    """
+    qa_pairs = [
+        QAPair(document_id=document.id, question=question, answer=answer)
+        for question, answer in zip(questions, answers)
+    ]
+
+    db.add_all(qa_pairs)
+    db.flush()
+
+    # Build the results before commit expires the objects (avoids one SELECT per row)
+    results = [_qa_result(document, qa_pair) for qa_pair in qa_pairs]
+    db.commit()
+
+    return results
@@ -3,24 +3,89 @@ Question-answering service for the PDF Quest API.
 This file provides functions for answering questions about PDF documents using LangChain with free models.
 """
 import os
+import shutil
 import subprocess
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from sqlalchemy.orm import Session
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain_community.llms import Ollama
 from langchain.docstore.document import Document as LangchainDocument
 
 from app.database import QAPair
-from app.services.document_service import get_document_by_id, get_document_text
-from app.config import OPENAI_API_KEY
+from app.services.document_service import (
+    get_document_by_id,
+    get_document_content_hash,
+    load_document_text,
+)
+from app.services.ingestion_service import register_ingest_stage
+from app.services.index_cache import index_cache
+from app.services.qa_common import store_qa_pair, store_qa_pairs
+from app.services.semantic_cache import SemanticCache
+from app.services.summary_service import summarize_text
+from app.utils.artifact_store import get_artifact_dir, read_page_offsets, read_revision_info
+from app.utils.chunking import iter_chunks
+from app.utils.micro_batch import MicroBatcher
+from app.config import (
+    OPENAI_API_KEY,
+    LLM_BATCH_CONCURRENCY,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    EMBEDDING_BATCH_MAX_SIZE,
+    EMBEDDING_BATCH_MAX_WAIT_MS,
+)
 
 # Flag to enable mock mode (set to False to use Ollama)
 MOCK_MODE = False  # Ollama is now running, so we can use it
 
-# Initialize Hugging Face embeddings
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings computed through a shared micro-batcher (see app/utils/micro_batch.py),
+    so concurrent questions and ingestion jobs share the forward passes of the model.
+    """
+    
+    def __init__(self, model, max_batch_size, max_wait):
+        self.model = model
+        self.batcher = MicroBatcher(model.embed_documents, max_batch_size, max_wait, name="pdfquest-embedding")
+    
+    def embed_documents(self, texts):
+        return self.batcher.submit(texts)
+    
+    def embed_query(self, text):
+        # Same vector as embed_documents([text])[0], like the underlying model
+        return self.batcher.submit([text])[0]
+
+
+# Initialize Hugging Face embeddings, shared by every request through the micro-batcher
+embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+if EMBEDDING_BATCH_MAX_SIZE > 0:
+    embeddings = BatchedEmbeddings(embedding_model, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS / 1000)
+else:
+    embeddings = embedding_model
+
+def get_embedding_dimension():
+    """Get the size of the vectors produced by the embedding model."""
+    return embedding_model.client.get_sentence_embedding_dimension()
+
+# Ollama server address
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Name of the saved FAISS index inside a document's artifact directory
+INDEX_ARTIFACT_NAME = "faiss"
+
+# Bump when the chunking or stored metadata of the index changes, so indexes saved in an
+# older format are rebuilt (unversioned indexes predate page-by-page, token-aware chunks)
+INDEX_FORMAT_VERSION = 2
+
+# Chunk size (estimated tokens), kept under the embedding model's 256-token input limit
+EMBEDDING_CHUNK_TOKENS = 200
+EMBEDDING_CHUNK_OVERLAP_TOKENS = 50
 
 # Check if Ollama is installed and running
 def ensure_ollama_running():
@@ -30,7 +95,7 @@ def ensure_ollama_running():
     """
     try:
         # Try to connect to Ollama - using tinyllama model which is fast and small
-        llm = Ollama(model="tinyllama")
+        llm = Ollama(model="tinyllama", base_url=OLLAMA_BASE_URL)
         return True
     except Exception as e:
         print(f"Error connecting to Ollama: {str(e)}")
@@ -46,13 +111,87 @@ def ensure_ollama_running():
 if not MOCK_MODE:
     MOCK_MODE = not ensure_ollama_running()
 
+# Backend identity used by the answer cache (mock answers are cached separately)
+BACKEND_NAME = "ollama"
+MODEL_NAME = "mock" if MOCK_MODE else "tinyllama"
+
+# Near-duplicate question cache (mock answers quote the question, so they are never reused)
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED and not MOCK_MODE:
+    semantic_cache = SemanticCache(
+        SEMANTIC_CACHE_THRESHOLD, embeddings.embed_documents, get_embedding_dimension(), BACKEND_NAME, MODEL_NAME,
+        ANSWER_CACHE_TTL
+    )
+
+
+def warm_up():
+    """Run the embedding model once so the first question does not pay its start-up cost."""
+    embeddings.embed_query("warm up")
+
 
-def create_document_index(document_text):
+def get_stats():
+    """Get the batch counters of the embedding micro-batcher (None when batching is disabled)."""
+    if isinstance(embeddings, BatchedEmbeddings):
+        return {"embedding_batcher": embeddings.batcher.stats()}
+    return None
+
+
+def shutdown():
+    """Stop the embedding micro-batcher."""
+    if isinstance(embeddings, BatchedEmbeddings):
+        embeddings.batcher.shutdown()
+
+
+def _split_document(document_text, page_offsets=None):
+    """
+    Split a document into chunks, recording where each one starts and its page.
+    
+    With page offsets each page is split on its own, so the unchanged pages of
+    a revised document produce exactly the same chunks (and can reuse their vectors).
+    """
+    documents = []
+    for chunk in iter_chunks(
+        document_text, page_offsets, EMBEDDING_CHUNK_TOKENS, EMBEDDING_CHUNK_OVERLAP_TOKENS, split_pages=True
+    ):
+        metadata = {"start_index": chunk.start}
+        if chunk.first_page is not None:
+            metadata["page"] = chunk.first_page
+        documents.append(LangchainDocument(page_content=document_text[chunk.start:chunk.end], metadata=metadata))
+    return documents
+
+
+def _load_reusable_vectors(content_hash):
+    """
+    Load the chunk vectors of a saved index, keyed by chunk text.
+    
+    Returns:
+        dict: chunk text -> vector (empty if there is no saved index)
+    """
+    index_dir = get_index_dir(content_hash)
+    if not (index_dir / "index.faiss").exists():
+        return {}
+    try:
+        vector_store = FAISS.load_local(str(index_dir), embeddings)
+    except Exception as e:
+        print(f"[ERROR] Could not load the previous index: {str(e)}")
+        return {}
+    vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+    return {
+        vector_store.docstore.search(docstore_id).page_content: vectors[position]
+        for position, docstore_id in vector_store.index_to_docstore_id.items()
+    }
+
+
+def create_document_index(document_text, page_offsets=None, known_vectors=None):
     """
     Create a searchable index from document text using Hugging Face embeddings.
     
     Args:
         document_text (str): The text content of the document
+        page_offsets (list): Start offset of each page, used to chunk page by page
+            and record the page of each chunk
+        known_vectors (dict): Vectors of chunks embedded before (chunk text -> vector);
+            only the other chunks are embedded
         
     Returns:
         FAISS: A FAISS vector store containing the document chunks
@@ -67,22 +206,196 @@ def create_document_index(document_text):
         return MockVectorStore()
     
     # Split the text into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len
+    documents = _split_document(document_text, page_offsets)
+    
+    if not known_vectors:
+        # Create a vector store from the documents using Hugging Face embeddings
+        return FAISS.from_documents(documents, embeddings)
+    
+    # Only embed the chunks that were not embedded before
+    texts = [doc.page_content for doc in documents]
+    new_texts = list(dict.fromkeys(text for text in texts if text not in known_vectors))
+    vectors = dict(known_vectors)
+    if new_texts:
+        vectors.update(zip(new_texts, embeddings.embed_documents(new_texts)))
+    reused = sum(text in known_vectors for text in texts)
+    print(f"[DEBUG] Embedded {len(new_texts)} new chunks, reused {reused} vectors")
+    
+    return FAISS.from_embeddings(
+        [(text, list(vectors[text])) for text in texts],
+        embeddings,
+        metadatas=[doc.metadata for doc in documents]
     )
+
+
+def get_index_dir(content_hash):
+    """Get the directory where the FAISS index for a document content hash is saved (in the current format)."""
+    return get_artifact_dir(content_hash) / f"{INDEX_ARTIFACT_NAME}.v{INDEX_FORMAT_VERSION}"
+
+
+def _remove_outdated_indexes(content_hash):
+    """Delete indexes of a document content saved in older formats."""
+    current = get_index_dir(content_hash)
+    for index_dir in get_artifact_dir(content_hash).glob(f"{INDEX_ARTIFACT_NAME}*"):
+        if index_dir != current and index_dir.is_dir():
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def build_document_index(document_text, content_hash):
+    """
+    Build the FAISS index for a document and save it to disk.
+    
+    Args:
+        document_text (str): The text content of the document
+        content_hash (str): SHA-256 content hash of the document
+        
+    Returns:
+        FAISS: The newly built vector store
+    """
+    if MOCK_MODE:
+        return create_document_index(document_text)
+    
+    # A revised document reuses the vectors of the chunks it shares with its previous version
+    revision = read_revision_info(content_hash)
+    known_vectors = _load_reusable_vectors(revision["base_content_hash"]) if revision else None
+    vector_store = create_document_index(document_text, read_page_offsets(content_hash), known_vectors)
     
-    # Create documents from the text chunks
-    chunks = text_splitter.split_text(document_text)
-    documents = [LangchainDocument(page_content=chunk) for chunk in chunks]
+    index_dir = get_index_dir(content_hash)
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
     
-    # Create a vector store from the documents using Hugging Face embeddings
-    vector_store = FAISS.from_documents(documents, embeddings)
+    # Save to a temp directory first, then rename, so readers never see a partial index
+    tmp_dir = tempfile.mkdtemp(dir=index_dir.parent, prefix=".tmp-")
+    try:
+        vector_store.save_local(tmp_dir)
+        os.replace(tmp_dir, index_dir)
+    except OSError:
+        # Another worker saved the same index first; theirs is equivalent
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    _remove_outdated_indexes(content_hash)
     
     return vector_store
 
 
+def get_document_index(document, db: Session):
+    """
+    Get the FAISS index for a document, loading it from disk when available.
+    
+    The index is only built (and saved) when no saved copy exists, and loaded
+    indexes stay in the shared in-memory cache, so repeated questions cost one
+    query embedding plus one similarity search.
+    
+    Args:
+        document: The document object
+        db (Session): Database session
+        
+    Returns:
+        FAISS: A FAISS vector store containing the document chunks
+    """
+    if MOCK_MODE:
+        return create_document_index("")
+    
+    content_hash = get_document_content_hash(document, db)
+    
+    def load_index():
+        index_dir = get_index_dir(content_hash)
+        if (index_dir / "index.faiss").exists():
+            try:
+                return FAISS.load_local(str(index_dir), embeddings)
+            except Exception as e:
+                print(f"[ERROR] Could not load saved index, rebuilding: {str(e)}")
+                shutil.rmtree(index_dir, ignore_errors=True)
+        
+        document_text = load_document_text(document, db)
+        return build_document_index(document_text, content_hash)
+    
+    # Keep hot indexes resident in memory
+    return index_cache.get_or_load("faiss", document.id, content_hash, load_index, estimate_vector_store_size)
+
+
+def estimate_vector_store_size(vector_store):
+    """Estimate the memory used by a FAISS vector store in bytes."""
+    # float32 vectors plus the stored chunk texts
+    vector_bytes = vector_store.index.ntotal * vector_store.index.d * 4
+    text_bytes = sum(len(doc.page_content) for doc in vector_store.docstore._dict.values())
+    return vector_bytes + text_bytes
+
+
+def _index_stage(document, document_text, content_hash):
+    """Ingestion stage: chunk, embed and index a newly uploaded document."""
+    if not MOCK_MODE and not (get_index_dir(content_hash) / "index.faiss").exists():
+        build_document_index(document_text, content_hash)
+
+
+register_ingest_stage("index", _index_stage)
+
+
+def _get_answer_llm():
+    """Create the Ollama model used for answering questions."""
+    return Ollama(model="tinyllama", base_url=OLLAMA_BASE_URL, temperature=0.7, timeout=60)
+
+
+def _retrieve_context(document, query_vector, db: Session):
+    """Find the chunks of a document most relevant to an embedded question."""
+    print("[DEBUG] Loading vector store...")
+    # Load the saved vector store (built once per document)
+    vector_store = get_document_index(document, db)
+    
+    print("[DEBUG] Searching for relevant documents...")
+    # Search for relevant document chunks - reduced from 4 to 3 for faster processing
+    relevant_docs = vector_store.similarity_search_by_vector(query_vector, k=3)
+    
+    context = "\n\n".join([doc.page_content for doc in relevant_docs])
+    print(f"[DEBUG] Context prepared, length: {len(context)} characters")
+    return context
+
+
+def _find_similar_answers(document, query_vectors, db: Session):
+    """
+    Look up previously answered questions close enough to reuse their answers.
+    
+    Returns:
+        list: One semantic cache match (or None) per query vector
+    """
+    if semantic_cache is None:
+        return [None] * len(query_vectors)
+    content_hash = get_document_content_hash(document, db)
+    return semantic_cache.lookup_many(content_hash, query_vectors, db)
+
+
+def _remember_answers(document, query_vectors, results, db: Session):
+    """Add newly generated and stored answers to the semantic cache."""
+    if semantic_cache is None or not results:
+        return
+    content_hash = get_document_content_hash(document, db)
+    semantic_cache.add_many(content_hash, query_vectors, results, db)
+
+
+def _semantic_match_info(match):
+    """Describe the previously answered question an answer was reused from."""
+    return {"question": match["matched_question"], "similarity": match["similarity"]}
+
+
+def _store_semantic_hit(document, question: str, query_vector, match, db: Session):
+    """Store a question answered from the semantic cache and build its response."""
+    result = store_qa_pair(document, question, match["answer"], db)
+    # Keep its vector too, for when the stored answer is cached and the index rebuilt
+    semantic_cache.save_vectors([result["qa_pair_id"]], [query_vector], db)
+    result["semantic_match"] = _semantic_match_info(match)
+    return result
+
+
+def _build_prompt(context: str, question: str):
+    """Create a prompt for the LLM - simplified for faster processing."""
+    return f"""Based on the following context, answer the question directly and concisely. If you don't know the answer, say so.
+
+Context:
+{context}
+
+Question: {question}
+
+Answer (be direct and concise):"""
+
+
 def answer_question(document_id: int, question: str, db: Session):
     """
     Answer a question about a document using Ollama.
@@ -109,38 +422,23 @@ def answer_question(document_id: int, question: str, db: Session):
         
         print(f"[DEBUG] Document found: {document.filename}")
         
-        # Get the document text
-        document_text = get_document_text(document_id, db)
-        print(f"[DEBUG] Document text extracted, length: {len(document_text)} characters")
-        
         if MOCK_MODE:
             # Generate a mock answer for testing
             answer = f"This is a mock answer to your question: '{question}'. In a real scenario, this would be generated by analyzing the document content using free language models."
         else:
-            print("[DEBUG] Creating vector store...")
-            # Create a vector store from the document text
-            vector_store = create_document_index(document_text)
-            
-            print("[DEBUG] Searching for relevant documents...")
-            # Search for relevant document chunks - reduced from 4 to 3 for faster processing
-            relevant_docs = vector_store.similarity_search(question, k=3)
+            # Embed the question once, for both the semantic cache and retrieval
+            query_vector = embeddings.embed_query(question)
+            match = _find_similar_answers(document, [query_vector], db)[0]
+            if match is not None:
+                print(f"[DEBUG] Semantic cache hit (similarity {match['similarity']:.3f})")
+                return _store_semantic_hit(document, question, query_vector, match, db)
             
-            # Create a prompt for the LLM - simplified for faster processing
-            context = "\n\n".join([doc.page_content for doc in relevant_docs])
-            print(f"[DEBUG] Context prepared, length: {len(context)} characters")
-            
-            prompt = f"""Based on the following context, answer the question directly and concisely. If you don't know the answer, say so.
-
-Context:
-{context}
-
-Question: {question}
-
-Answer (be direct and concise):"""
+            context = _retrieve_context(document, query_vector, db)
+            prompt = _build_prompt(context, question)
             
             print("[DEBUG] Initializing Ollama LLM...")
             # Create a language model with Ollama - using tinyllama which is fast and small
-            llm = Ollama(model="tinyllama", temperature=0.7, timeout=60)
+            llm = _get_answer_llm()
             
             # Generate the answer
             try:
@@ -155,26 +453,14 @@ Answer (be direct and concise):"""
         
         print("[DEBUG] Storing QA pair in database...")
         # Store the question-answer pair in the database
-        qa_pair = QAPair(
-            document_id=document_id,
-            question=question,
-            answer=answer
-        )
-        
-        db.add(qa_pair)
-        db.commit()
-        db.refresh(qa_pair)
-        
+        result = store_qa_pair(document, question, answer, db)
         print("[DEBUG] QA pair stored successfully")
         
+        if not MOCK_MODE:
+            _remember_answers(document, [query_vector], [result], db)
+        
         # Return the answer and related information
-        return {
-            "question": question,
-            "answer": answer,
-            "document_id": document_id,
-            "document_name": document.filename,
-            "qa_pair_id": qa_pair.id
-        }
+        return result
     except Exception as e:
         # Log the error for debugging
         print(f"[ERROR] Error in answer_question: {str(e)}")
@@ -183,6 +469,146 @@ Answer (be direct and concise):"""
         raise
 
 
+def stream_answer_question(document_id: int, question: str, db: Session):
+    """
+    Answer a question about a document using Ollama, yielding tokens as they are generated.
+    
+    Args:
+        document_id (int): The ID of the document
+        question (str): The question to answer
+        db (Session): Database session
+        
+    Yields:
+        tuple: ("token", text) for each generated piece of the answer, then
+        ("done", result) with the same result as answer_question once the
+        QA pair is stored
+        
+    Raises:
+        ValueError: If the document is not found
+    """
+    document = get_document_by_id(document_id, db)
+    
+    if not document:
+        raise ValueError(f"Document with ID {document_id} not found")
+    
+    if MOCK_MODE:
+        answer = f"This is a mock answer to your question: '{question}'. In a real scenario, this would be generated by analyzing the document content using free language models."
+        yield ("token", answer)
+    else:
+        query_vector = embeddings.embed_query(question)
+        match = _find_similar_answers(document, [query_vector], db)[0]
+        if match is not None:
+            yield ("token", match["answer"])
+            yield ("done", _store_semantic_hit(document, question, query_vector, match, db))
+            return
+        
+        context = _retrieve_context(document, query_vector, db)
+        llm = _get_answer_llm()
+        
+        parts = []
+        for token in llm.stream(_build_prompt(context, question)):
+            parts.append(token)
+            yield ("token", token)
+        answer = "".join(parts)
+    
+    result = store_qa_pair(document, question, answer, db)
+    if not MOCK_MODE:
+        _remember_answers(document, [query_vector], [result], db)
+    yield ("done", result)
+
+
+def _retrieve_contexts_batch(document, query_vectors, db: Session, k: int = 3):
+    """
+    Find the most relevant chunks for many embedded questions at once,
+    in one FAISS matrix query.
+    
+    Returns:
+        list: One context string per question, in order
+    """
+    vector_store = get_document_index(document, db)
+    
+    _, indices = vector_store.index.search(np.array(query_vectors, dtype=np.float32), k)
+    
+    contexts = []
+    for row in indices:
+        # FAISS pads with -1 when the index holds fewer than k chunks
+        docs = [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            for i in row if i != -1
+        ]
+        contexts.append("\n\n".join(doc.page_content for doc in docs))
+    return contexts
+
+
+def answer_questions_batch(document_id: int, questions: list, db: Session):
+    """
+    Answer many questions about one document in one pass.
+    
+    The document index is loaded once, all questions are embedded in one call,
+    questions close to one answered before reuse its answer, retrieval for the
+    rest is a single batched search, LLM calls run with bounded concurrency and
+    all QA pairs are written in one bulk insert.
+    
+    Args:
+        document_id (int): The ID of the document
+        questions (list): The questions to answer
+        db (Session): Database session
+        
+    Returns:
+        list: One result per question, in order, as returned by answer_question
+        
+    Raises:
+        ValueError: If the document is not found
+    """
+    document = get_document_by_id(document_id, db)
+    
+    if not document:
+        raise ValueError(f"Document with ID {document_id} not found")
+    
+    if MOCK_MODE:
+        answers = [
+            f"This is a mock answer to your question: '{question}'. In a real scenario, this would be generated by analyzing the document content using free language models."
+            for question in questions
+        ]
+        return store_qa_pairs(document, questions, answers, db)
+    
+    query_vectors = embeddings.embed_documents(questions)
+    matches = _find_similar_answers(document, query_vectors, db)
+    misses = [i for i, match in enumerate(matches) if match is None]
+    answers = [match["answer"] if match is not None else None for match in matches]
+    
+    if misses:
+        miss_vectors = [query_vectors[i] for i in misses]
+        miss_questions = [questions[i] for i in misses]
+        contexts = _retrieve_contexts_batch(document, miss_vectors, db)
+        llm = _get_answer_llm()
+        
+        def generate(context, question):
+            try:
+                return llm.invoke(_build_prompt(context, question))
+            except Exception as llm_error:
+                print(f"[ERROR] LLM Error: {str(llm_error)}")
+                # Fallback to a simpler prompt if the main one fails
+                simple_prompt = f"Based on this context: {context[:1000]}\n\nAnswer this question briefly: {question}"
+                return llm.invoke(simple_prompt)
+        
+        with ThreadPoolExecutor(max_workers=LLM_BATCH_CONCURRENCY) as pool:
+            generated = list(pool.map(generate, contexts, miss_questions))
+        
+        for i, answer in zip(misses, generated):
+            answers[i] = answer
+    
+    results = store_qa_pairs(document, questions, answers, db)
+    _remember_answers(document, [query_vectors[i] for i in misses], [results[i] for i in misses], db)
+    hits = [i for i, match in enumerate(matches) if match is not None]
+    if hits:
+        semantic_cache.save_vectors([results[i]["qa_pair_id"] for i in hits], [query_vectors[i] for i in hits], db)
+    for result, match in zip(results, matches):
+        if match is not None:
+            result["semantic_match"] = _semantic_match_info(match)
+    return results
+
+
 def get_qa_history(document_id: int, db: Session, limit: int = 10):
     """
     Get the question-answer history for a document.
@@ -211,44 +637,45 @@ def get_qa_history(document_id: int, db: Session, limit: int = 10):
     return [qa_pair.to_dict() for qa_pair in qa_pairs]
 
 
-def summarize_document(document_id: int, db: Session):
+def summarize_document(document_id: int, db: Session, length: str = "short", style: str = "paragraph"):
     """
-    Generate a summary of a document using Ollama.
+    Generate a summary of the whole document using Ollama.
+    
+    Chunks are summarized in parallel and their summaries combined (map-reduce).
+    Chunk summaries and final summaries are stored, so repeat calls return at once
+    and other length/style options only redo the final combination.
     
     Args:
         document_id (int): The ID of the document
         db (Session): Database session
+        length (str): Summary length ("short", "medium" or "long")
+        style (str): Summary style ("paragraph" or "bullets")
         
     Returns:
         str: The summary of the document
         
     Raises:
-        ValueError: If the document is not found
+        ValueError: If the document is not found or the options are unknown
     """
     try:
-        # Get the document text
-        document_text = get_document_text(document_id, db)
+        document = get_document_by_id(document_id, db)
+        
+        if not document:
+            raise ValueError(f"Document with ID {document_id} not found")
         
         if MOCK_MODE:
             # Generate a mock summary for testing
             return "This is a mock summary of the document. In a real scenario, this would be generated by analyzing the document content using free language models."
         else:
-            # Create a summary prompt
-            prompt = f"""
-            Please provide a concise summary of the following document:
-            
-            {document_text[:5000]}...
-            
-            Summary:
-            """
+            # Get the document text
+            document_text = load_document_text(document, db)
+            content_hash = get_document_content_hash(document, db)
             
             # Create a language model with Ollama - using phi model
-            llm = Ollama(model="phi", timeout=60)
-            
-            # Generate the summary
-            summary = llm.invoke(prompt)
+            llm = Ollama(model="phi", base_url=OLLAMA_BASE_URL, timeout=60)
             
-            return summary
+            # Generate (or reuse) the summary
+            return summarize_text(document_text, content_hash, "phi", llm.invoke, length, style)
     except Exception as e:
         # Log the error for debugging
         print(f"Error in summarize_document: {str(e)}")
@@ -2,36 +2,89 @@
 AI-powered Question-answering service using Groq API (FREE).
 Provides accurate, relevant answers using real AI models.
 """
+import json
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
 
+from app.config import (
+    LLM_BATCH_CONCURRENCY,
+    GROQ_MAX_CONCURRENCY,
+    GROQ_REQUESTS_PER_MINUTE,
+    GROQ_MAX_RETRIES,
+    GROQ_BACKOFF_BASE,
+    GROQ_BACKOFF_MAX,
+    GROQ_CONTEXT_TOKENS,
+    GROQ_CONTEXT_TOP_K,
+)
 from app.database import QAPair
-from app.services.document_service import get_document_by_id, get_document_text
+from app.services.document_service import get_document_by_id
+from app.services.ingestion_service import register_ingest_stage
+from app.services.qa_common import store_qa_pair, store_qa_pairs
+from app.services.retrieval_service import get_keyword_index, keyword_index_stage
+from app.utils.context_packing import select_context
+from app.utils.http_client import RateLimitedClient
 
 # Groq API configuration (FREE)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Any OpenAI-compatible chat completions endpoint works (e.g. a local fake server for testing)
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = "llama-3.3-70b-versatile"  # Fast, accurate, FREE
 
+# Shared client: keep-alive connections, bounded concurrency, rate limiting and retries
+client = RateLimitedClient(
+    max_concurrency=GROQ_MAX_CONCURRENCY,
+    requests_per_minute=GROQ_REQUESTS_PER_MINUTE,
+    max_retries=GROQ_MAX_RETRIES,
+    backoff_base=GROQ_BACKOFF_BASE,
+    backoff_max=GROQ_BACKOFF_MAX,
+)
 
-def answer_question_with_ai(document_id: int, question: str, db: Session):
-    """
-    Answer a question using Groq AI (FREE, fast, accurate).
+# Backend identity used by the answer cache (includes the context selection, as it changes answers)
+BACKEND_NAME = "groq"
+MODEL_NAME = f"{GROQ_MODEL}/bm25"
+
+# Messages returned in place of an answer
+NO_API_KEY_ANSWER = "Please configure GROQ_API_KEY environment variable to use AI-powered answers."
+API_ERROR_ANSWER = "I encountered an error while processing your question. Please try again."
+
+# Answers that must never be served from the answer cache
+UNCACHEABLE_ANSWERS = {NO_API_KEY_ANSWER, API_ERROR_ANSWER}
+
+
+register_ingest_stage("bm25", keyword_index_stage)
+
+
+@contextmanager
+def _get_document(document_id: int, db: Session):
     """
-    try:
-        # Get the document
-        document = get_document_by_id(document_id, db)
-        if not document:
-            raise ValueError(f"Document with ID {document_id} not found")
-        
-        # Get the document text
-        document_text = get_document_text(document_id, db)
-        
-        # Limit context to 3000 characters to stay within API limits
-        context = document_text[:3000] if len(document_text) > 3000 else document_text
+    Open a document with its text and keyword index (built once per document).
+    Use it in a with statement: the text is unmapped when the block ends.
+    
+    Yields:
+        tuple: (document, memory-mapped document text, keyword index)
         
-        # Create prompt for AI
-        prompt = f"""You are a helpful assistant that answers questions based on the provided document.
+    Raises:
+        ValueError: If the document is not found
+    """
+    # Get the document
+    document = get_document_by_id(document_id, db)
+    if not document:
+        raise ValueError(f"Document with ID {document_id} not found")
+    
+    with get_keyword_index(document, db) as (document_text, keyword_index):
+        yield document, document_text, keyword_index
+
+
+def _select_context(document_text, keyword_index, question: str):
+    """Pick the chunks most relevant to a question, within the context token budget."""
+    return select_context(document_text, keyword_index, question, GROQ_CONTEXT_TOKENS, GROQ_CONTEXT_TOP_K)
+
+
+def _format_prompt(context: str, question: str):
+    """Create the prompt for a question about the given context."""
+    return f"""You are a helpful assistant that answers questions based on the provided document.
 
 Document content:
 {context}
@@ -47,61 +100,159 @@ Instructions:
 
 Answer:"""
 
-        # Call Groq API
-        if not GROQ_API_KEY:
-            # Fallback if no API key
-            answer = "Please configure GROQ_API_KEY environment variable to use AI-powered answers."
-        else:
-            headers = {
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "llama-3.3-70b-versatile",  # Fast, accurate, FREE
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3,  # Lower = more focused answers
-                "max_tokens": 500,
-                "top_p": 1
-            }
-            
-            response = requests.post(GROQ_API_URL, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                answer = result['choices'][0]['message']['content'].strip()
-            else:
-                print(f"Groq API error: {response.status_code} - {response.text}")
-                answer = "I encountered an error while processing your question. Please try again."
+
+def _build_prompt(document_id: int, question: str, db: Session):
+    """
+    Look up a document and build the prompt for a question about it.
+    
+    Returns:
+        tuple: (document, prompt)
         
-        # Store the QA pair
-        qa_pair = QAPair(
-            document_id=document_id,
-            question=question,
-            answer=answer
-        )
+    Raises:
+        ValueError: If the document is not found
+    """
+    with _get_document(document_id, db) as (document, document_text, keyword_index):
+        context = _select_context(document_text, keyword_index, question)
+    return document, _format_prompt(context, question)
+
+
+def _request_kwargs(prompt: str, stream: bool = False):
+    """Build the keyword arguments for a Groq chat completion request."""
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    data = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.3,  # Lower = more focused answers
+        "max_tokens": 500,
+        "top_p": 1
+    }
+    if stream:
+        data["stream"] = True
+    
+    return {"headers": headers, "json": data, "timeout": 30, "stream": stream}
+
+
+def _complete(prompt: str):
+    """
+    Get the answer to a prompt from Groq.
+    
+    Returns:
+        str: The answer, or a user-facing error message if the call failed
+    """
+    if not GROQ_API_KEY:
+        # Fallback if no API key
+        return NO_API_KEY_ANSWER
+    
+    with client.post(GROQ_API_URL, **_request_kwargs(prompt)) as response:
+        if response.status_code == 200:
+            result = response.json()
+            return result['choices'][0]['message']['content'].strip()
         
-        db.add(qa_pair)
-        db.commit()
-        db.refresh(qa_pair)
+        print(f"Groq API error: {response.status_code} - {response.text}")
+        return API_ERROR_ANSWER
+
+
+def answer_question_with_ai(document_id: int, question: str, db: Session):
+    """
+    Answer a question using Groq AI (FREE, fast, accurate).
+    """
+    try:
+        document, prompt = _build_prompt(document_id, question, db)
+
+        # Call Groq API
+        answer = _complete(prompt)
         
-        return {
-            "question": question,
-            "answer": answer,
-            "document_id": document_id,
-            "document_name": document.filename,
-            "qa_pair_id": qa_pair.id
-        }
+        # Store the QA pair
+        return store_qa_pair(document, question, answer, db)
     except Exception as e:
         print(f"Error in answer_question_with_ai: {str(e)}")
         raise
 
 
+# Name shared by every QA backend (see qa_backends)
+answer_question = answer_question_with_ai
+
+
+def stream_answer_question(document_id: int, question: str, db: Session):
+    """
+    Answer a question using Groq AI, yielding tokens as they are generated.
+    
+    Yields:
+        tuple: ("token", text) for each generated piece of the answer, then
+        ("done", result) with the same result as answer_question_with_ai once
+        the QA pair is stored
+    """
+    document, prompt = _build_prompt(document_id, question, db)
+    
+    if not GROQ_API_KEY:
+        answer = NO_API_KEY_ANSWER
+        yield ("token", answer)
+    else:
+        parts = []
+        with client.post(GROQ_API_URL, **_request_kwargs(prompt, stream=True)) as response:
+            if response.status_code != 200:
+                print(f"Groq API error: {response.status_code} - {response.text}")
+                answer = API_ERROR_ANSWER
+                yield ("token", answer)
+            else:
+                # OpenAI-compatible streams send one "data: {json}" line per chunk
+                for raw_line in response.iter_lines():
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    choices = json.loads(payload).get("choices") or [{}]
+                    token = (choices[0].get("delta") or {}).get("content")
+                    if token:
+                        parts.append(token)
+                        yield ("token", token)
+                answer = "".join(parts).strip()
+    
+    yield ("done", store_qa_pair(document, question, answer, db))
+
+
+def answer_questions_batch(document_id: int, questions: list, db: Session):
+    """
+    Answer many questions about one document.
+    The document and its keyword index are loaded once, each question gets its own
+    retrieved context, and Groq is called with bounded concurrency.
+    
+    Returns:
+        list: One result per question, in order, as returned by answer_question_with_ai
+    """
+    with _get_document(document_id, db) as (document, document_text, keyword_index):
+        prompts = [
+            _format_prompt(_select_context(document_text, keyword_index, question), question)
+            for question in questions
+        ]
+    
+    with ThreadPoolExecutor(max_workers=LLM_BATCH_CONCURRENCY) as pool:
+        answers = list(pool.map(_complete, prompts))
+    
+    return store_qa_pairs(document, questions, answers, db)
+
+
+def get_stats():
+    """Get the request, retry and rate-limit counters of the Groq client."""
+    return client.stats()
+
+
+def shutdown():
+    """Close the pooled connections of the Groq client."""
+    client.close()
+
+
 def get_qa_history(document_id: int, db: Session, limit: int = 10):
     """Get QA history for a document."""
     document = get_document_by_id(document_id, db)
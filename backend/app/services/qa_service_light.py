@@ -2,124 +2,383 @@
 Lightweight Question-answering service for Render free tier.
 Uses improved keyword matching and context extraction.
 """
+import io
+import json
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+import scipy.sparse
 
 from app.database import QAPair
-from app.services.document_service import get_document_by_id, get_document_text
-
-# Download required NLTK data (only once)
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-
-
-def clean_text(text):
-    """Clean and normalize text by removing excessive whitespace and formatting."""
-    # Remove lines that look like table of contents (Java - Something)
-    lines = text.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        line = line.strip()
-        # Skip table of contents patterns
-        if re.match(r'^\s*Java\s*-\s*', line, re.IGNORECASE):
-            continue
-        if re.match(r'^\s*\w+\s*-\s*\w+', line) and len(line) < 50:
-            continue
-        # Skip lines that are just headings
-        if line.endswith(':') and len(line) < 60:
-            continue
-        # Skip lines with "explore" or "chapter"
-        if any(word in line.lower() for word in ['explore the', 'chapter', 'tutorial', 'furthermore']):
-            continue
-        cleaned_lines.append(line)
-    
-    text = ' '.join(cleaned_lines)
+from app.services.document_service import get_document_by_id, get_document_content_hash, load_document_text
+from app.services.index_cache import index_cache
+from app.services.qa_common import store_qa_pair, store_qa_pairs
+from app.services.ingestion_service import register_ingest_stage
+from app.utils.artifact_store import get_artifact_dir, open_text_artifact, read_page_offsets, write_artifact_atomically
+from app.utils.chunking import Chunk, ChunkTable, chunk_texts, iter_chunks
+from app.utils.sentence_index import SentenceIndex
+from app.utils.text_buffer import to_byte_offsets
+from app.utils.text_cleaning import clean_pages
+from app.utils.tfidf import ChunkTermCounts
+
+# Backend identity used by the answer cache
+BACKEND_NAME = "light"
+MODEL_NAME = "tfidf"
+
+# TF-IDF settings of the chunk ranking: chunks are scored as if a vectorizer were fitted over
+# them plus the question, from term counts computed once per document (see app/utils/tfidf.py)
+TFIDF_PARAMS = {
+    "stop_words": "english",
+    "max_features": 200,
+    "ngram_range": (1, 2),
+    "min_df": 1,
+    "max_df": 0.95,
+}
+
+# Chunking of the cleaned text (estimated tokens); shorter chunks are dropped
+CHUNK_TOKENS = 750
+CHUNK_OVERLAP_TOKENS = 150
+MIN_CHUNK_CHARS = 100
+
+# Name of the cleaned-text artifact (UTF-8, memory-mapped when answering)
+CLEAN_TEXT_ARTIFACT_NAME = "clean_text.txt"
+
+# Names of the persisted chunk term counts inside a document's artifact directory
+TFIDF_MATRIX_ARTIFACT_NAME = "tfidf.npz"
+TFIDF_VOCAB_ARTIFACT_NAME = "tfidf_vocab.json"
+
+# Bump when cleaning, chunking or the stored counts change, so older counts are rebuilt
+TFIDF_MODEL_VERSION = 3
+
+# Name of the persisted sentence index inside a document's artifact directory
+SENTENCE_INDEX_ARTIFACT_NAME = "sentences.json"
+
+# Bump when chunking, sentence splitting or tokenization changes, so older indexes are rebuilt
+SENTENCE_INDEX_VERSION = 3
+
+
+def _write_cleaned_text(content_hash, load_text):
+    """
+    Clean a document text page by page and store it as an artifact.
     
-    # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text)
-    # Remove bullet points and special characters at start
-    text = re.sub(r'^\s*[•\-\*]\s*', '', text, flags=re.MULTILINE)
-    # Remove page numbers
-    text = re.sub(r'\b\d+\s*$', '', text, flags=re.MULTILINE)
-    # Remove excessive newlines
-    text = re.sub(r'\n\s*\n', '\n', text)
+    Returns:
+        tuple: (cleaned text, start offset of each page in it or None)
+    """
+    cleaned_text, page_offsets = clean_pages(load_text(), read_page_offsets(content_hash))
+    write_artifact_atomically(get_artifact_dir(content_hash) / CLEAN_TEXT_ARTIFACT_NAME, cleaned_text.encode("utf-8"))
+    return cleaned_text, page_offsets
+
+
+def chunk_cleaned_text(cleaned_text, page_offsets=None):
+    """
+    Split a cleaned document text into chunks, keeping only substantial ones.
     
-    return text.strip()
+    Returns:
+        ChunkTable: The chunks, with byte offsets into the UTF-8 encoded text
+    """
+    chunks = [
+        chunk for chunk in iter_chunks(cleaned_text, page_offsets, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+        if chunk.end - chunk.start > MIN_CHUNK_CHARS  # Only keep substantial chunks
+    ]
+    byte_offsets = to_byte_offsets(cleaned_text, [offset for chunk in chunks for offset in (chunk.start, chunk.end)])
+    return ChunkTable.from_chunks(chunks, byte_offsets)
 
 
-def is_meaningful_sentence(sentence):
-    """Check if a sentence is meaningful (not just a heading or list item)."""
-    sentence = sentence.strip()
+def _get_cleaned_chunks(document_id, content_hash, load_text):
+    """
+    Get the chunks of the cleaned text of a document content hash, cached in memory.
     
-    # Too short
-    if len(sentence) < 40:
-        return False
+    Pages are cleaned one by one, so each chunk records the pages it comes from.
+    The cleaned text itself is stored as an artifact rather than kept in memory.
     
-    # Just a heading or list item (ends with : or has no verb)
-    if sentence.endswith(':') or sentence.endswith('...'):
-        return False
+    Returns:
+        ChunkTable: The chunks, with byte offsets into the cleaned-text artifact
+    """
+    def load_chunks():
+        return chunk_cleaned_text(*_write_cleaned_text(content_hash, load_text))
     
-    # Contains "Java -" pattern (table of contents)
-    if 'java -' in sentence.lower() or ' - ' in sentence:
-        return False
+    return index_cache.get_or_load(
+        "chunks", document_id, content_hash, load_chunks, lambda value: value.size_bytes()
+    )
+
+
+def _open_cleaned_text(content_hash, load_text):
+    """Memory-map the cleaned text of a document, storing it again if the artifact is missing."""
+    cleaned_text = open_text_artifact(content_hash, CLEAN_TEXT_ARTIFACT_NAME)
+    if cleaned_text is None:
+        _write_cleaned_text(content_hash, load_text)
+        cleaned_text = open_text_artifact(content_hash, CLEAN_TEXT_ARTIFACT_NAME)
+    return cleaned_text
+
+
+@contextmanager
+def get_cleaned_chunks(document, db: Session):
+    """
+    Open the cleaned text, chunks, chunk term counts and sentence index of a document.
     
-    # Contains "explore" or "chapter" (table of contents language)
-    toc_words = ['explore', 'chapter', 'tutorial', 'following', 'furthermore']
-    if any(word in sentence.lower() for word in toc_words):
-        return False
+    The chunks and indexes are cached in memory; the cleaned text is memory-mapped,
+    so only the sentences and chunks used in an answer are decoded. Use it in a
+    with statement: the text is unmapped when the block ends.
     
-    # Must contain actual verbs (is, are, was, were, has, have, can, will, etc.)
-    verbs = ['is', 'are', 'was', 'were', 'has', 'have', 'had', 'can', 'will', 'would', 'should', 'must', 'does', 'do', 'did']
-    has_verb = any(f' {verb} ' in f' {sentence.lower()} ' for verb in verbs)
+    Yields:
+        tuple: (cleaned document text as a TextBuffer, ChunkTable, ChunkTermCounts or None, SentenceIndex)
+    """
+    content_hash = get_document_content_hash(document, db)
+    chunks = _get_cleaned_chunks(document.id, content_hash, lambda: load_document_text(document, db))
+    with _open_cleaned_text(content_hash, lambda: load_document_text(document, db)) as cleaned_text:
+        yield (
+            cleaned_text,
+            chunks,
+            _get_tfidf_model(document.id, content_hash, cleaned_text, chunks),
+            _get_sentence_index(document.id, content_hash, cleaned_text, chunks),
+        )
+
+
+def build_tfidf_model(chunks):
+    """
+    Count the terms of a document's chunks for TF-IDF scoring.
     
-    if not has_verb:
-        return False
+    Returns:
+        ChunkTermCounts: The counts, or None if there are no chunks
+    """
+    if not chunks:
+        return None
+    return ChunkTermCounts.build(chunks, TFIDF_PARAMS)
+
+
+def save_tfidf_model(content_hash, model):
+    """Persist chunk term counts as a sparse .npz matrix plus the list of terms."""
+    artifact_dir = get_artifact_dir(content_hash)
     
-    # Contains actual content (has common words)
-    common_words = ['the', 'a', 'an', 'to', 'for', 'of', 'in', 'on', 'at', 'by', 'with']
-    has_common_word = any(f' {word} ' in f' {sentence.lower()} ' for word in common_words)
+    buffer = io.BytesIO()
+    scipy.sparse.save_npz(buffer, model.counts)
+    write_artifact_atomically(artifact_dir / TFIDF_MATRIX_ARTIFACT_NAME, buffer.getvalue())
     
-    return has_common_word
+    vocab = {"version": TFIDF_MODEL_VERSION, "terms": model.terms}
+    write_artifact_atomically(artifact_dir / TFIDF_VOCAB_ARTIFACT_NAME, json.dumps(vocab).encode("utf-8"))
 
 
-def extract_keywords(text):
-    """Extract important keywords from text."""
+def load_tfidf_model(content_hash):
+    """
+    Load persisted chunk term counts.
+    
+    Returns:
+        ChunkTermCounts: The counts, or None if not stored or stored by other code
+    """
+    artifact_dir = get_artifact_dir(content_hash)
     try:
-        stop_words = set(stopwords.words('english'))
-        words = word_tokenize(text.lower())
-        keywords = [w for w in words if w.isalnum() and w not in stop_words and len(w) > 2]
-        return keywords
-    except:
-        # Fallback if NLTK fails
-        return text.lower().split()
-
-
-def split_into_chunks(text, chunk_size=500, overlap=100):
-    """Split text into overlapping chunks for better context."""
-    # Clean the text first
-    text = clean_text(text)
+        with open(artifact_dir / TFIDF_VOCAB_ARTIFACT_NAME, "rb") as f:
+            vocab = json.loads(f.read())
+        if vocab.get("version") != TFIDF_MODEL_VERSION:
+            return None
+        counts = scipy.sparse.load_npz(artifact_dir / TFIDF_MATRIX_ARTIFACT_NAME).tocsr()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Discarding unreadable TF-IDF counts: {str(e)}")
+        return None
+    if counts.shape[1] != len(vocab["terms"]):
+        return None
+    return ChunkTermCounts(vocab["terms"], counts, TFIDF_PARAMS)
+
+
+def _get_tfidf_model(document_id, content_hash, document_text, chunks):
+    """Get the chunk term counts of a document from memory, disk, or by counting them once."""
+    def load_model():
+        model = load_tfidf_model(content_hash)
+        if model is not None and len(model) != len(chunks):
+            # Stored counts were made on a different chunking of the text
+            model = None
+        if model is None:
+            model = build_tfidf_model(list(chunk_texts(document_text, chunks)))
+            if model is None:
+                # Cache the absence too, so the chunks are not checked on every question
+                return False
+            save_tfidf_model(content_hash, model)
+        return model
     
-    words = text.split()
-    chunks = []
+    model = index_cache.get_or_load(
+        "tfidf", document_id, content_hash, load_model, lambda model: model.size_bytes() if model else 0
+    )
+    return model or None
+
+
+def save_sentence_index(content_hash, sentence_index):
+    """Persist a sentence index next to the document's other artifacts."""
+    data = {"version": SENTENCE_INDEX_VERSION, "index": sentence_index.to_dict()}
+    write_artifact_atomically(
+        get_artifact_dir(content_hash) / SENTENCE_INDEX_ARTIFACT_NAME, json.dumps(data).encode("utf-8")
+    )
+
+
+def load_sentence_index(content_hash):
+    """
+    Load a persisted sentence index.
     
-    for i in range(0, len(words), chunk_size - overlap):
-        chunk = ' '.join(words[i:i + chunk_size])
-        if len(chunk.strip()) > 100:  # Only add substantial chunks
-            chunks.append(chunk)
+    Returns:
+        SentenceIndex: The index, or None if it is not stored or was built by other code
+    """
+    try:
+        with open(get_artifact_dir(content_hash) / SENTENCE_INDEX_ARTIFACT_NAME, "rb") as f:
+            data = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Discarding unreadable sentence index: {str(e)}")
+        return None
+    if data.get("version") != SENTENCE_INDEX_VERSION:
+        return None
+    return SentenceIndex.from_dict(data["index"])
+
+
+def _get_sentence_index(document_id, content_hash, document_text, chunks):
+    """Get the sentence index of a document from memory, disk, or by building it once."""
+    def load_index():
+        sentence_index = load_sentence_index(content_hash)
+        if sentence_index is not None and len(sentence_index.chunk_starts) != len(chunks):
+            # Stored index was built on a different chunking of the text
+            sentence_index = None
+        if sentence_index is None:
+            sentence_index = SentenceIndex.build(document_text, chunks)
+            save_sentence_index(content_hash, sentence_index)
+        return sentence_index
     
-    return chunks
+    return index_cache.get_or_load(
+        "sentences", document_id, content_hash, load_index, lambda value: value.size_bytes()
+    )
+
+
+def _chunk_stage(document, document_text, content_hash):
+    """Ingestion stage: clean and chunk a newly uploaded document."""
+    _get_cleaned_chunks(document.id, content_hash, lambda: document_text)
+
+
+def _tfidf_stage(document, document_text, content_hash):
+    """Ingestion stage: count and persist the chunk terms of a newly uploaded document."""
+    chunks = _get_cleaned_chunks(document.id, content_hash, lambda: document_text)
+    with _open_cleaned_text(content_hash, lambda: document_text) as cleaned_text:
+        _get_tfidf_model(document.id, content_hash, cleaned_text, chunks)
+
+
+def _sentence_stage(document, document_text, content_hash):
+    """Ingestion stage: index the meaningful sentences of a newly uploaded document."""
+    chunks = _get_cleaned_chunks(document.id, content_hash, lambda: document_text)
+    with _open_cleaned_text(content_hash, lambda: document_text) as cleaned_text:
+        _get_sentence_index(document.id, content_hash, cleaned_text, chunks)
+
+
+register_ingest_stage("chunks", _chunk_stage)
+register_ingest_stage("tfidf", _tfidf_stage)
+register_ingest_stage("sentences", _sentence_stage)
+
+
+def _fit_similarities(chunks, question):
+    """
+    Score chunks against a question by fitting a TF-IDF model on the spot.
+    Only used when the document has no chunk term counts (no substantial chunks).
+    """
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+    
+    # Create vectors for chunks and question
+    all_text = chunks + [question]
+    tfidf_matrix = vectorizer.fit_transform(all_text)
+    
+    # Calculate similarity between question and each chunk
+    question_vector = tfidf_matrix[-1]
+    chunk_vectors = tfidf_matrix[:-1]
+    return cosine_similarity(question_vector, chunk_vectors)[0]
+
+
+def _distinct_sentences(document_text, sentence_index, positions, count=3):
+    """Get the first `count` distinct sentences at the given positions (chunks overlap)."""
+    sentences = []
+    for position in positions:
+        sentence = sentence_index.sentence(document_text, position)
+        if sentence not in sentences:
+            sentences.append(sentence)
+            if len(sentences) == count:
+                break
+    return sentences
+
+
+def _join_sentences(sentences):
+    """Join answer sentences into one answer."""
+    answer = ". ".join(sentences)
+    if not answer.endswith('.'):
+        answer += "."
+    return answer
+
+
+def _answer_from_chunks(document_text, chunks, sentence_index, question, term_counts=None):
+    """
+    Build an answer from a document's cleaned text, chunks and sentence index.
+    
+    Args:
+        document_text (TextBuffer): The cleaned document text
+        chunks (ChunkTable): The document's chunks (byte offsets into document_text)
+        sentence_index (SentenceIndex): The sentence index built over the chunks
+        question (str): The question to answer
+        term_counts (ChunkTermCounts): The chunk term counts, if available
+    
+    Returns:
+        str: The answer
+    """
+    if len(document_text) < 50:
+        answer = "The document doesn't contain enough text to answer questions."
+    else:
+        if not chunks:
+            # Fallback to sentences if chunking fails: the first 1000 characters, as a
+            # byte span (a character takes at most 4 bytes in UTF-8)
+            chunks = [Chunk(0, len(document_text[:4000][:1000].encode("utf-8")), None, None)]
+            sentence_index = SentenceIndex.build(document_text, chunks)
+        
+        try:
+            # Score from the stored term counts when available
+            if term_counts is not None:
+                similarities = term_counts.similarities(question)
+            else:
+                similarities = _fit_similarities(list(chunk_texts(document_text, chunks)), question)
+            
+            # Get the 2 most relevant chunks
+            relevant_positions = [int(i) for i in similarities.argsort()[-2:][::-1]]
+            
+            # Their meaningful sentences sharing terms with the question, best BM25 score first
+            matches = sentence_index.search(question, chunk_positions=relevant_positions)
+            
+            if matches:
+                answer = _join_sentences(_distinct_sentences(document_text, sentence_index, [position for position, _ in matches]))
+            else:
+                # No keyword matches, return the first meaningful sentences of the relevant chunks
+                positions = [
+                    position for chunk_position in relevant_positions
+                    for position in sentence_index.chunk_sentences(chunk_position)
+                ]
+                if positions:
+                    answer = _join_sentences(_distinct_sentences(document_text, sentence_index, positions))
+                else:
+                    # No meaningful sentences, return cleaned chunk
+                    chunk = chunks[relevant_positions[0]]
+                    answer = document_text[chunk.start:chunk.end][:500]
+                    if not answer.endswith('.'):
+                        answer += "..."
+        
+        except Exception as e:
+            print(f"Error in TF-IDF processing: {str(e)}")
+            # Fallback: best matching sentences of the whole document
+            matches = sentence_index.search(question, k=10)
+            
+            if matches:
+                answer = _join_sentences(_distinct_sentences(document_text, sentence_index, [position for position, _ in matches]))
+            elif len(sentence_index):
+                # No matches, return first meaningful sentences from document
+                answer = _join_sentences(_distinct_sentences(document_text, sentence_index, range(len(sentence_index))))
+            else:
+                answer = document_text[chunks[0].start:chunks[0].end][:500]
+                if not answer.endswith('.'):
+                    answer += "..."
+    
+    return answer
 
 
 def simple_answer_question(document_id: int, question: str, db: Session):
@@ -133,152 +392,56 @@ def simple_answer_question(document_id: int, question: str, db: Session):
         if not document:
             raise ValueError(f"Document with ID {document_id} not found")
         
-        # Get the document text
-        document_text = get_document_text(document_id, db)
-        
-        # Clean the text
-        document_text = clean_text(document_text)
-        
-        if len(document_text) < 50:
-            answer = "The document doesn't contain enough text to answer questions."
-        else:
-            # Split into chunks for better context
-            chunks = split_into_chunks(document_text, chunk_size=500, overlap=100)
-            
-            if not chunks:
-                # Fallback to sentences if chunking fails
-                chunks = [document_text[:1000]]
-            
-            try:
-                # Extract keywords from question
-                question_keywords = extract_keywords(question)
-                
-                # Use TF-IDF with better parameters
-                vectorizer = TfidfVectorizer(
-                    stop_words='english',
-                    max_features=200,
-                    ngram_range=(1, 2),
-                    min_df=1,
-                    max_df=0.95
-                )
-                
-                # Create vectors for chunks and question
-                all_text = chunks + [question]
-                tfidf_matrix = vectorizer.fit_transform(all_text)
-                
-                # Calculate similarity between question and each chunk
-                question_vector = tfidf_matrix[-1]
-                chunk_vectors = tfidf_matrix[:-1]
-                similarities = cosine_similarity(question_vector, chunk_vectors)[0]
-                
-                # Get top 3 most relevant chunks
-                top_indices = similarities.argsort()[-3:][::-1]
-                
-                # Get the best matching chunks
-                relevant_chunks = [chunks[i] for i in top_indices[:2]]
-                
-                # Extract meaningful sentences from these chunks
-                all_sentences = []
-                for chunk in relevant_chunks:
-                    sentences = re.split(r'[.!?]+', chunk)
-                    # Filter for meaningful sentences only
-                    meaningful = [s.strip() for s in sentences if is_meaningful_sentence(s)]
-                    all_sentences.extend(meaningful)
-                
-                if all_sentences:
-                    # Find sentences that contain question keywords
-                    scored_sentences = []
-                    for sentence in all_sentences:
-                        sentence_lower = sentence.lower()
-                        # Score based on keyword matches
-                        score = sum(1 for keyword in question_keywords if keyword in sentence_lower)
-                        if score > 0:  # Only include sentences with keywords
-                            scored_sentences.append((score, sentence))
-                    
-                    if scored_sentences:
-                        # Sort by score and get top 3
-                        scored_sentences.sort(reverse=True, key=lambda x: x[0])
-                        answer_sentences = [s[1] for s in scored_sentences[:3]]
-                        answer = ". ".join(answer_sentences)
-                        if not answer.endswith('.'):
-                            answer += "."
-                    else:
-                        # No keyword matches, return most relevant meaningful sentences
-                        answer = ". ".join(all_sentences[:3])
-                        if not answer.endswith('.'):
-                            answer += "."
-                else:
-                    # No meaningful sentences, return cleaned chunk
-                    answer = relevant_chunks[0][:500]
-                    if not answer.endswith('.'):
-                        answer += "..."
-            
-            except Exception as e:
-                print(f"Error in TF-IDF processing: {str(e)}")
-                # Fallback: simple keyword search
-                question_lower = question.lower()
-                question_words = [w for w in question_lower.split() if len(w) > 3]
-                
-                # Search for chunks containing question words
-                best_chunks = []
-                for chunk in chunks:
-                    chunk_lower = chunk.lower()
-                    score = sum(1 for word in question_words if word in chunk_lower)
-                    if score > 0:
-                        best_chunks.append((score, chunk))
-                
-                if best_chunks:
-                    # Sort by score and get best chunk
-                    best_chunks.sort(reverse=True, key=lambda x: x[0])
-                    # Extract meaningful sentences from best chunk
-                    sentences = re.split(r'[.!?]+', best_chunks[0][1])
-                    meaningful = [s.strip() for s in sentences if is_meaningful_sentence(s)]
-                    
-                    if meaningful:
-                        answer = ". ".join(meaningful[:3])
-                        if not answer.endswith('.'):
-                            answer += "."
-                    else:
-                        answer = best_chunks[0][1][:500]
-                        if not answer.endswith('.'):
-                            answer += "..."
-                else:
-                    # No matches, return first meaningful sentences from document
-                    sentences = re.split(r'[.!?]+', document_text)
-                    meaningful = [s.strip() for s in sentences if is_meaningful_sentence(s)]
-                    
-                    if meaningful:
-                        answer = ". ".join(meaningful[:3])
-                        if not answer.endswith('.'):
-                            answer += "."
-                    else:
-                        answer = chunks[0][:500] if chunks else document_text[:500]
-                        if not answer.endswith('.'):
-                            answer += "..."
+        # Get the cleaned text, chunks, term counts and sentence index (built once per document)
+        with get_cleaned_chunks(document, db) as (document_text, chunks, term_counts, sentence_index):
+            answer = _answer_from_chunks(document_text, chunks, sentence_index, question, term_counts)
         
         # Store the QA pair
-        qa_pair = QAPair(
-            document_id=document_id,
-            question=question,
-            answer=answer
-        )
-        
-        db.add(qa_pair)
-        db.commit()
-        db.refresh(qa_pair)
-        
-        return {
-            "question": question,
-            "answer": answer,
-            "document_id": document_id,
-            "document_name": document.filename,
-            "qa_pair_id": qa_pair.id
-        }
+        return store_qa_pair(document, question, answer, db)
     except Exception as e:
         print(f"Error in simple_answer_question: {str(e)}")
         raise
 
 
+# Name shared by every QA backend (see qa_backends)
+answer_question = simple_answer_question
+
+
+def answer_questions_batch(document_id: int, questions: list, db: Session):
+    """
+    Answer many questions about one document.
+    The document is looked up and its cleaned chunks and term counts loaded once
+    for the whole batch.
+    
+    Returns:
+        list: One result per question, in order, as returned by simple_answer_question
+    """
+    document = get_document_by_id(document_id, db)
+    if not document:
+        raise ValueError(f"Document with ID {document_id} not found")
+    
+    with get_cleaned_chunks(document, db) as (document_text, chunks, term_counts, sentence_index):
+        answers = [
+            _answer_from_chunks(document_text, chunks, sentence_index, question, term_counts)
+            for question in questions
+        ]
+    
+    return store_qa_pairs(document, questions, answers, db)
+
+
+def stream_answer_question(document_id: int, question: str, db: Session):
+    """
+    Streaming variant of simple_answer_question.
+    Keyword matching produces the whole answer at once, so it is sent as a single token.
+    
+    Yields:
+        tuple: ("token", answer), then ("done", result)
+    """
+    result = simple_answer_question(document_id, question, db)
+    yield ("token", result["answer"])
+    yield ("done", result)
+
+
 def get_qa_history(document_id: int, db: Session, limit: int = 10):
     """Get QA history for a document."""
     document = get_document_by_id(document_id, db)
@@ -0,0 +1,93 @@
+"""
+Retrieval service for the PDF Quest API.
+This file builds, persists and caches the per-document BM25 keyword index used to select
+the context sent to remote LLMs (see app/utils/context_packing.py).
+"""
+import json
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+
+from app.services.document_service import get_document_content_hash, load_document_text, open_document_text
+from app.services.index_cache import index_cache
+from app.utils.artifact_store import get_artifact_dir, read_page_offsets, write_artifact_atomically
+from app.utils.bm25 import BM25Index
+from app.utils.chunking import ChunkTable
+from app.utils.context_packing import CONTEXT_CHUNK_TOKENS, CONTEXT_CHUNK_OVERLAP_TOKENS, KeywordIndex
+
+# Name of the persisted keyword index inside a document's artifact directory
+KEYWORD_INDEX_ARTIFACT_NAME = "bm25.json"
+
+# Bump when tokenization or chunking changes, so indexes built by older code are rebuilt
+KEYWORD_INDEX_VERSION = 3
+
+
+def save_keyword_index(content_hash, keyword_index):
+    """Persist a keyword index next to the document's other artifacts."""
+    data = {
+        "version": KEYWORD_INDEX_VERSION,
+        "chunk_tokens": CONTEXT_CHUNK_TOKENS,
+        "chunk_overlap_tokens": CONTEXT_CHUNK_OVERLAP_TOKENS,
+        "chunks": keyword_index.chunks.to_list(),
+        "bm25": keyword_index.bm25.to_dict(),
+    }
+    write_artifact_atomically(
+        get_artifact_dir(content_hash) / KEYWORD_INDEX_ARTIFACT_NAME, json.dumps(data).encode("utf-8")
+    )
+
+
+def load_keyword_index(content_hash):
+    """
+    Load a persisted keyword index.
+
+    Returns:
+        KeywordIndex: The index, or None if it is not stored or was built with other settings
+    """
+    try:
+        with open(get_artifact_dir(content_hash) / KEYWORD_INDEX_ARTIFACT_NAME, "rb") as f:
+            data = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Discarding unreadable keyword index: {str(e)}")
+        return None
+    if (data.get("version") != KEYWORD_INDEX_VERSION
+            or data.get("chunk_tokens") != CONTEXT_CHUNK_TOKENS
+            or data.get("chunk_overlap_tokens") != CONTEXT_CHUNK_OVERLAP_TOKENS):
+        return None
+    return KeywordIndex(ChunkTable.from_list(data["chunks"]), BM25Index.from_dict(data["bm25"]))
+
+
+def _get_keyword_index(document_id, content_hash, load_text):
+    """Get the keyword index of a document from memory, disk, or by building it once."""
+    def load_index():
+        keyword_index = load_keyword_index(content_hash)
+        if keyword_index is None:
+            keyword_index = KeywordIndex.build(load_text(), read_page_offsets(content_hash))
+            save_keyword_index(content_hash, keyword_index)
+        return keyword_index
+
+    return index_cache.get_or_load(
+        "bm25", document_id, content_hash, load_index, lambda value: value.size_bytes()
+    )
+
+
+@contextmanager
+def get_keyword_index(document, db: Session):
+    """
+    Open the text and keyword index of a document; the index is cached in memory.
+
+    The text is memory-mapped rather than loaded: only the chunks selected for
+    the context are decoded. It is only read in full when the index has to be built.
+    Use it in a with statement: the text is unmapped when the block ends.
+
+    Yields:
+        tuple: (document text as a TextBuffer, KeywordIndex)
+    """
+    content_hash = get_document_content_hash(document, db)
+    with open_document_text(document, db) as text:
+        yield text, _get_keyword_index(document.id, content_hash, lambda: load_document_text(document, db))
+
+
+def keyword_index_stage(document, document_text, content_hash):
+    """Ingestion stage: chunk and index a newly uploaded document for retrieval."""
+    _get_keyword_index(document.id, content_hash, lambda: document_text)
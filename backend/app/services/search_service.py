@@ -0,0 +1,249 @@
+"""
+Search service for the PDF Quest API.
+This file provides semantic search across all of a user's documents. The chunk vectors
+of the per-document FAISS indexes are merged into one per-user index, so a query is a
+single index lookup instead of one search per document.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from bisect import bisect_right
+
+import faiss
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import ARTIFACT_PATH, SEARCH_HNSW_MIN_VECTORS
+from app.database import Document, DocumentText, IngestionJob
+from app.services import qa_service
+from app.services.index_cache import index_cache
+from app.utils.artifact_store import write_artifact_atomically
+
+# Directory (inside ARTIFACT_PATH) holding the per-user search indexes
+SEARCH_INDEX_DIR = "search"
+
+# Neighbours per node in the HNSW graph
+HNSW_M = 32
+
+
+class UserSearchIndex:
+    """
+    A FAISS index over the chunks of every document a user owns.
+
+    Rows are stored contiguously per document content: rows
+    [row_offsets[i], row_offsets[i] + counts[i]) belong to content_hashes[i],
+    in the same order as that document's own FAISS index.
+    """
+
+    def __init__(self, index, content_hashes, counts):
+        self.index = index
+        self.content_hashes = content_hashes
+        self.counts = counts
+        self.row_offsets = np.cumsum([0] + counts[:-1]).tolist() if counts else []
+
+    def locate(self, row):
+        """Map a row of the combined index to (content_hash, position in the document index)."""
+        i = bisect_right(self.row_offsets, row) - 1
+        return self.content_hashes[i], row - self.row_offsets[i]
+
+    def size_bytes(self):
+        """Approximate memory used by the index."""
+        vector_bytes = self.index.ntotal * self.index.d * 4
+        # HNSW keeps a neighbour graph on top of the vectors
+        if isinstance(self.index, faiss.IndexHNSWFlat):
+            vector_bytes += self.index.ntotal * HNSW_M * 2 * 4
+        return vector_bytes
+
+
+def _get_user_index_dir(user_id: str):
+    """Get the directory of a user's search index (named by a hash of the user ID)."""
+    user_key = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+    return ARTIFACT_PATH / SEARCH_INDEX_DIR / user_key
+
+
+def _get_index_version(content_hash: str):
+    """
+    Identify the saved FAISS index of a document content.
+
+    Returns:
+        str: Size and modification time of the index file (they change whenever the
+        index is rebuilt), or None if the content has no saved index
+    """
+    try:
+        stat = os.stat(qa_service.get_index_dir(content_hash) / "index.faiss")
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def _get_indexed_documents(user_id: str, db: Session):
+    """
+    Get the user's ingested documents that have a saved FAISS index, grouped by content.
+
+    Documents still being ingested are left out, so searching never builds a
+    document index on the request path.
+
+    Returns:
+        tuple: (dict of content_hash -> list of documents with that content,
+        dict of content_hash -> index version)
+    """
+    rows = db.query(Document, DocumentText.content_hash).join(
+        DocumentText, DocumentText.document_id == Document.id
+    ).outerjoin(
+        IngestionJob, IngestionJob.document_id == Document.id
+    ).filter(
+        Document.user_id == user_id,
+        # Documents uploaded before background ingestion have no job and count as ready
+        or_(IngestionJob.id.is_(None), IngestionJob.status == IngestionJob.READY)
+    ).order_by(Document.id).all()
+
+    documents_by_hash = {}
+    index_versions = {}
+    for document, content_hash in rows:
+        if content_hash not in index_versions:
+            index_versions[content_hash] = _get_index_version(content_hash)
+        if index_versions[content_hash] is not None:
+            documents_by_hash.setdefault(content_hash, []).append(document)
+    return documents_by_hash, {
+        content_hash: version for content_hash, version in index_versions.items() if version is not None
+    }
+
+
+def _build_user_index(documents_by_hash, db: Session):
+    """Merge the vectors of each document's FAISS index into one user index (no re-embedding)."""
+    content_hashes = sorted(documents_by_hash)
+    vectors = []
+    counts = []
+    for content_hash in content_hashes:
+        vector_store = qa_service.get_document_index(documents_by_hash[content_hash][0], db)
+        count = vector_store.index.ntotal
+        vectors.append(vector_store.index.reconstruct_n(0, count))
+        counts.append(count)
+
+    dimension = qa_service.get_embedding_dimension()
+    matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, dimension), dtype=np.float32)
+
+    # Exact search is fastest for small collections; HNSW keeps large ones sub-linear
+    if len(matrix) >= SEARCH_HNSW_MIN_VECTORS:
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+    else:
+        index = faiss.IndexFlatL2(dimension)
+    index.add(matrix)
+
+    return UserSearchIndex(index, content_hashes, counts)
+
+
+def _save_user_index(user_id: str, fingerprint: str, user_index: UserSearchIndex):
+    """Save a user's search index and its manifest."""
+    index_dir = _get_user_index_dir(user_id)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=index_dir, prefix=".tmp-")
+    os.close(fd)
+    try:
+        faiss.write_index(user_index.index, tmp_path)
+        os.replace(tmp_path, index_dir / "index.faiss")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    manifest = {
+        "fingerprint": fingerprint,
+        "content_hashes": user_index.content_hashes,
+        "counts": user_index.counts,
+    }
+    write_artifact_atomically(index_dir / "manifest.json", json.dumps(manifest).encode("utf-8"))
+
+
+def _load_user_index(user_id: str, fingerprint: str):
+    """Load a user's saved search index if it was built for the same set of documents."""
+    index_dir = _get_user_index_dir(user_id)
+    try:
+        with open(index_dir / "manifest.json", "rb") as f:
+            manifest = json.loads(f.read())
+        if manifest.get("fingerprint") != fingerprint:
+            return None
+        index = faiss.read_index(str(index_dir / "index.faiss"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Discarding unreadable search index for user: {str(e)}")
+        return None
+    return UserSearchIndex(index, manifest["content_hashes"], manifest["counts"])
+
+
+def get_user_index(user_id: str, db: Session):
+    """
+    Get the search index over a user's documents, rebuilding it only when they change.
+
+    Returns:
+        tuple: (UserSearchIndex, dict of content_hash -> documents)
+    """
+    documents_by_hash, index_versions = _get_indexed_documents(user_id, db)
+
+    # The index is identified by the document indexes it merges
+    fingerprint = hashlib.sha256("\n".join(
+        f"{content_hash} {index_versions[content_hash]}" for content_hash in sorted(documents_by_hash)
+    ).encode("utf-8")).hexdigest()
+
+    def load_index():
+        user_index = _load_user_index(user_id, fingerprint)
+        if user_index is None:
+            user_index = _build_user_index(documents_by_hash, db)
+            _save_user_index(user_id, fingerprint, user_index)
+        return user_index
+
+    user_index = index_cache.get_or_load(
+        "search", user_id, fingerprint, load_index, lambda value: value.size_bytes()
+    )
+    return user_index, documents_by_hash
+
+
+def search_documents(user_id: str, query: str, db: Session, k: int = 5):
+    """
+    Find the chunks most relevant to a query across all of a user's documents.
+
+    Args:
+        user_id (str): The ID of the user whose documents are searched
+        query (str): The search query
+        db (Session): Database session
+        k (int): Maximum number of results
+
+    Returns:
+        list: Ranked results with document ID and name, page number, chunk content
+        and L2 distance (lower is closer)
+    """
+    if qa_service.MOCK_MODE:
+        return []
+
+    user_index, documents_by_hash = get_user_index(user_id, db)
+    if user_index.index.ntotal == 0:
+        return []
+
+    query_vector = np.array([qa_service.embeddings.embed_query(query)], dtype=np.float32)
+    distances, rows = user_index.index.search(query_vector, k)
+
+    results = []
+    for distance, row in zip(distances[0], rows[0]):
+        if row == -1:
+            continue
+        content_hash, position = user_index.locate(int(row))
+        documents = documents_by_hash[content_hash]
+
+        # Resolve the chunk text from the (cached) per-document index
+        vector_store = qa_service.get_document_index(documents[0], db)
+        chunk = vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+
+        # Identical files uploaded more than once produce one result per document
+        for document in documents:
+            results.append({
+                "document_id": document.id,
+                "document_name": document.filename,
+                "page": chunk.metadata.get("page"),
+                "content": chunk.page_content,
+                "distance": float(distance),
+            })
+
+    return results[:k]
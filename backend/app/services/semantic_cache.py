@@ -0,0 +1,284 @@
+"""
+Semantic question cache for the PDF Quest API.
+This file provides the near-duplicate question cache used by the embedding QA backend.
+Previously answered questions about a document content are kept in a small FAISS index;
+a new question whose embedding is close enough to one of them reuses its answer. Question
+embeddings are stored with the answers, so indexes are rebuilt without embedding again.
+"""
+import math
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+import faiss
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import AnswerCacheEntry, QAPair, QuestionVector
+from app.services.index_cache import index_cache
+
+# Width of the similarity buckets reported in the statistics
+SIMILARITY_BUCKET = 0.05
+
+
+class QuestionIndex:
+    """
+    The answered questions of one document content, searchable by cosine similarity.
+
+    Vectors are L2-normalized, so the inner product of the flat index is the cosine similarity.
+    Answers are added oldest first, with the time they were stored, so the expired ones
+    are always at the front.
+    """
+
+    def __init__(self, dimension):
+        self.index = faiss.IndexFlatIP(dimension)
+        self.questions = []
+        self.answers = []
+        self.stored_at = []  # Unix time each answer was stored
+        self._lock = threading.Lock()
+
+    def add(self, vectors, questions, answers, stored_at):
+        """Add answered questions (vectors must already be normalized)."""
+        if not questions:
+            return
+        with self._lock:
+            self.index.add(vectors)
+            self.questions.extend(questions)
+            self.answers.extend(answers)
+            self.stored_at.extend(stored_at)
+
+    def _expire(self, oldest):
+        """Drop the answers stored before `oldest` (Unix time)."""
+        expired = bisect_right(self.stored_at, oldest)
+        if expired:
+            self.index.remove_ids(np.arange(expired, dtype=np.int64))
+            del self.questions[:expired]
+            del self.answers[:expired]
+            del self.stored_at[:expired]
+
+    def nearest(self, vectors, oldest=None):
+        """
+        Find the closest answered question for each query vector.
+
+        Args:
+            vectors: Normalized query vectors
+            oldest (float): Unix time before which answers have expired (None: never)
+
+        Returns:
+            list: (similarity, question, answer) per query, or None when the index is empty
+        """
+        with self._lock:
+            if oldest is not None:
+                self._expire(oldest)
+            if self.index.ntotal == 0:
+                return [None] * len(vectors)
+            similarities, positions = self.index.search(vectors, 1)
+            return [
+                (float(s[0]), self.questions[int(p[0])], self.answers[int(p[0])])
+                for s, p in zip(similarities, positions)
+            ]
+
+    def size_bytes(self):
+        """Approximate memory used by the index."""
+        text_bytes = sum(len(q) + len(a) for q, a in zip(self.questions, self.answers))
+        return self.index.ntotal * self.index.d * 4 + text_bytes
+
+
+def _normalize(vectors):
+    """Convert embeddings to a normalized float32 matrix."""
+    matrix = np.array(vectors, dtype=np.float32)
+    if matrix.size:
+        faiss.normalize_L2(matrix)
+    return matrix
+
+
+class SemanticCache:
+    """
+    Near-duplicate question cache in front of one QA backend.
+
+    The question index of a document content is rebuilt from the answer_cache table (the
+    answers this backend and model produced for that content) and the stored question
+    vectors, and kept in the shared index cache, where every document with the same
+    content uses it. Answers older than the answer cache TTL are never reused.
+    """
+
+    def __init__(self, threshold, embed_documents, dimension, backend, model, ttl_seconds=0):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.embed_documents = embed_documents
+        self.dimension = dimension
+        self.backend = backend
+        self.model = model
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.hit_similarity_total = 0.0
+        # Best similarity seen per lookup, bucketed, to help choose the threshold
+        self.similarity_buckets = {}
+
+    def _load_index(self, content_hash: str, db: Session):
+        """
+        Build the question index of a document content from previously cached answers.
+
+        Only questions cached before their vectors were stored are embedded (once: their
+        vectors are stored too).
+        """
+        query = db.query(
+            QAPair.id, QAPair.question, QAPair.answer, QuestionVector.vector, AnswerCacheEntry.created_at
+        ).join(
+            AnswerCacheEntry, AnswerCacheEntry.qa_pair_id == QAPair.id
+        ).outerjoin(
+            QuestionVector, QuestionVector.qa_pair_id == QAPair.id
+        ).filter(
+            AnswerCacheEntry.content_hash == content_hash,
+            AnswerCacheEntry.backend == self.backend,
+            AnswerCacheEntry.model == self.model
+        )
+        if self.ttl_seconds:
+            # Same expiry as the answer cache
+            query = query.filter(
+                AnswerCacheEntry.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            )
+        rows = query.order_by(AnswerCacheEntry.created_at).all()
+
+        question_index = QuestionIndex(self.dimension)
+        if not rows:
+            return question_index
+
+        vectors = np.zeros((len(rows), self.dimension), dtype=np.float32)
+        missing = {}  # qa_pair_id -> positions of the rows without a stored vector
+        for position, (qa_pair_id, question, _, vector, _) in enumerate(rows):
+            stored = np.frombuffer(vector, dtype=np.float32) if vector is not None else None
+            if stored is not None and stored.size == self.dimension:
+                vectors[position] = stored
+            else:
+                missing.setdefault(qa_pair_id, []).append(position)
+
+        if missing:
+            qa_pair_ids = list(missing)
+            embedded = _normalize(self.embed_documents([rows[missing[i][0]][1] for i in qa_pair_ids]))
+            for qa_pair_id, vector in zip(qa_pair_ids, embedded):
+                vectors[missing[qa_pair_id]] = vector
+            self.save_vectors(qa_pair_ids, embedded, db)
+
+        question_index.add(
+            vectors, [row[1] for row in rows], [row[2] for row in rows],
+            # created_at is a naive UTC datetime
+            [row[4].replace(tzinfo=timezone.utc).timestamp() for row in rows]
+        )
+        return question_index
+
+    def get_index(self, content_hash: str, db: Session):
+        """Get the question index of a document content, loading it on first use."""
+        # Keyed by content only (no document ID): documents with the same content share it
+        return index_cache.get_or_load(
+            "questions", None, content_hash,
+            lambda: self._load_index(content_hash, db),
+            lambda value: value.size_bytes()
+        )
+
+    def save_vectors(self, qa_pair_ids, vectors, db: Session):
+        """
+        Store the embeddings of answered questions.
+
+        Args:
+            qa_pair_ids (list): The stored QA pairs of the questions
+            vectors (list): Embedding of each question, in the same order
+            db (Session): Database session
+        """
+        if not qa_pair_ids:
+            return
+        db.add_all([
+            QuestionVector(qa_pair_id=qa_pair_id, vector=vector.tobytes())
+            for qa_pair_id, vector in zip(qa_pair_ids, _normalize(vectors))
+        ])
+        try:
+            db.commit()
+        except IntegrityError:
+            # Stale vectors (another embedding model) or stored concurrently by another
+            # worker: the questions are embedded again on a later load
+            db.rollback()
+
+    def _record(self, similarity, hit):
+        with self._lock:
+            if similarity is not None:
+                bucket = f"{math.floor(round(similarity / SIMILARITY_BUCKET, 6)) * SIMILARITY_BUCKET:.2f}"
+                self.similarity_buckets[bucket] = self.similarity_buckets.get(bucket, 0) + 1
+            if hit:
+                self.hits += 1
+                self.hit_similarity_total += similarity
+            else:
+                self.misses += 1
+
+    def lookup_many(self, content_hash: str, question_vectors, db: Session):
+        """
+        Find previously answered questions similar enough to reuse their answers.
+
+        Args:
+            content_hash (str): Content hash of the document the questions are about
+            question_vectors (list): Embedding of each question
+            db (Session): Database session
+
+        Returns:
+            list: One entry per question, in order: a dict with the cached "answer",
+            the "matched_question" and its "similarity", or None on a miss
+        """
+        question_index = self.get_index(content_hash, db)
+        # The index stays in memory indefinitely, so expired answers are dropped on lookup
+        oldest = time.time() - self.ttl_seconds if self.ttl_seconds else None
+        matches = question_index.nearest(_normalize(question_vectors), oldest)
+
+        results = []
+        for match in matches:
+            if match is None:
+                self._record(None, False)
+                results.append(None)
+                continue
+            similarity, question, answer = match
+            hit = similarity >= self.threshold
+            self._record(similarity, hit)
+            results.append({
+                "answer": answer,
+                "matched_question": question,
+                "similarity": similarity,
+            } if hit else None)
+        return results
+
+    def lookup(self, content_hash: str, question_vector, db: Session):
+        """Look up one question (see lookup_many)."""
+        return self.lookup_many(content_hash, [question_vector], db)[0]
+
+    def add_many(self, content_hash: str, question_vectors, results, db: Session):
+        """
+        Make newly answered questions available to later lookups.
+
+        Args:
+            content_hash (str): Content hash of the document the questions are about
+            question_vectors (list): Embedding of each question
+            results (list): The stored QA result of each question (holding "question",
+                "answer" and "qa_pair_id"), in the same order
+            db (Session): Database session
+        """
+        self.save_vectors([result["qa_pair_id"] for result in results], question_vectors, db)
+        question_index = self.get_index(content_hash, db)
+        question_index.add(
+            _normalize(question_vectors),
+            [result["question"] for result in results],
+            [result["answer"] for result in results],
+            [time.time()] * len(results)
+        )
+
+    def stats(self):
+        """Get hit/miss counters and the distribution of best-match similarities."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "mean_hit_similarity": self.hit_similarity_total / self.hits if self.hits else None,
+                "best_similarity_buckets": dict(sorted(self.similarity_buckets.items())),
+            }
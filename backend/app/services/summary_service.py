@@ -0,0 +1,223 @@
+"""
+Summary service for the PDF Quest API.
+This file provides map-reduce summarization of whole documents: the text is split into
+chunks that are summarized in parallel (map), then the partial summaries are combined,
+level by level, into the final summary (reduce). Chunk summaries and final summaries are
+stored as artifacts, so repeat requests and new length/style options reuse earlier work.
+"""
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import LLM_BATCH_CONCURRENCY
+from app.utils.artifact_store import get_artifact_dir, write_artifact_atomically
+from app.utils.chunking import chunk_document, chunk_texts
+
+# Chunking of the document for the map step (estimated tokens)
+SUMMARY_CHUNK_TOKENS = 1000
+SUMMARY_CHUNK_OVERLAP_TOKENS = 50
+
+# Partial summaries are combined in groups no longer than this (characters)
+REDUCE_GROUP_CHARS = 6000
+
+# Directory (inside a document's artifact directory) holding summaries
+SUMMARY_ARTIFACT_DIR = "summaries"
+
+# Bump when the prompts change, so summaries produced by older prompts are not reused
+SUMMARY_PROMPT_VERSION = 1
+
+# Summary options: length and style of the final summary
+SUMMARY_LENGTHS = {
+    "short": "one concise paragraph of three to four sentences",
+    "medium": "about two paragraphs",
+    "long": "a detailed summary of four to six paragraphs",
+}
+SUMMARY_STYLES = {
+    "paragraph": "Write it as prose.",
+    "bullets": "Write it as a bulleted list of the key points.",
+}
+
+
+def _map_prompt(chunk):
+    """Prompt summarizing one part of a document."""
+    return f"""Summarize the following part of a document in a few sentences.
+Keep the key facts, names and numbers.
+
+{chunk}
+
+Summary:"""
+
+
+def _reduce_prompt(summaries, length=None, style=None):
+    """Prompt combining summaries of consecutive parts of a document."""
+    if length is None:
+        # Intermediate level: keep the result short enough to be combined again
+        instruction = "Combine them into a single concise summary."
+    else:
+        instruction = f"Combine them into a summary of the whole document: {SUMMARY_LENGTHS[length]}. {SUMMARY_STYLES[style]}"
+    joined = "\n\n".join(summaries)
+    return f"""The following are summaries of consecutive parts of a document.
+{instruction}
+
+{joined}
+
+Summary:"""
+
+
+def _direct_prompt(text, length, style):
+    """Prompt summarizing a document short enough to fit in one chunk."""
+    return f"""Please provide a summary of the following document: {SUMMARY_LENGTHS[length]}. {SUMMARY_STYLES[style]}
+
+{text}
+
+Summary:"""
+
+
+def _summary_dir(content_hash):
+    return get_artifact_dir(content_hash) / SUMMARY_ARTIFACT_DIR
+
+
+def _chunk_summaries_path(content_hash, model):
+    return _summary_dir(content_hash) / f"{model}.v{SUMMARY_PROMPT_VERSION}.chunks.json"
+
+
+def _final_summary_path(content_hash, model, length, style):
+    return _summary_dir(content_hash) / f"{model}.v{SUMMARY_PROMPT_VERSION}.{length}-{style}.txt"
+
+
+def _chunk_key(chunk):
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def load_chunk_summaries(content_hash, model):
+    """
+    Load the stored chunk summaries of a document.
+
+    Returns:
+        dict: SHA-256 of the chunk text -> summary
+    """
+    try:
+        with open(_chunk_summaries_path(content_hash, model), "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Discarding unreadable chunk summaries: {str(e)}")
+        return {}
+
+
+def get_cached_summary(content_hash, model, length, style):
+    """
+    Get a stored final summary.
+
+    Returns:
+        str: The summary, or None if it has not been generated
+    """
+    try:
+        with open(_final_summary_path(content_hash, model, length, style), "rb") as f:
+            return f.read().decode("utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def _summarize_chunks(chunks, content_hash, model, generate):
+    """
+    Map step: summarize every chunk not summarized before, with bounded concurrency.
+
+    Each new summary is stored as soon as it is generated, so an interrupted run
+    (e.g. a request timeout) is resumed by the next one.
+    """
+    summaries = load_chunk_summaries(content_hash, model)
+    keys = [_chunk_key(chunk) for chunk in chunks]
+    missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in summaries}
+    print(f"Summarizing {len(missing)} of {len(chunks)} chunks ({len(chunks) - len(missing)} cached)")
+
+    lock = threading.Lock()
+
+    def summarize(item):
+        key, chunk = item
+        summary = generate(_map_prompt(chunk)).strip()
+        with lock:
+            summaries[key] = summary
+            write_artifact_atomically(
+                _chunk_summaries_path(content_hash, model), json.dumps(summaries).encode("utf-8")
+            )
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=LLM_BATCH_CONCURRENCY) as pool:
+            list(pool.map(summarize, missing.items()))
+
+    return [summaries[key] for key in keys]
+
+
+def _group_summaries(summaries):
+    """
+    Split summaries into consecutive groups of at most REDUCE_GROUP_CHARS characters.
+
+    Summaries longer than half a group are truncated, so every group but the last holds
+    at least two of them and each reduce level strictly shrinks the list.
+    """
+    groups = [[]]
+    size = 0
+    for summary in summaries:
+        summary = summary[:REDUCE_GROUP_CHARS // 2]
+        if groups[-1] and size + len(summary) > REDUCE_GROUP_CHARS:
+            groups.append([])
+            size = 0
+        groups[-1].append(summary)
+        size += len(summary)
+    return groups
+
+
+def _reduce(summaries, length, style, generate):
+    """Reduce step: combine partial summaries level by level until one group is left."""
+    while True:
+        groups = _group_summaries(summaries)
+        if len(groups) == 1:
+            return generate(_reduce_prompt(groups[0], length, style)).strip()
+        with ThreadPoolExecutor(max_workers=LLM_BATCH_CONCURRENCY) as pool:
+            summaries = [summary.strip() for summary in pool.map(
+                lambda group: generate(_reduce_prompt(group)), groups
+            )]
+
+
+def summarize_text(text, content_hash, model, generate, length="short", style="paragraph"):
+    """
+    Summarize a whole document with map-reduce, reusing stored summaries.
+
+    Args:
+        text (str): The document text
+        content_hash (str): Content hash of the document (identifies its artifacts)
+        model (str): Name of the model, part of the cache keys
+        generate: Callable sending a prompt to the model and returning its text
+        length (str): One of SUMMARY_LENGTHS
+        style (str): One of SUMMARY_STYLES
+
+    Returns:
+        str: The summary
+
+    Raises:
+        ValueError: If the length or style is unknown
+    """
+    if length not in SUMMARY_LENGTHS or style not in SUMMARY_STYLES:
+        raise ValueError(f"Unknown summary options: length={length}, style={style}")
+
+    summary = get_cached_summary(content_hash, model, length, style)
+    if summary is not None:
+        return summary
+
+    chunks = list(chunk_texts(text, chunk_document(
+        text, max_tokens=SUMMARY_CHUNK_TOKENS, overlap_tokens=SUMMARY_CHUNK_OVERLAP_TOKENS
+    )))
+    if not chunks:
+        return ""
+
+    if len(chunks) == 1:
+        # Short document: summarize it directly with the requested options
+        summary = generate(_direct_prompt(chunks[0], length, style)).strip()
+    else:
+        summary = _reduce(_summarize_chunks(chunks, content_hash, model, generate), length, style, generate)
+
+    write_artifact_atomically(_final_summary_path(content_hash, model, length, style), summary.encode("utf-8"))
+    return summary
@@ -0,0 +1,278 @@
+"""
+Artifact store utilities for the PDF Quest API.
+This file provides helpers for reading and writing content-addressed document artifacts.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from app.config import ARTIFACT_PATH
+from app.utils.text_buffer import TextBuffer
+
+# Name of the extracted-text artifact inside an artifact directory (plain UTF-8, so it can be memory-mapped)
+TEXT_ARTIFACT_NAME = "text.txt"
+
+# Name of the compressed text artifact written by earlier versions (converted on first read)
+LEGACY_TEXT_ARTIFACT_NAME = "text.txt.gz"
+
+# Name of the per-page character offsets artifact
+PAGES_ARTIFACT_NAME = "pages.json"
+
+# Name of the per-page content hashes artifact (used to diff revised uploads)
+PAGE_HASHES_ARTIFACT_NAME = "page_hashes.json"
+
+# Name of the artifact recording which content a revised upload was derived from
+REVISION_ARTIFACT_NAME = "revision.json"
+
+# Read files in 1 MB blocks when hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path):
+    """
+    Compute the SHA-256 hash of a file without loading it into memory.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        str: Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_artifact_dir(content_hash):
+    """
+    Get the artifact directory for a content hash.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+
+    Returns:
+        Path: Directory holding all artifacts derived from that content
+    """
+    # Shard by the first two characters to keep directories small
+    return Path(ARTIFACT_PATH) / content_hash[:2] / content_hash
+
+
+def write_artifact_atomically(path, data):
+    """
+    Write bytes to a file atomically (write to a temp file, then rename).
+
+    Args:
+        path (Path): Destination path
+        data (bytes): Content to write
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text_artifact(content_hash, text):
+    """
+    Store the extracted text of a document as a UTF-8 artifact.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+        text (str): Extracted text
+    """
+    artifact_dir = get_artifact_dir(content_hash)
+    write_artifact_atomically(artifact_dir / TEXT_ARTIFACT_NAME, text.encode("utf-8"))
+    try:
+        os.remove(artifact_dir / LEGACY_TEXT_ARTIFACT_NAME)
+    except FileNotFoundError:
+        pass
+
+
+def has_text_artifact(content_hash):
+    """Check whether the extracted text of a document is stored."""
+    artifact_dir = get_artifact_dir(content_hash)
+    return (artifact_dir / TEXT_ARTIFACT_NAME).exists() or (artifact_dir / LEGACY_TEXT_ARTIFACT_NAME).exists()
+
+
+def _read_legacy_text_artifact(content_hash):
+    """Load a compressed text artifact and store it again in the current format."""
+    path = get_artifact_dir(content_hash) / LEGACY_TEXT_ARTIFACT_NAME
+    try:
+        with open(path, "rb") as f:
+            text = gzip.decompress(f.read()).decode("utf-8")
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        # A corrupt artifact is treated as missing so it gets rebuilt
+        print(f"Discarding unreadable text artifact {path}: {str(e)}")
+        return None
+    write_text_artifact(content_hash, text)
+    return text
+
+
+def read_text_artifact(content_hash):
+    """
+    Load the extracted text of a document from its artifact.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+
+    Returns:
+        str: The stored text, or None if no artifact exists
+    """
+    path = get_artifact_dir(content_hash) / TEXT_ARTIFACT_NAME
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8")
+    except FileNotFoundError:
+        return _read_legacy_text_artifact(content_hash)
+    except (OSError, UnicodeDecodeError) as e:
+        # A corrupt artifact is treated as missing so it gets rebuilt
+        print(f"Discarding unreadable text artifact {path}: {str(e)}")
+        return None
+
+
+def open_text_artifact(content_hash, name=TEXT_ARTIFACT_NAME):
+    """
+    Memory-map a UTF-8 text artifact of a document.
+
+    Nothing is read or decoded until the returned buffer is sliced, and slices
+    are taken with byte offsets.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+        name (str): Name of the artifact (the extracted text by default)
+
+    Returns:
+        TextBuffer: The mapped text, or None if no artifact exists
+    """
+    path = get_artifact_dir(content_hash) / name
+    if name == TEXT_ARTIFACT_NAME and not path.exists() and _read_legacy_text_artifact(content_hash) is None:
+        return None
+    try:
+        return TextBuffer(path)
+    except FileNotFoundError:
+        return None
+
+
+def write_page_offsets(content_hash, page_offsets):
+    """
+    Store the character offset where each page starts in the extracted text.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+        page_offsets (list): Start offset of each page
+    """
+    path = get_artifact_dir(content_hash) / PAGES_ARTIFACT_NAME
+    write_artifact_atomically(path, json.dumps(page_offsets).encode("utf-8"))
+
+
+def read_page_offsets(content_hash):
+    """
+    Load the per-page character offsets of a document.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+
+    Returns:
+        list: Start offset of each page, or None if not stored
+    """
+    path = get_artifact_dir(content_hash) / PAGES_ARTIFACT_NAME
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Discarding unreadable page offsets {path}: {str(e)}")
+        return None
+
+
+def _write_json_artifact(content_hash, name, data):
+    write_artifact_atomically(get_artifact_dir(content_hash) / name, json.dumps(data).encode("utf-8"))
+
+
+def _read_json_artifact(content_hash, name):
+    path = get_artifact_dir(content_hash) / name
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Discarding unreadable artifact {path}: {str(e)}")
+        return None
+
+
+def write_page_hashes(content_hash, page_hashes):
+    """
+    Store the fingerprint of each page of a document.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+        page_hashes (list): Hash of each page, in page order
+    """
+    _write_json_artifact(content_hash, PAGE_HASHES_ARTIFACT_NAME, page_hashes)
+
+
+def read_page_hashes(content_hash):
+    """
+    Load the per-page fingerprints of a document.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+
+    Returns:
+        list: Hash of each page, or None if not stored
+    """
+    return _read_json_artifact(content_hash, PAGE_HASHES_ARTIFACT_NAME)
+
+
+def write_revision_info(content_hash, base_content_hash, changed_pages):
+    """
+    Record that a document's content is a revision of earlier content.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the revised PDF
+        base_content_hash (str): SHA-256 hex digest of the previous version
+        changed_pages (list): 0-based pages that were extracted again (None if all were)
+    """
+    _write_json_artifact(content_hash, REVISION_ARTIFACT_NAME, {
+        "base_content_hash": base_content_hash,
+        "changed_pages": changed_pages,
+    })
+
+
+def read_revision_info(content_hash):
+    """
+    Load the revision record of a document's content.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+
+    Returns:
+        dict: base_content_hash and changed_pages, or None if the content is not a revision
+    """
+    return _read_json_artifact(content_hash, REVISION_ARTIFACT_NAME)
+
+
+def delete_artifacts(content_hash):
+    """
+    Delete every artifact derived from a content hash.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the PDF
+    """
+    shutil.rmtree(get_artifact_dir(content_hash), ignore_errors=True)
@@ -0,0 +1,114 @@
+"""
+BM25 utility functions for the PDF Quest API.
+This file provides a small Okapi BM25 keyword index over text chunks, backed by an
+inverted index so a query only touches the chunks that contain its terms.
+"""
+import math
+import re
+from collections import Counter
+
+# BM25 parameters: term-frequency saturation and document-length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Common English words that carry no meaning for retrieval
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+def _normalize_term(token):
+    """Fold simple plurals ("refunds" -> "refund") so both forms match."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric terms, dropping stop words and single characters."""
+    return [
+        _normalize_term(token) for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over a list of chunks.
+
+    postings maps each term to a list of (chunk position, term frequency).
+    """
+
+    def __init__(self, postings, chunk_lengths):
+        self.postings = postings
+        self.chunk_lengths = chunk_lengths
+        self.average_length = sum(chunk_lengths) / len(chunk_lengths) if chunk_lengths else 0.0
+        count = len(chunk_lengths)
+        self.idf = {
+            term: math.log(1 + (count - len(postings_list) + 0.5) / (len(postings_list) + 0.5))
+            for term, postings_list in postings.items()
+        }
+
+    @classmethod
+    def build(cls, chunks):
+        """
+        Build the index of a list of chunk texts.
+
+        Returns:
+            BM25Index: The index
+        """
+        postings = {}
+        chunk_lengths = []
+        for position, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            chunk_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings.setdefault(term, []).append((position, frequency))
+        return cls(postings, chunk_lengths)
+
+    def search(self, query, k=None):
+        """
+        Rank chunks against a query.
+
+        Args:
+            query (str): The query text
+            k (int): Maximum number of results (None for all matching chunks)
+
+        Returns:
+            list: (chunk position, score) pairs, best first; only chunks sharing a term with the query
+        """
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, frequency in self.postings[term]:
+                length_norm = 1 - BM25_B + BM25_B * self.chunk_lengths[position] / (self.average_length or 1)
+                score = idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                scores[position] = scores.get(position, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k] if k else ranked
+
+    def to_dict(self):
+        """Serialize the index to JSON-compatible data."""
+        return {"postings": self.postings, "chunk_lengths": self.chunk_lengths}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index serialized with to_dict."""
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(postings, data["chunk_lengths"])
+
+    def size_bytes(self):
+        """Approximate memory used by the index."""
+        # Roughly 100 bytes per posting (tuple plus two ints) and per term entry
+        return 100 * (sum(len(entries) for entries in self.postings.values()) + len(self.postings))
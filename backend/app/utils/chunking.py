@@ -0,0 +1,195 @@
+"""
+Chunking utilities for the PDF Quest API.
+This file provides the chunking engine shared by every QA backend. A document text is
+split page by page into chunks that fit a token budget, ending at paragraph, sentence or
+word boundaries where possible. Chunks are compact records (offsets into the stored text
+plus the pages they cover) rather than copies of the text; a ChunkTable packs them into a
+flat integer array.
+"""
+import re
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple, Optional
+
+# Rough size of a token for English text, used to turn token budgets into characters
+CHARS_PER_TOKEN = 4
+
+# Preferred places to end a chunk, best first: (separator, characters of it kept in the chunk)
+_BREAKS = (("\n\n", 0), (". ", 1), (".\n", 1), ("\n", 0), (" ", 0))
+
+_WHITESPACE = re.compile(r"\s")
+_NON_WHITESPACE = re.compile(r"\S")
+
+
+class Chunk(NamedTuple):
+    """A chunk of a document: text[start:end], covering pages first_page..last_page (1-based)."""
+    start: int
+    end: int
+    first_page: Optional[int]
+    last_page: Optional[int]
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _page_for_offset(page_offsets, char_offset):
+    """Get the 1-based page containing a character offset (None without page offsets)."""
+    if not page_offsets:
+        return None
+    return max(1, bisect_right(page_offsets, char_offset))
+
+
+def _find_break(text, start, limit, chunk_chars):
+    """Find where to end a chunk starting at `start` that may not go past `limit`."""
+    # Only break in the last quarter of the chunk, so chunks stay close to the budget
+    search_from = start + chunk_chars * 3 // 4
+    for separator, kept in _BREAKS:
+        position = text.rfind(separator, search_from, limit)
+        if position != -1:
+            return position + kept
+    return limit
+
+
+def _trim(text, start, end):
+    """Shrink a span so it neither starts nor ends with whitespace (None if it is blank)."""
+    match = _NON_WHITESPACE.search(text, start, end)
+    if match is None:
+        return None
+    start = match.start()
+    while text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split_range(text, range_start, range_end, chunk_chars, overlap_chars):
+    """Yield the (start, end) spans of the chunks of text[range_start:range_end]."""
+    start = range_start
+    while start < range_end:
+        end = min(range_end, start + chunk_chars)
+        if end < range_end:
+            end = _find_break(text, start, end, chunk_chars)
+
+        span = _trim(text, start, end)
+        if span is not None:
+            yield span
+        if end >= range_end:
+            break
+
+        # Overlap with the previous chunk, starting on a word boundary
+        next_start = max(end - overlap_chars, start + 1)
+        space = _WHITESPACE.search(text, next_start, end)
+        start = space.end() if space is not None and overlap_chars else next_start
+
+
+def iter_chunks(text, page_offsets=None, max_tokens=200, overlap_tokens=50, split_pages=False):
+    """
+    Split a document text into chunks, streaming over its pages.
+
+    Args:
+        text (str): The document text
+        page_offsets (list): Start offset of each page in text (optional), used to
+            record the pages of each chunk
+        max_tokens (int): Maximum estimated tokens per chunk (e.g. the embedding model's limit)
+        overlap_tokens (int): Estimated tokens shared by consecutive chunks
+        split_pages (bool): Never let a chunk cross a page boundary, so identical
+            pages always produce identical chunks
+
+    Yields:
+        Chunk: The chunks, in document order
+    """
+    chunk_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, chunk_chars // 2)
+
+    if split_pages and page_offsets:
+        bounds = list(page_offsets) + [len(text)]
+        ranges = zip(bounds, bounds[1:])
+    else:
+        ranges = [(0, len(text))]
+
+    for range_start, range_end in ranges:
+        for start, end in _split_range(text, range_start, range_end, chunk_chars, overlap_chars):
+            yield Chunk(start, end, _page_for_offset(page_offsets, start), _page_for_offset(page_offsets, end - 1))
+
+
+def chunk_document(text, page_offsets=None, max_tokens=200, overlap_tokens=50, split_pages=False):
+    """
+    Split a document text into chunks (see iter_chunks).
+
+    Returns:
+        list: The chunk records, in document order
+    """
+    return list(iter_chunks(text, page_offsets, max_tokens, overlap_tokens, split_pages))
+
+
+def chunk_texts(text, chunks):
+    """
+    Get the text of chunks.
+
+    Args:
+        text (str or TextBuffer): The text the chunks were made from
+        chunks (iterable): Chunk records with offsets into text
+
+    Yields:
+        str: The text of each chunk
+    """
+    for chunk in chunks:
+        yield text[chunk.start:chunk.end]
+
+
+class ChunkTable:
+    """
+    Chunk records packed into a flat array of 64-bit integers (four per chunk).
+
+    Reading an item returns a Chunk. Unknown pages are stored as 0.
+    """
+
+    def __init__(self, values=()):
+        self._values = array("q", values)
+
+    @classmethod
+    def from_chunks(cls, chunks, offsets=None):
+        """
+        Pack chunk records.
+
+        Args:
+            chunks (iterable): Chunk records
+            offsets (dict): Mapping applied to chunk start and end offsets (optional),
+                e.g. from character to byte offsets (see text_buffer.to_byte_offsets)
+
+        Returns:
+            ChunkTable: The table
+        """
+        table = cls()
+        for chunk in chunks:
+            start, end = (offsets[chunk.start], offsets[chunk.end]) if offsets else (chunk.start, chunk.end)
+            table._values.extend((start, end, chunk.first_page or 0, chunk.last_page or 0))
+        return table
+
+    def __len__(self):
+        return len(self._values) // 4
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("chunk position out of range")
+        start, end, first_page, last_page = self._values[4 * position:4 * position + 4]
+        return Chunk(start, end, first_page or None, last_page or None)
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def to_list(self):
+        """Serialize the table to a flat list of integers."""
+        return self._values.tolist()
+
+    @classmethod
+    def from_list(cls, values):
+        """Rebuild a table serialized with to_list."""
+        return cls(values)
+
+    def size_bytes(self):
+        """Memory used by the table."""
+        return self._values.itemsize * len(self._values)
@@ -0,0 +1,108 @@
+"""
+Context packing utilities for the PDF Quest API.
+This file provides the pure helpers behind retrieval-based prompts: ranking a document's
+chunks with BM25 and packing the best ones into a token budget with overlapping chunks merged.
+"""
+from app.utils.bm25 import BM25Index
+from app.utils.chunking import CHARS_PER_TOKEN, ChunkTable, chunk_document, chunk_texts
+from app.utils.text_buffer import to_byte_offsets
+
+# Chunking of the document text for retrieval (estimated tokens)
+CONTEXT_CHUNK_TOKENS = 200
+CONTEXT_CHUNK_OVERLAP_TOKENS = 50
+
+
+class KeywordIndex:
+    """
+    The retrieval chunks of one document and their BM25 index.
+
+    Chunk offsets are byte offsets into the UTF-8 document text, so chunks are
+    read straight from the memory-mapped text artifact (see text_buffer.TextBuffer).
+    """
+
+    def __init__(self, chunks, bm25):
+        self.chunks = chunks
+        self.bm25 = bm25
+
+    @classmethod
+    def build(cls, text, page_offsets=None):
+        """Chunk a document text and index its chunks."""
+        chunks = chunk_document(text, page_offsets, CONTEXT_CHUNK_TOKENS, CONTEXT_CHUNK_OVERLAP_TOKENS)
+        byte_offsets = to_byte_offsets(text, [offset for chunk in chunks for offset in (chunk.start, chunk.end)])
+        return cls(ChunkTable.from_chunks(chunks, byte_offsets), BM25Index.build(chunk_texts(text, chunks)))
+
+    def size_bytes(self):
+        """Approximate memory used by the index."""
+        return self.bm25.size_bytes() + self.chunks.size_bytes()
+
+
+def pack_context(text, spans, token_budget):
+    """
+    Pack ranked chunks into a token budget.
+
+    Chunks are taken best first. A chunk overlapping one already selected is merged
+    with it, so shared text is only sent once, and chunks whose text repeats one
+    already selected are skipped. The packed chunks are returned in document order.
+
+    Args:
+        text (TextBuffer): The document text (a str works too, with character offsets)
+        spans (list): (start, end) offsets of the ranked chunks, best first
+        token_budget (int): Maximum estimated tokens of the context
+
+    Returns:
+        str: The context
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    selected = []  # merged (start, end) spans
+    seen_texts = set()
+    used = 0
+
+    for start, end in spans:
+        chunk_key = " ".join(text[start:end].split()).lower()
+        if chunk_key in seen_texts:
+            continue
+
+        # Merge with every selected span this chunk overlaps
+        merged_start, merged_end = start, end
+        overlapping = [span for span in selected if span[0] < end and start < span[1]]
+        for span in overlapping:
+            merged_start, merged_end = min(merged_start, span[0]), max(merged_end, span[1])
+        added = (merged_end - merged_start) - sum(span[1] - span[0] for span in overlapping)
+
+        if used + added > char_budget:
+            if not selected:
+                # The best chunk alone is over budget: send as much of it as fits, which
+                # uses up the whole budget
+                selected.append((start, start + char_budget))
+                break
+            continue
+
+        selected = [span for span in selected if span not in overlapping] + [(merged_start, merged_end)]
+        seen_texts.add(chunk_key)
+        used += added
+
+    selected.sort()
+    return "\n...\n".join(text[start:end].strip() for start, end in selected)
+
+
+def select_context(text, keyword_index, question, token_budget, k):
+    """
+    Select the parts of a document most relevant to a question.
+
+    Falls back to the beginning of the document when no chunk shares a term with the question.
+
+    Args:
+        text (TextBuffer): The document text the index was built from
+        keyword_index (KeywordIndex): The document's keyword index
+        question (str): The question
+        token_budget (int): Maximum estimated tokens of the context
+        k (int): Number of top-ranked chunks to consider
+
+    Returns:
+        str: The context
+    """
+    ranked = keyword_index.bm25.search(question, k)
+    if not ranked:
+        return text[:token_budget * CHARS_PER_TOKEN]
+    chunks = [keyword_index.chunks[position] for position, _ in ranked]
+    return pack_context(text, [(chunk.start, chunk.end) for chunk in chunks], token_budget)
@@ -0,0 +1,200 @@
+"""
+Execution utilities for the PDF Quest API.
+This file provides the worker pools used to keep blocking work off the asyncio event loop:
+a thread pool for blocking I/O (database, model inference, HTTP calls to LLMs) and a
+process pool for CPU-bound stages such as PDF parsing.
+"""
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config import IO_WORKERS, CPU_WORKERS, STAGE_TIMEOUTS
+from app.database import SessionLocal
+
+
+class StageTimeoutError(Exception):
+    """Raised when a stage does not finish within its configured timeout."""
+
+
+_thread_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="pdfquest-io")
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+_process_pool_disabled = CPU_WORKERS <= 0
+
+
+def get_stage_timeout(stage):
+    """Get the timeout in seconds for a stage."""
+    return STAGE_TIMEOUTS.get(stage, STAGE_TIMEOUTS["default"])
+
+
+def get_process_pool():
+    """
+    Get the shared process pool, creating it on first use.
+
+    Returns:
+        ProcessPoolExecutor: The pool, or None if process pools are disabled or
+        unavailable on this platform (e.g. serverless runtimes without /dev/shm)
+    """
+    global _process_pool, _process_pool_disabled
+    if _process_pool_disabled:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            try:
+                # "spawn" avoids forking a parent that already runs model and I/O threads
+                context = multiprocessing.get_context("spawn")
+                _process_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=context)
+            except (OSError, ImportError, NotImplementedError) as e:
+                print(f"Process pool unavailable, running CPU-bound stages inline: {str(e)}")
+                _process_pool_disabled = True
+                return None
+        return _process_pool
+
+
+async def run_in_thread(func, *args, stage="default", **kwargs):
+    """
+    Run a blocking function in the I/O thread pool and await its result.
+
+    On timeout the caller gets StageTimeoutError right away; the worker thread
+    itself cannot be interrupted and finishes in the background. It may outlive
+    the request, so never pass it the request's database session: use
+    run_with_session for database work.
+
+    Args:
+        func: The blocking function to run
+        *args: Positional arguments for func
+        stage (str): Stage name used to pick the timeout
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The return value of func
+
+    Raises:
+        StageTimeoutError: If the stage exceeds its timeout
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_thread_pool, functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout=get_stage_timeout(stage))
+    except asyncio.TimeoutError:
+        raise StageTimeoutError(f"The {stage} stage timed out after {get_stage_timeout(stage):g} seconds")
+
+
+async def run_with_session(func, *args, stage="default", **kwargs):
+    """
+    Run a blocking database function in the I/O thread pool with its own session.
+
+    The session is opened and closed by the worker thread, so a stage that times
+    out keeps using a session nobody else closes or shares.
+
+    Args:
+        func: The blocking function to run, called with the session as `db`
+        *args: Positional arguments for func
+        stage (str): Stage name used to pick the timeout
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The return value of func (read what you need from ORM objects inside func:
+        they are detached once the session closes)
+
+    Raises:
+        StageTimeoutError: If the stage exceeds its timeout
+    """
+    def run():
+        db = SessionLocal()
+        try:
+            return func(*args, db=db, **kwargs)
+        finally:
+            db.close()
+
+    return await run_in_thread(run, stage=stage)
+
+
+def run_cpu_bound(func, *args, stage="default"):
+    """
+    Run a CPU-bound function in the process pool and wait for its result.
+
+    This is called from worker threads (never from the event loop). func and its
+    arguments must be picklable. Falls back to running inline when the process
+    pool is disabled or broken.
+
+    Args:
+        func: A module-level function
+        *args: Picklable positional arguments for func
+        stage (str): Stage name used to pick the timeout
+
+    Returns:
+        The return value of func
+
+    Raises:
+        StageTimeoutError: If the stage exceeds its timeout
+    """
+    global _process_pool, _process_pool_disabled
+    pool = get_process_pool()
+    if pool is None:
+        return func(*args)
+
+    try:
+        return pool.submit(func, *args).result(timeout=get_stage_timeout(stage))
+    except FutureTimeoutError:
+        raise StageTimeoutError(f"The {stage} stage timed out after {get_stage_timeout(stage):g} seconds")
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); stop using the pool for the rest of this process
+        print("Process pool broke, running CPU-bound stages inline from now on")
+        with _process_pool_lock:
+            _process_pool_disabled = True
+            _process_pool = None
+        return func(*args)
+
+
+def map_cpu_bound(func, args_list, stage="default"):
+    """
+    Run a CPU-bound function over several argument tuples in the process pool.
+
+    Args:
+        func: A module-level function
+        args_list (list): One tuple of picklable positional arguments per call
+        stage (str): Stage name used to pick the timeout (applied to the whole batch)
+
+    Returns:
+        list: The results, in the same order as args_list
+
+    Raises:
+        StageTimeoutError: If the stage exceeds its timeout
+    """
+    global _process_pool, _process_pool_disabled
+    pool = get_process_pool()
+    if pool is None:
+        return [func(*args) for args in args_list]
+
+    futures = [pool.submit(func, *args) for args in args_list]
+    try:
+        done, not_done = wait(futures, timeout=get_stage_timeout(stage))
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            raise StageTimeoutError(f"The {stage} stage timed out after {get_stage_timeout(stage):g} seconds")
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        print("Process pool broke, running CPU-bound stages inline from now on")
+        with _process_pool_lock:
+            _process_pool_disabled = True
+            _process_pool = None
+        return [func(*args) for args in args_list]
+
+
+def get_cpu_worker_count():
+    """Get the number of processes CPU-bound work can be split across (1 when running inline)."""
+    return CPU_WORKERS if get_process_pool() is not None else 1
+
+
+def shutdown_executors():
+    """Shut down the worker pools (called on application shutdown)."""
+    _thread_pool.shutdown(wait=False, cancel_futures=True)
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
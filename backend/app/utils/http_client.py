@@ -0,0 +1,181 @@
+"""
+HTTP client utilities for the PDF Quest API.
+This file provides a shared HTTP client for LLM providers: pooled keep-alive connections,
+a cap on concurrent requests, a token-bucket rate limiter and jittered retries on 429/5xx
+responses that respect Retry-After.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limited, or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` requests per second with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, blocking until one is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def block_for(self, seconds):
+        """Hold back every caller for a while (e.g. when the provider asks us to slow down)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (delay in seconds or an HTTP date).
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimitedClient:
+    """
+    A pooled requests.Session with bounded concurrency, rate limiting and retries.
+    """
+
+    def __init__(
+        self,
+        max_concurrency,
+        requests_per_minute,
+        max_retries,
+        backoff_base,
+        backoff_max,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Keep-alive connections are reused across questions (no new TCP/TLS handshake)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_minute / 60.0, capacity=max(1, max_concurrency))
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "rate_limited": 0, "throttle_seconds": 0.0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send(self, method, url, kwargs):
+        """Send a request, retrying rate-limited, failed and transient-error responses."""
+        for attempt in range(self.max_retries + 1):
+            self._count("throttle_seconds", self._bucket.acquire())
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"HTTP request failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self._count("rate_limited")
+                    if retry_after is not None:
+                        # The provider's limit applies to every caller, not only this one
+                        self._bucket.block_for(retry_after)
+                response.close()
+
+                if retry_after is not None:
+                    delay = min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+                else:
+                    delay = self._backoff(attempt)
+                print(f"HTTP {response.status_code} from {url}, retrying in {delay:.1f}s")
+
+            self._count("retries")
+            time.sleep(delay)
+
+    @contextmanager
+    def post(self, url, **kwargs):
+        """
+        Send a POST request and yield the response.
+
+        The concurrency slot is held until the block exits, so streamed
+        responses count against the limit while they are being read.
+
+        Args:
+            url (str): Request URL
+            **kwargs: Arguments for requests (headers, json, timeout, stream, ...)
+
+        Yields:
+            requests.Response: The final response (after any retries)
+        """
+        with self._semaphore:
+            response = self._send("POST", url, kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def stats(self):
+        """Get request, retry and rate-limit counters."""
+        with self._stats_lock:
+            return dict(self._stats, throttle_seconds=round(self._stats["throttle_seconds"], 3))
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
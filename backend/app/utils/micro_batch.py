@@ -0,0 +1,183 @@
+"""
+Micro-batching utilities for the PDF Quest API.
+This file provides a micro-batcher that merges the inputs of concurrent callers into
+shared batches run by one dedicated thread. It is used for the embedding model, so many
+questions asked at once cost a few forward passes instead of one each.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Request:
+    """The items of one caller, the results computed so far and the caller's future."""
+
+    __slots__ = ("items", "future", "results", "next_item")
+
+    def __init__(self, items):
+        self.items = items
+        self.future = Future()
+        self.results = []
+        self.next_item = 0
+
+    def remaining(self):
+        return len(self.items) - self.next_item
+
+
+class MicroBatcher:
+    """
+    Runs a batch function over the items of concurrent callers in shared batches.
+
+    A batch starts when the first item arrives and runs once it holds `max_batch_size`
+    items or `max_wait` seconds have passed, so a caller waits at most `max_wait`
+    longer than the forward pass itself. Callers with few items (e.g. one question)
+    are served first; large requests (e.g. the chunks of a new document) are split
+    across batches and fill the remaining room, so they never hold up questions.
+    """
+
+    def __init__(self, process_batch, max_batch_size, max_wait, name="micro-batcher"):
+        """
+        Args:
+            process_batch: Function mapping a list of items to a list of results, in order
+            max_batch_size (int): Maximum items per batch
+            max_wait (float): Seconds to wait for more items before running a batch
+            name (str): Name of the batching thread
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "items": 0, "batches": 0, "errors": 0, "batch_seconds": 0.0}
+
+    def submit(self, items):
+        """
+        Process items in the next batches and wait for their results.
+
+        Args:
+            items (list): The items of this caller
+
+        Returns:
+            list: One result per item, in order
+
+        Raises:
+            RuntimeError: If the batcher was shut down
+            Exception: Whatever process_batch raised for a batch holding these items
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} was shut down")
+        items = list(items)
+        if not items:
+            return []
+        request = _Request(items)
+        self._start()
+        self._queue.put(request)
+        return request.future.result()
+
+    def _start(self):
+        """Start the batching thread on first use."""
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = []  # requests with items left to process, in arrival order
+        stopping = False
+        while pending or not stopping:
+            if not pending:
+                request = self._queue.get()
+                if request is None:
+                    return
+                pending.append(request)
+
+            # Take every request already queued, then wait for more until the batch is full
+            # or the window closes
+            deadline = time.monotonic() + self.max_wait
+            while not stopping:
+                timeout = deadline - time.monotonic()
+                has_room = sum(request.remaining() for request in pending) < self.max_batch_size
+                try:
+                    if has_room and timeout > 0:
+                        request = self._queue.get(timeout=timeout)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    # Shutting down: finish the requests already received
+                    stopping = True
+                else:
+                    pending.append(request)
+
+            self._run_batch(pending)
+            pending = [request for request in pending if not request.future.done()]
+
+    def _run_batch(self, pending):
+        """Process one batch taken from the pending requests (finished requests get their results)."""
+        # Smallest requests first, so single questions never queue behind a whole document
+        batch = []
+        room = self.max_batch_size
+        for request in sorted(pending, key=_Request.remaining):
+            take = min(room, request.remaining())
+            batch.append((request, request.next_item, request.next_item + take))
+            request.next_item += take
+            room -= take
+            if room == 0:
+                break
+
+        items = [item for request, start, end in batch for item in request.items[start:end]]
+        started_at = time.monotonic()
+        try:
+            results = self.process_batch(items)
+        except Exception as e:
+            self._fail([request for request, _, _ in batch], e)
+            return
+
+        position = 0
+        for request, start, end in batch:
+            request.results.extend(results[position:position + end - start])
+            position += end - start
+            if request.remaining() == 0:
+                request.future.set_result(request.results)
+
+        with self._stats_lock:
+            self._stats["requests"] += sum(1 for request, _, _ in batch if request.remaining() == 0)
+            self._stats["items"] += len(items)
+            self._stats["batches"] += 1
+            self._stats["batch_seconds"] += time.monotonic() - started_at
+
+    def _fail(self, requests, error):
+        """Fail the callers of requests."""
+        for request in requests:
+            request.future.set_exception(error)
+        with self._stats_lock:
+            self._stats["errors"] += len(requests)
+
+    def stats(self):
+        """Get request, item and batch counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": 1000 * self.max_wait,
+            "requests": stats["requests"],
+            "items": stats["items"],
+            "batches": stats["batches"],
+            "errors": stats["errors"],
+            "mean_batch_size": stats["items"] / stats["batches"] if stats["batches"] else 0.0,
+            "batch_seconds": round(stats["batch_seconds"], 3),
+        }
+
+    def shutdown(self):
+        """Stop the batching thread once the queued requests are processed."""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
@@ -2,44 +2,264 @@
 PDF utility functions for the PDF Quest API.
 This file provides functions for extracting text from PDF files.
 """
+import hashlib
 import os
+import re
+from bisect import bisect_right
 import fitz  # PyMuPDF
 
-def extract_text_from_pdf(file_path):
+from app.utils.executor import map_cpu_bound, get_cpu_worker_count, StageTimeoutError
+
+# Minimum number of pages handed to each worker process when extracting in parallel
+PAGES_PER_WORKER = 32
+
+# An indirect object reference ("12 0 R") in the source of a PDF object
+_REFERENCE_PATTERN = re.compile(r"(\d+) \d+ R\b")
+
+
+def _object_digest(doc, xref, digests, visiting):
     """
-    Extract text from a PDF file.
+    Hash a PDF object together with every object it references.
+
+    References are replaced by the hash of the object they point to, as xref numbers
+    change between files. Streams are hashed decoded, except image data, which
+    does not change the text of a page.
+    """
+    if xref in digests:
+        return digests[xref]
+    if xref in visiting or not 0 < xref < doc.xref_length():
+        # A reference back to an object being hashed (or a broken reference)
+        return "-"
+    visiting.add(xref)
+    source = doc.xref_object(xref, compressed=True)
+    digest = hashlib.sha256(_resolve_references(doc, source, digests, visiting).encode("utf-8", "surrogatepass"))
+    if doc.xref_is_stream(xref) and "/Subtype/Image" not in source:
+        digest.update(doc.xref_stream(xref) or b"")
+    visiting.discard(xref)
+    digests[xref] = digest.hexdigest()
+    return digests[xref]
+
+
+def _resolve_references(doc, source, digests, visiting):
+    """Replace the object references in PDF object source by the hashes of the objects."""
+    return _REFERENCE_PATTERN.sub(
+        lambda match: _object_digest(doc, int(match.group(1)), digests, visiting), source
+    )
+
+
+def _resources_digest(doc, xref, digests):
+    """Hash the resources (fonts, encodings, form XObjects...) of a page, which may be inherited."""
+    while True:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind == "xref":
+            return _object_digest(doc, int(value.split()[0]), digests, set())
+        if kind == "dict":
+            return _resolve_references(doc, value, digests, set())
+        kind, value = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            return "-"
+        xref = int(value.split()[0])
+
+
+def _page_hash(page, digests=None):
+    """
+    Fingerprint a page from its raw drawing instructions, geometry and resources.
+    
+    This is much cheaper than extracting the text, and identical pages of two
+    versions of a PDF get the same fingerprint. The resources are hashed with
+    everything they reference (font programs, encodings, ToUnicode maps, form
+    XObjects), so any change that can change the extracted text changes it.
+    
+    Args:
+        page: The PyMuPDF page
+        digests (dict): Hashes of the objects seen so far, shared by the pages of a document
+    """
+    if digests is None:
+        digests = {}
+    digest = hashlib.sha256(page.read_contents())
+    digest.update(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+    digest.update(_resources_digest(page.parent, page.xref, digests).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _extract_page_list(file_path, page_numbers):
+    """
+    Extract the text and fingerprint of the given pages of a PDF file.
+    Runs in a worker process, so it opens the file on its own.
+    
+    Returns:
+        list: (text, page hash) for each page, in order
+    """
+    doc = fitz.open(file_path)
+    try:
+        pages = [doc.load_page(page_num) for page_num in page_numbers]
+        digests = {}
+        return [(page.get_text(), _page_hash(page, digests)) for page in pages]
+    finally:
+        doc.close()
+
+
+def _split_page_ranges(page_count, parts):
+    """Split [0, page_count) into `parts` contiguous ranges of near-equal size."""
+    size, remainder = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def compute_page_hashes(file_path):
+    """
+    Fingerprint every page of a PDF file without extracting its text.
     
     Args:
         file_path (str): Path to the PDF file
         
     Returns:
-        str: Extracted text from the PDF
+        list: The hash of each page, in page order
+    """
+    with fitz.open(file_path) as doc:
+        digests = {}
+        return [_page_hash(page, digests) for page in doc]
+
+
+def extract_pages_with_hashes(file_path, page_numbers=None):
+    """
+    Extract the text and fingerprint of pages of a PDF file.
+    
+    Large selections are split into page ranges that are extracted in parallel
+    by the worker process pool; small ones run as a single task.
+    
+    Args:
+        file_path (str): Path to the PDF file
+        page_numbers (list): 0-based pages to extract (default: every page)
+        
+    Returns:
+        list: (text, page hash) for each requested page, in order
     
     Raises:
         FileNotFoundError: If the file does not exist
+        StageTimeoutError: If the extraction exceeds the extract stage timeout
         Exception: If there's an error extracting text
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"PDF file not found: {file_path}")
     
     try:
-        # Open the PDF file
-        doc = fitz.open(file_path)
-        
-        # Extract text from each page
-        text = ""
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text()
+        if page_numbers is None:
+            with fitz.open(file_path) as doc:
+                page_numbers = list(range(len(doc)))
         
-        # Close the document
-        doc.close()
+        parts = max(1, min(get_cpu_worker_count(), len(page_numbers) // PAGES_PER_WORKER))
+        ranges = _split_page_ranges(len(page_numbers), parts)
+        results = map_cpu_bound(
+            _extract_page_list,
+            [(file_path, page_numbers[start:end]) for start, end in ranges],
+            stage="extract"
+        )
         
-        return text
+        return [page for range_pages in results for page in range_pages]
+    except StageTimeoutError:
+        raise
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
 
+def extract_pages_from_pdf(file_path):
+    """
+    Extract the text of every page of a PDF file.
+    
+    Args:
+        file_path (str): Path to the PDF file
+        
+    Returns:
+        list: The text of each page, in page order
+    
+    Raises:
+        FileNotFoundError: If the file does not exist
+        Exception: If there's an error extracting text
+    """
+    return [page_text for page_text, _ in extract_pages_with_hashes(file_path)]
+
+
+def join_pages(pages):
+    """
+    Join page texts into the document text.
+    
+    Args:
+        pages (list): The text of each page, in order
+        
+    Returns:
+        tuple: (text, page_offsets) where page_offsets[i] is the character
+        offset of page i in text
+    """
+    page_offsets = []
+    offset = 0
+    for page_text in pages:
+        page_offsets.append(offset)
+        offset += len(page_text)
+    
+    # A single join instead of repeated concatenation
+    return "".join(pages), page_offsets
+
+
+def split_pages(text, page_offsets):
+    """Split a document text back into the text of each page (the inverse of join_pages)."""
+    bounds = list(page_offsets) + [len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def extract_text_with_offsets(file_path):
+    """
+    Extract text from a PDF file along with the offset where each page starts.
+    
+    Args:
+        file_path (str): Path to the PDF file
+        
+    Returns:
+        tuple: (text, page_offsets) where page_offsets[i] is the character
+        offset of page i in text
+    """
+    return join_pages(extract_pages_from_pdf(file_path))
+
+
+def extract_text_from_pdf(file_path):
+    """
+    Extract text from a PDF file.
+    
+    Args:
+        file_path (str): Path to the PDF file
+        
+    Returns:
+        str: Extracted text from the PDF
+    
+    Raises:
+        FileNotFoundError: If the file does not exist
+        Exception: If there's an error extracting text
+    """
+    text, _ = extract_text_with_offsets(file_path)
+    return text
+
+
+def page_number_for_offset(page_offsets, char_offset):
+    """
+    Get the 1-based page number containing a character offset.
+    
+    Args:
+        page_offsets (list): Page start offsets from extract_text_with_offsets
+        char_offset (int): Character offset into the extracted text
+        
+    Returns:
+        int: The page number, or None if there are no pages
+    """
+    if not page_offsets:
+        return None
+    return max(1, bisect_right(page_offsets, char_offset))
+
+
 def get_pdf_metadata(file_path):
     """
     Get metadata from a PDF file.
@@ -80,33 +300,3 @@ def get_pdf_metadata(file_path):
     except Exception as e:
         raise Exception(f"Error extracting metadata from PDF: {str(e)}")
 
-
-def split_text_into_chunks(text, chunk_size=1000, overlap=100):
-    """
-    Split text into overlapping chunks for processing.
-    
-    Args:
-        text (str): Text to split
-        chunk_size (int): Size of each chunk
-        overlap (int): Overlap between chunks
-        
-    Returns:
-        list: List of text chunks
-    """
-    if not text:
-        return []
-    
-    chunks = []
-    start = 0
-    text_length = len(text)
-    
-    while start < text_length:
-        end = min(start + chunk_size, text_length)
-        chunks.append(text[start:end])
-        start = end - overlap
-        
-        # Break if we've reached the end
-        if start >= text_length:
-            break
-    
-    return chunks
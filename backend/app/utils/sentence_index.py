@@ -0,0 +1,100 @@
+"""
+Sentence index utilities for the PDF Quest API.
+This file provides the per-document sentence index of the lightweight QA backend: the
+meaningful sentences of every chunk plus a BM25 inverted index over them, so the
+sentences matching a question are found from the postings of its terms instead of
+scanning every sentence. Sentences are kept as byte spans into the cleaned document
+text, and only decoded when they are part of an answer.
+"""
+from array import array
+
+from app.utils.bm25 import BM25Index
+from app.utils.text_buffer import to_byte_offsets
+from app.utils.text_cleaning import meaningful_sentence_spans
+
+
+class SentenceIndex:
+    """
+    The meaningful sentences of a document's chunks and their BM25 index.
+
+    Sentence i is text[spans[2 * i]:spans[2 * i + 1]] (byte offsets). Sentences are
+    stored in chunk order: the sentences of chunk i are those from chunk_starts[i]
+    up to chunk_starts[i + 1].
+    """
+
+    def __init__(self, spans, chunk_starts, bm25):
+        self.spans = array("q", spans)
+        self.chunk_starts = array("q", chunk_starts)
+        self.bm25 = bm25
+
+    @classmethod
+    def build(cls, text, chunks):
+        """
+        Split chunks into meaningful sentences and index them.
+
+        Args:
+            text (TextBuffer): The text the chunks were made from
+            chunks (iterable): Chunk records with byte offsets into text
+
+        Returns:
+            SentenceIndex: The index
+        """
+        spans = []
+        chunk_starts = []
+        sentences = []
+        for chunk in chunks:
+            chunk_starts.append(len(sentences))
+            chunk_text = text[chunk.start:chunk.end]
+            chunk_spans = meaningful_sentence_spans(chunk_text)
+            byte_offsets = to_byte_offsets(chunk_text, [offset for span in chunk_spans for offset in span])
+            for start, end in chunk_spans:
+                sentences.append(chunk_text[start:end])
+                spans.extend((chunk.start + byte_offsets[start], chunk.start + byte_offsets[end]))
+        return cls(spans, chunk_starts, BM25Index.build(sentences))
+
+    def __len__(self):
+        return len(self.spans) // 2
+
+    def sentence(self, text, position):
+        """Decode a sentence from the text the index was built from."""
+        return text[self.spans[2 * position]:self.spans[2 * position + 1]]
+
+    def chunk_sentences(self, chunk_position):
+        """Get the positions of the sentences of a chunk."""
+        start = self.chunk_starts[chunk_position]
+        end = self.chunk_starts[chunk_position + 1] if chunk_position + 1 < len(self.chunk_starts) else len(self)
+        return range(start, end)
+
+    def search(self, query, chunk_positions=None, k=None):
+        """
+        Rank sentences against a query.
+
+        Args:
+            query (str): The query text
+            chunk_positions (list): Only rank the sentences of these chunks (None for every chunk)
+            k (int): Maximum number of results (None for all matching sentences)
+
+        Returns:
+            list: (sentence position, score) pairs, best first; only sentences sharing a term with the query
+        """
+        ranked = self.bm25.search(query)
+        if chunk_positions is not None:
+            allowed = set()
+            for chunk_position in chunk_positions:
+                allowed.update(self.chunk_sentences(chunk_position))
+            ranked = [(position, score) for position, score in ranked if position in allowed]
+        return ranked[:k] if k else ranked
+
+    def to_dict(self):
+        """Serialize the index to JSON-compatible data."""
+        return {"spans": self.spans.tolist(), "chunk_starts": self.chunk_starts.tolist(), "bm25": self.bm25.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index serialized with to_dict."""
+        return cls(data["spans"], data["chunk_starts"], BM25Index.from_dict(data["bm25"]))
+
+    def size_bytes(self):
+        """Approximate memory used by the index."""
+        return (self.spans.itemsize * len(self.spans) + self.chunk_starts.itemsize * len(self.chunk_starts)
+                + self.bm25.size_bytes())
@@ -0,0 +1,77 @@
+"""
+Text buffer utilities for the PDF Quest API.
+This file provides read-only, memory-mapped access to stored UTF-8 texts, so a request
+only decodes the slices it uses instead of loading the whole document, plus the
+conversion of character offsets into the byte offsets used to slice them.
+"""
+import mmap
+
+
+class TextBuffer:
+    """
+    A UTF-8 text file mapped into memory.
+
+    Offsets are byte offsets; slicing decodes only the requested bytes. The pages
+    of the file are shared through the OS page cache instead of copied into each
+    request.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                self._data = b""
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        """Decode a slice of the text (a slice cutting a character drops its partial bytes)."""
+        if not isinstance(key, slice):
+            raise TypeError("TextBuffer only supports slicing")
+        return self._data[key].decode("utf-8", errors="ignore")
+
+    def text(self):
+        """Decode the whole text."""
+        return self[:]
+
+    def close(self):
+        """Unmap the file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def to_byte_offsets(text, char_offsets):
+    """
+    Convert character offsets in a text into byte offsets in its UTF-8 encoding.
+
+    Each character between consecutive offsets is encoded once, whatever the
+    number of offsets.
+
+    Args:
+        text (str): The text
+        char_offsets (iterable): Character offsets, in any order
+
+    Returns:
+        dict: character offset -> byte offset
+    """
+    char_offsets = set(char_offsets)
+    if text.isascii():
+        return {offset: offset for offset in char_offsets}
+
+    byte_offsets = {}
+    previous_char = 0
+    previous_byte = 0
+    for offset in sorted(char_offsets):
+        previous_byte += len(text[previous_char:offset].encode("utf-8"))
+        previous_char = offset
+        byte_offsets[offset] = previous_byte
+    return byte_offsets
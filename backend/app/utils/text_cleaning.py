@@ -0,0 +1,185 @@
+"""
+Text cleaning utilities for the PDF Quest API.
+This file provides the text cleaning and sentence filtering used by the lightweight QA
+backend. Patterns are compiled once, each unit of text is lowercased once, and keyword
+checks use a single alternation search or set lookups instead of one scan per word.
+"""
+import re
+
+# Table-of-contents lines: "Java - Something", or a short "word - word" line
+_JAVA_HEADING = re.compile(r"\s*Java\s*-\s*", re.IGNORECASE)
+_DASHED_HEADING = re.compile(r"\s*\w+\s*-\s*\w+")
+
+# Lines and sentences containing these phrases are navigation text, not content
+_SKIP_LINE_PHRASES = re.compile("explore the|chapter|tutorial|furthermore")
+_TOC_WORDS = re.compile("explore|chapter|tutorial|following|furthermore")
+
+# Bullet at the start of the cleaned text
+_LEADING_BULLET = re.compile(r"\s*[•\-\*]\s*")
+
+# Sentence boundaries used when picking answer sentences
+SENTENCE_BOUNDARY = re.compile(r"[.!?]+")
+
+# A meaningful sentence has a verb and a common function word (whole words)
+_VERBS = frozenset(["is", "are", "was", "were", "has", "have", "had", "can", "will", "would", "should",
+                    "must", "does", "do", "did"])
+_COMMON_WORDS = frozenset(["the", "a", "an", "to", "for", "of", "in", "on", "at", "by", "with"])
+
+
+def _is_word_char(char):
+    """Check whether a character is a regex word character (\\w)."""
+    return char.isalnum() or char == "_"
+
+
+def _strip_page_number(text):
+    """
+    Remove a number standing alone at the end of the text (a page number).
+
+    Same result as re.sub(r"\\b\\d+$", "", text), without scanning every digit of the text.
+    """
+    start = len(text)
+    while start > 0 and text[start - 1].isdecimal():
+        start -= 1
+    if start < len(text) and (start == 0 or not _is_word_char(text[start - 1])):
+        return text[:start]
+    return text
+
+
+def clean_text(text):
+    """
+    Clean and normalize text by removing headings, table-of-contents lines and excessive whitespace.
+
+    Lines are filtered in a single pass; whitespace is then collapsed with one split and join.
+
+    Args:
+        text (str): Raw document text
+
+    Returns:
+        str: The cleaned text, on a single line
+    """
+    kept = []
+    # Lowercasing never adds or removes newlines, so both texts split into the same lines
+    for line, line_lower in zip(text.split("\n"), text.lower().split("\n")):
+        line = line.strip()
+        length = len(line)
+        # Headings and table-of-contents entries
+        if length < 60 and line.endswith(":"):
+            continue
+        if length < 50 and _DASHED_HEADING.match(line):
+            continue
+        if _JAVA_HEADING.match(line) or _SKIP_LINE_PHRASES.search(line_lower):
+            continue
+        kept.append(line)
+
+    # Collapse every run of whitespace to one space (this also joins the lines)
+    text = " ".join(" ".join(kept).split())
+
+    # Remove a bullet at the start and a page number at the end
+    bullet = _LEADING_BULLET.match(text)
+    if bullet:
+        text = text[bullet.end():]
+    text = _strip_page_number(text)
+
+    return text.strip()
+
+
+def clean_pages(text, page_offsets=None):
+    """
+    Clean each page of a document on its own (see clean_text) and join them.
+
+    Args:
+        text (str): Raw document text
+        page_offsets (list): Start offset of each page in text (optional)
+
+    Returns:
+        tuple: (cleaned text, start offset of each page in the cleaned text, or None without page offsets)
+    """
+    if not page_offsets:
+        return clean_text(text), None
+
+    parts = []
+    cleaned_offsets = []
+    length = 0
+    bounds = list(page_offsets) + [len(text)]
+    for start, end in zip(bounds, bounds[1:]):
+        page = clean_text(text[start:end])
+        if page and parts:
+            parts.append(" ")
+            length += 1
+        cleaned_offsets.append(length)
+        parts.append(page)
+        length += len(page)
+    return "".join(parts), cleaned_offsets
+
+
+def is_meaningful_sentence(sentence):
+    """
+    Check if a sentence is meaningful (not just a heading or list item).
+
+    Args:
+        sentence (str): The sentence
+
+    Returns:
+        bool: True if the sentence is long enough, is not navigation text and
+        contains both a verb and a common word
+    """
+    sentence = sentence.strip()
+
+    # Too short
+    if len(sentence) < 40:
+        return False
+
+    # Just a heading or list item
+    if sentence.endswith(":") or sentence.endswith("..."):
+        return False
+
+    sentence_lower = sentence.lower()
+
+    # Table-of-contents patterns ("Java - ...", " - ") and language
+    if "java -" in sentence_lower or " - " in sentence_lower:
+        return False
+    if _TOC_WORDS.search(sentence_lower):
+        return False
+
+    # Whole words, delimited by spaces
+    words = set(sentence_lower.split(" "))
+    return not _VERBS.isdisjoint(words) and not _COMMON_WORDS.isdisjoint(words)
+
+
+def meaningful_sentence_spans(text, start=0, end=None):
+    """
+    Split a part of a text into sentences and locate the meaningful ones.
+
+    Args:
+        text (str): The text
+        start (int): Start offset of the part to split
+        end (int): End offset of the part to split (None for the end of the text)
+
+    Returns:
+        list: (start, end) offsets in text of the meaningful sentences, stripped, in order
+    """
+    end = len(text) if end is None else end
+    spans = []
+    piece_start = start
+    boundaries = [(boundary.start(), boundary.end()) for boundary in SENTENCE_BOUNDARY.finditer(text, start, end)]
+    for piece_end, next_start in boundaries + [(end, end)]:
+        sentence = text[piece_start:piece_end]
+        if is_meaningful_sentence(sentence):
+            stripped = sentence.strip()
+            sentence_start = piece_start + len(sentence) - len(sentence.lstrip())
+            spans.append((sentence_start, sentence_start + len(stripped)))
+        piece_start = next_start
+    return spans
+
+
+def meaningful_sentences(text):
+    """
+    Split text into sentences and keep the meaningful ones.
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        list: The meaningful sentences, stripped, in order
+    """
+    return [text[start:end] for start, end in meaningful_sentence_spans(text)]
@@ -0,0 +1,172 @@
+"""
+TF-IDF utilities for the PDF Quest API.
+This file provides the chunk scoring of the lightweight QA backend. Answers are ranked
+as if a TF-IDF vectorizer were fitted over a document's chunks plus the question (the
+question takes part in the vocabulary, feature limit and IDF weights), but the chunks
+are only tokenized and counted once per document: each question reruns the cheap
+matrix steps of the fit on the stored counts.
+"""
+from bisect import bisect_left
+from numbers import Integral
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+
+class ChunkTermCounts:
+    """
+    Term counts of a document's chunks.
+
+    Terms are numbered in order of first appearance, like the count matrix a
+    vectorizer builds before sorting and limiting its features, so the matrix of
+    the chunks plus any question can be rebuilt without tokenizing the chunks again.
+    """
+
+    def __init__(self, terms, counts, params):
+        """
+        Args:
+            terms (list): The terms, in order of first appearance
+            counts (csr_matrix): Term counts, one row per chunk, one column per term
+            params (dict): TfidfVectorizer parameters the scoring reproduces
+        """
+        self.terms = terms
+        self.counts = counts
+        self.params = params
+        self._analyze = TfidfVectorizer(**params).build_analyzer()
+        self._vocabulary = {term: index for index, term in enumerate(terms)}
+        order = sorted(range(len(terms)), key=terms.__getitem__)
+        self._sorted_terms = [terms[index] for index in order]
+        self._ranks = np.empty(len(terms), dtype=np.int64)
+        self._ranks[order] = np.arange(len(terms))
+
+    @classmethod
+    def build(cls, chunks, params):
+        """
+        Tokenize and count the terms of a document's chunks.
+
+        Args:
+            chunks (list): The chunk texts
+            params (dict): TfidfVectorizer parameters the scoring reproduces
+
+        Returns:
+            ChunkTermCounts: The counts
+        """
+        analyze = TfidfVectorizer(**params).build_analyzer()
+        vocabulary = {}
+        indices = []
+        values = []
+        indptr = [0]
+        for chunk in chunks:
+            counter = {}
+            for term in analyze(chunk):
+                index = vocabulary.setdefault(term, len(vocabulary))
+                counter[index] = counter.get(index, 0) + 1
+            indices.extend(counter)
+            values.extend(counter.values())
+            indptr.append(len(indices))
+
+        counts = sp.csr_matrix(
+            (np.array(values, dtype=np.intc), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(chunks), len(vocabulary)),
+        )
+        counts.sort_indices()
+        return cls(list(vocabulary), counts, params)
+
+    def __len__(self):
+        return self.counts.shape[0]
+
+    def _count_matrix(self, question):
+        """Build the count matrix of the chunks plus the question, with features sorted by name."""
+        # Count the question; terms the chunks do not have are numbered after theirs
+        new_terms = {}
+        counter = {}
+        for term in self._analyze(question):
+            index = self._vocabulary.get(term)
+            if index is None:
+                index = new_terms.setdefault(term, len(self.terms) + len(new_terms))
+            counter[index] = counter.get(index, 0) + 1
+
+        n_terms = len(self.terms) + len(new_terms)
+        if n_terms == 0:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+        question_indices = sorted(counter)
+        question_row = sp.csr_matrix(
+            (
+                np.array([counter[index] for index in question_indices], dtype=np.float64),
+                np.array(question_indices, dtype=np.int32),
+                np.array([0, len(question_indices)], dtype=np.int32),
+            ),
+            shape=(1, n_terms),
+        )
+        chunk_rows = sp.csr_matrix(
+            (self.counts.data.astype(np.float64), self.counts.indices, self.counts.indptr),
+            shape=(len(self), n_terms),
+        )
+        X = sp.vstack([chunk_rows, question_row], format="csr")
+        X.indices = X.indices.astype(np.int32, copy=False)
+        X.indptr = X.indptr.astype(np.int32, copy=False)
+        X.sort_indices()
+
+        # Renumber the features in name order, merging the question's terms into the sorted chunk terms
+        new_positions = sorted((term, bisect_left(self._sorted_terms, term), index) for term, index in new_terms.items())
+        insert_positions = np.array([position for _, position, _ in new_positions], dtype=np.int64)
+        map_index = np.empty(n_terms, dtype=X.indices.dtype)
+        map_index[:len(self.terms)] = self._ranks + np.searchsorted(insert_positions, self._ranks, side="right")
+        for offset, (_, position, index) in enumerate(new_positions):
+            map_index[index] = position + offset
+        X.indices = map_index.take(X.indices, mode="clip")
+        return X
+
+    def _limit_features(self, X):
+        """Drop too common terms and keep the most frequent ones, as the vectorizer does."""
+        max_df, min_df = self.params.get("max_df", 1.0), self.params.get("min_df", 1)
+        max_features = self.params.get("max_features")
+        n_doc = X.shape[0]
+        max_doc_count = max_df if isinstance(max_df, Integral) else max_df * n_doc
+        min_doc_count = min_df if isinstance(min_df, Integral) else min_df * n_doc
+        if max_doc_count < min_doc_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+
+        dfs = np.bincount(X.indices, minlength=X.shape[1])
+        mask = (dfs <= max_doc_count) & (dfs >= min_doc_count)
+        if max_features is not None and mask.sum() > max_features:
+            tfs = np.asarray(X.sum(axis=0)).ravel()
+            mask_inds = (-tfs[mask]).argsort()[:max_features]
+            new_mask = np.zeros(len(dfs), dtype=bool)
+            new_mask[np.where(mask)[0][mask_inds]] = True
+            mask = new_mask
+
+        kept_indices = np.where(mask)[0]
+        if len(kept_indices) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        return X[:, kept_indices]
+
+    def similarities(self, question):
+        """
+        Score every chunk against a question.
+
+        Returns:
+            ndarray: Cosine similarity of each chunk to the question
+
+        Raises:
+            ValueError: If the chunks and question leave no terms (like fitting a vectorizer would)
+        """
+        X = self._limit_features(self._count_matrix(question))
+        transformer = TfidfTransformer(
+            norm=self.params.get("norm", "l2"),
+            use_idf=self.params.get("use_idf", True),
+            smooth_idf=self.params.get("smooth_idf", True),
+            sublinear_tf=self.params.get("sublinear_tf", False),
+        )
+        transformer.fit(X)
+        X = transformer.transform(X, copy=False)
+        return cosine_similarity(X[-1], X[:-1])[0]
+
+    def size_bytes(self):
+        """Approximate memory used by the counts."""
+        matrix_bytes = self.counts.data.nbytes + self.counts.indices.nbytes + self.counts.indptr.nbytes
+        # Each term is held by the term list, the vocabulary and the sorted list
+        return matrix_bytes + self._ranks.nbytes + sum(len(term) + 120 for term in self.terms)
@@ -0,0 +1,62 @@
+"""
+Upload utility functions for the PDF Quest API.
+This file provides helpers for streaming uploaded files to disk.
+"""
+import hashlib
+import os
+import tempfile
+
+# Copy uploads in 64 KB chunks so memory use stays flat whatever the file size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the maximum allowed size."""
+
+
+def save_stream_atomically(source, file_path, max_size, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Stream a file object to disk, enforcing a size limit and hashing on the way.
+
+    The data is written to a temporary file in the destination directory and
+    renamed into place only once it is complete, so a partial or oversized
+    upload never appears at file_path.
+
+    Args:
+        source: Readable binary file object
+        file_path (str): Final path of the file
+        max_size (int): Maximum allowed size in bytes
+        chunk_size (int): Number of bytes to copy at a time
+
+    Returns:
+        tuple: (size in bytes, SHA-256 hex digest)
+
+    Raises:
+        FileTooLargeError: If the stream is larger than max_size
+    """
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(
+                        f"File size exceeds the maximum allowed size of {max_size / (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return size, digest.hexdigest()
@@ -0,0 +1,53 @@
+"""
+Text cleaning benchmark for the PDF Quest API.
+Compares the speed of the cleaning engine in app/utils/text_cleaning.py with the previous
+per-line regex implementation on a long synthetic document. That the two give the same
+results is checked by tests/test_text_cleaning.py, where the reference implementation is
+kept. Run from the backend directory:
+
+    python benchmark_cleaning.py
+    python benchmark_cleaning.py --pages 2000
+"""
+import argparse
+import time
+
+from app.utils import text_cleaning
+from tests.test_text_cleaning import (
+    build_document,
+    reference_clean_text,
+    reference_meaningful_sentences,
+)
+
+
+def best_time(func, arg, repeat):
+    """Best wall-clock seconds of several runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the text cleaning engine")
+    parser.add_argument("--pages", type=int, default=500, help="Pages in the synthetic document")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per function (best is reported)")
+    args = parser.parse_args()
+
+    document = build_document(args.pages)
+    cleaned = text_cleaning.clean_text(document)
+    print(f"Document: {args.pages} pages, {len(document)} characters ({len(cleaned)} after cleaning)")
+    print(f"{'function':<24} {'reference ms':>13} {'engine ms':>10} {'speed-up':>9}")
+    for name, reference, engine, arg in [
+        ("clean_text", reference_clean_text, text_cleaning.clean_text, document),
+        ("meaningful_sentences", reference_meaningful_sentences, text_cleaning.meaningful_sentences, cleaned),
+    ]:
+        reference_time = best_time(reference, arg, args.repeat)
+        engine_time = best_time(engine, arg, args.repeat)
+        print(f"{name:<24} {1000 * reference_time:>13.1f} {1000 * engine_time:>10.1f} "
+              f"{reference_time / engine_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
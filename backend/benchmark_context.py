@@ -0,0 +1,160 @@
+"""
+Context selection benchmark for the PDF Quest API.
+Compares the retrieval-based context sent to remote LLMs with the old first-3000-characters
+context on a small labelled set: recall is the share of questions whose answer appears in
+the context. Run from the backend directory:
+
+    python benchmark_context.py
+    python benchmark_context.py --budgets 500 1000 2000 --top-k 8
+"""
+import argparse
+import tempfile
+import time
+
+from app.utils.chunking import estimate_tokens
+from app.utils.context_packing import KeywordIndex, select_context
+from app.utils.text_buffer import TextBuffer
+
+# Context the Groq backend used to send: the first 3000 characters of the document
+BASELINE_CHARS = 3000
+
+# A handbook-style document: (section title, section text); each section holds distinct facts
+SECTIONS = [
+    ("Introduction", "This handbook describes the policies of the Northwind Outfitters online store. "
+     "It applies to every order placed through the website or the mobile application. "
+     "Customers are encouraged to read it fully before making a purchase."),
+    ("Ordering", "Orders can be placed at any time of day. An order is confirmed once payment has been "
+     "authorised, and a confirmation email is sent within fifteen minutes. Orders may be edited "
+     "until they are packed, which usually happens within two hours of confirmation."),
+    ("Payment methods", "We accept Visa, Mastercard, American Express and PayPal. Gift cards can be "
+     "combined with one other payment method. Cash on delivery is not offered in any region."),
+    ("Pricing", "Prices include sales tax where required by law. Promotional codes cannot be applied "
+     "retroactively to orders that have already shipped. Price matching is available for identical "
+     "items sold by authorised retailers within seven days of purchase."),
+    ("Shipping", "Standard shipping takes four to six business days and is free on orders over fifty "
+     "dollars. Express shipping takes one to two business days and costs fourteen dollars. "
+     "Orders to remote islands may take up to three additional days."),
+    ("International shipping", "We ship to forty-two countries. Customs duties and import taxes are "
+     "the responsibility of the recipient. International parcels are tracked from the warehouse "
+     "to the destination carrier."),
+    ("Returns", "Unworn items can be returned within thirty days of delivery for a full refund. "
+     "Footwear must be returned in its original box. Return shipping is free for members of "
+     "the loyalty programme and costs six dollars for everyone else."),
+    ("Refunds", "Refunds are issued to the original payment method within five business days of "
+     "the return being inspected. Gift card purchases are refunded as store credit. "
+     "Shipping charges are only refunded when the item arrived damaged or incorrect."),
+    ("Exchanges", "Exchanges for a different size are processed as a new order once the original "
+     "item has been received. There is no charge for the replacement shipment."),
+    ("Warranty", "All tents and sleeping bags carry a two-year warranty against manufacturing "
+     "defects. Backpacks carry a lifetime warranty on zips and seams. The warranty does not "
+     "cover normal wear, misuse or damage caused by fire."),
+    ("Repairs", "Items outside the warranty can be sent to our repair centre in Portland. "
+     "Repairs are quoted before any work starts and usually take three weeks."),
+    ("Loyalty programme", "Members earn one point per dollar spent. Every five hundred points can be "
+     "redeemed for a twenty-five dollar voucher. Points expire after eighteen months without a purchase."),
+    ("Gift cards", "Gift cards are available from ten to five hundred dollars and never expire. "
+     "Lost gift cards can be replaced if the original receipt is provided."),
+    ("Product care", "Waterproof jackets should be washed at thirty degrees with a technical cleaner. "
+     "Down sleeping bags must be dried on a low heat setting with tennis balls to restore loft."),
+    ("Sizing", "Our size charts follow European measurements. Customers between two sizes are advised "
+     "to choose the larger size for outerwear and the smaller size for base layers."),
+    ("Privacy", "Personal data is stored in data centres located in Ireland. We never sell customer "
+     "data to third parties. Customers can request the deletion of their account at any time."),
+    ("Accessibility", "The website conforms to WCAG 2.1 level AA. Customers who need help placing an "
+     "order can call the accessibility line, which is open from eight in the morning to eight at night."),
+    ("Customer service", "The support team answers emails within one business day. Live chat is "
+     "available on weekdays from nine to six Pacific time. Phone support is reserved for loyalty members."),
+    ("Sustainability", "Since 2021 all packaging is made from recycled cardboard. Customers can return "
+     "worn-out gear for recycling and receive fifty loyalty points per item."),
+    ("Corporate orders", "Businesses ordering more than twenty items receive a ten percent discount. "
+     "Corporate orders can be invoiced with payment due within thirty days."),
+]
+
+# Labelled questions: (question, phrase that must appear in the context to answer it)
+LABELLED_QUESTIONS = [
+    ("How long do I have to return an item?", "within thirty days of delivery"),
+    ("What is the refund period?", "within five business days"),
+    ("How much does express shipping cost?", "costs fourteen dollars"),
+    ("Is cash on delivery accepted?", "Cash on delivery is not offered"),
+    ("What warranty do tents have?", "two-year warranty"),
+    ("Do backpacks have a warranty on zips?", "lifetime warranty on zips"),
+    ("When do loyalty points expire?", "expire after eighteen months"),
+    ("Do gift cards expire?", "never expire"),
+    ("How should I wash a waterproof jacket?", "washed at thirty degrees"),
+    ("Where is personal data stored?", "located in Ireland"),
+    ("What discount do businesses get for corporate orders?", "ten percent discount"),
+    ("When is live chat available?", "weekdays from nine to six"),
+    ("How many countries do you ship to?", "forty-two countries"),
+    ("Who pays customs duties?", "responsibility of the recipient"),
+    ("Can I edit my order after confirmation?", "until they are packed"),
+    ("Where is the repair centre?", "repair centre in Portland"),
+    ("What size should I pick for outerwear if between sizes?", "larger size for outerwear"),
+    ("How much is return shipping for non-members?", "costs six dollars"),
+    ("How are down sleeping bags dried?", "low heat setting with tennis balls"),
+    ("What points do I get for recycling gear?", "fifty loyalty points per item"),
+]
+
+
+def build_document(repeat=3):
+    """Build the benchmark document; sections are repeated with filler to make it long."""
+    filler = ("General information: the company was founded by a group of climbers and remains "
+              "committed to quality outdoor equipment for every season and every budget. ")
+    parts = []
+    for title, text in SECTIONS:
+        parts.append(f"{title}\n{filler * repeat}{text}\n")
+    return "\n".join(parts)
+
+
+def evaluate(select, questions):
+    """
+    Measure the recall, context size and selection time of a context selector.
+
+    Returns:
+        tuple: (recall, mean estimated tokens, mean milliseconds per question)
+    """
+    hits = 0
+    tokens = 0
+    start = time.perf_counter()
+    for question, answer in questions:
+        context = select(question)
+        hits += answer.lower() in context.lower()
+        tokens += estimate_tokens(context)
+    elapsed = time.perf_counter() - start
+    return hits / len(questions), tokens / len(questions), 1000 * elapsed / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval-based context selection")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[500, 1000, 1500],
+                        help="Context token budgets to evaluate")
+    parser.add_argument("--top-k", type=int, default=8, help="Top BM25 chunks considered")
+    parser.add_argument("--repeat", type=int, default=3, help="Filler paragraphs per section")
+    args = parser.parse_args()
+
+    document = build_document(args.repeat)
+    start = time.perf_counter()
+    keyword_index = KeywordIndex.build(document)
+    build_ms = 1000 * (time.perf_counter() - start)
+    print(f"Document: {len(document)} characters, ~{estimate_tokens(document)} tokens, "
+          f"{len(keyword_index.chunks)} chunks (index built in {build_ms:.1f} ms)")
+    print(f"Labelled questions: {len(LABELLED_QUESTIONS)}\n")
+    print(f"{'selector':<28} {'recall':>7} {'tokens':>8} {'ms/question':>12}")
+
+    recall, tokens, ms = evaluate(lambda question: document[:BASELINE_CHARS], LABELLED_QUESTIONS)
+    print(f"{'first 3000 characters':<28} {recall:>7.2f} {tokens:>8.0f} {ms:>12.3f}")
+
+    # Chunks are read from a memory-mapped copy of the text, as from the stored text artifact
+    with tempfile.NamedTemporaryFile(suffix=".txt") as f:
+        f.write(document.encode("utf-8"))
+        f.flush()
+        with TextBuffer(f.name) as text:
+            for budget in args.budgets:
+                recall, tokens, ms = evaluate(
+                    lambda question: select_context(text, keyword_index, question, budget, args.top_k),
+                    LABELLED_QUESTIONS
+                )
+                print(f"{f'BM25 top-{args.top_k}, {budget} tokens':<28} {recall:>7.2f} {tokens:>8.0f} {ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
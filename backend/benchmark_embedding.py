@@ -0,0 +1,91 @@
+"""
+Embedding micro-batching benchmark for the PDF Quest API.
+Simulates concurrent users asking questions, each embedding one question at a time, and
+compares calling the embedding model directly with going through the micro-batcher used
+by the embedding backend (app/utils/micro_batch.py). Run from the backend directory:
+
+    python benchmark_embedding.py
+    python benchmark_embedding.py --users 50 --questions 20 --max-wait-ms 5
+"""
+import argparse
+import threading
+import time
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from app.utils.micro_batch import MicroBatcher
+
+QUESTIONS = [
+    "What is the main topic of the document?",
+    "How does the garbage collector reclaim memory?",
+    "Which constructors must a subclass call?",
+    "When were streams added to the language?",
+    "Why should resources be closed explicitly?",
+]
+
+
+def run_users(embed, users, questions_per_user):
+    """
+    Run concurrent users that each embed questions one at a time.
+
+    Returns:
+        tuple: (questions per second, sorted latencies in seconds)
+    """
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def user(user_id):
+        for i in range(questions_per_user):
+            question = f"{QUESTIONS[(user_id + i) % len(QUESTIONS)]} ({user_id}-{i})"
+            start = time.perf_counter()
+            embed([question])
+            with latencies_lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=user, args=(user_id,)) for user_id in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, sorted(latencies)
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile of sorted values."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding micro-batching under concurrent users")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent users")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per user")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum texts per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="Batching window in milliseconds")
+    args = parser.parse_args()
+
+    model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    model.embed_query("warm up")
+
+    # Check that batching does not change the vectors
+    batcher = MicroBatcher(model.embed_documents, args.max_batch_size, args.max_wait_ms / 1000)
+    direct_vector = model.embed_documents([QUESTIONS[0]])[0]
+    batched_vector = batcher.submit([QUESTIONS[0]])[0]
+    max_difference = max(abs(a - b) for a, b in zip(direct_vector, batched_vector))
+    print(f"Largest difference between direct and batched vectors: {max_difference:.2e}\n")
+
+    print(f"{args.users} users x {args.questions} questions")
+    print(f"{'mode':<10} {'questions/s':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, embed in [("direct", model.embed_documents), ("batched", batcher.submit)]:
+        throughput, latencies = run_users(embed, args.users, args.questions)
+        print(f"{name:<10} {throughput:>12.1f} {1000 * percentile(latencies, 0.5):>8.1f} "
+              f"{1000 * percentile(latencies, 0.99):>8.1f}")
+
+    stats = batcher.stats()
+    print(f"\nBatcher: {stats['batches']} batches, mean batch size {stats['mean_batch_size']:.1f}")
+    batcher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
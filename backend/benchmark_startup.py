@@ -0,0 +1,81 @@
+"""
+Startup benchmark for the PDF Quest API.
+Measures how long importing the application takes and which modules the time goes to,
+using Python's -X importtime. Run from the backend directory:
+
+    python benchmark_startup.py              # import cost of app.main
+    python benchmark_startup.py --backends   # plus the deferred import of each QA backend
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+QA_BACKEND_MODULES = {
+    "groq": "app.services.qa_service_groq",
+    "light": "app.services.qa_service_light",
+    "embedding": "app.services.qa_service",
+}
+
+
+def measure_import(module_name):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: (wall-clock seconds, dict of top-level package -> seconds spent importing its modules)
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Lines look like "import time:   self [us] | cumulative | imported package".
+    # Summing self times per top-level package attributes each module exactly once.
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1_000_000
+    return elapsed, packages
+
+
+def print_report(title, elapsed, packages, top):
+    """Print the slowest top-level packages of one measurement."""
+    print(f"\n{title}: {elapsed:.2f}s wall clock")
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {package:<30} {seconds:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure PDF Quest API import cost per module")
+    parser.add_argument("--backends", action="store_true", help="Also measure each QA backend import")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    args = parser.parse_args()
+
+    elapsed, packages = measure_import("app.main")
+    print_report("import app.main", elapsed, packages, args.top)
+
+    if args.backends:
+        for name, module_name in QA_BACKEND_MODULES.items():
+            try:
+                elapsed, packages = measure_import(module_name)
+            except RuntimeError as e:
+                print(f"\nQA backend '{name}': not importable here ({e})")
+                continue
+            print_report(f"QA backend '{name}' ({module_name})", elapsed, packages, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+TF-IDF scoring regression check for the PDF Quest API.
+Compares the light backend's chunk scoring from term counts computed once per document
+(see app/utils/tfidf.py) with the previous behaviour of fitting a fresh vectorizer over the
+chunks plus the question on every request (kept below as the reference). Both rankings are
+fed to the same answer builder, so the check covers the answers users see. Run from the
+backend directory:
+
+    python benchmark_tfidf.py
+    python benchmark_tfidf.py --random-questions 500
+
+Exits with status 1 if any similarity or answer differs.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import benchmark_context
+from app.services.qa_service_light import _answer_from_chunks, build_tfidf_model, chunk_cleaned_text
+from app.utils.chunking import chunk_texts
+from app.utils.sentence_index import SentenceIndex
+from app.utils.text_buffer import TextBuffer
+from app.utils.text_cleaning import clean_pages
+from tests import test_text_cleaning
+
+
+def reference_similarities(chunks, question):
+    """The previous per-request TF-IDF fit of qa_service_light, unchanged."""
+    vectorizer = TfidfVectorizer(
+        stop_words='english',
+        max_features=200,
+        ngram_range=(1, 2),
+        min_df=1,
+        max_df=0.95
+    )
+
+    # Create vectors for chunks and question
+    all_text = chunks + [question]
+    tfidf_matrix = vectorizer.fit_transform(all_text)
+
+    # Calculate similarity between question and each chunk
+    question_vector = tfidf_matrix[-1]
+    chunk_vectors = tfidf_matrix[:-1]
+    return cosine_similarity(question_vector, chunk_vectors)[0]
+
+
+class ReferenceScores:
+    """Scores chunks with the reference fit, in place of the stored term counts."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def similarities(self, question):
+        return reference_similarities(self.chunks, question)
+
+
+def build_corpus(random_questions, seed=0):
+    """
+    Build the documents and questions to compare.
+
+    Returns:
+        list: (name, raw document text, list of questions)
+    """
+    rng = random.Random(seed)
+    handbook = benchmark_context.build_document(3)
+    manual = test_text_cleaning.build_document(60)
+    short = "The interpreter reads each line of the program and executes it before reading the next one."
+
+    corpus = [
+        ("handbook", handbook, [question for question, _ in benchmark_context.LABELLED_QUESTIONS]),
+        ("manual", manual, [line for line in test_text_cleaning.SAMPLE_LINES if line.strip()]),
+        ("single chunk", short * 3, ["How does the interpreter execute a program?", "What is read first?"]),
+    ]
+
+    # Random questions made of words of the document, the case where the question's own
+    # terms could have changed the vocabulary of the per-request fit
+    for name, text, questions in corpus[:2]:
+        words = [word for word in text.split() if word.isalpha()]
+        questions.extend(
+            "What " + " ".join(rng.choice(words) for _ in range(rng.randint(1, 6))) + "?"
+            for _ in range(random_questions)
+        )
+    return corpus
+
+
+def top_chunks(similarities):
+    """The two chunks the answer is built from, best first."""
+    return [int(i) for i in similarities.argsort()[-2:][::-1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check TF-IDF scoring from stored counts against per-request fitting")
+    parser.add_argument("--random-questions", type=int, default=200, help="Random questions per document")
+    args = parser.parse_args()
+
+    differences = 0
+    for name, raw_text, questions in build_corpus(args.random_questions):
+        cleaned_text, _ = clean_pages(raw_text)
+        with tempfile.NamedTemporaryFile(suffix=".txt") as f:
+            f.write(cleaned_text.encode("utf-8"))
+            f.flush()
+            with TextBuffer(f.name) as text:
+                chunks = chunk_cleaned_text(cleaned_text)
+                chunk_list = list(chunk_texts(text, chunks))
+                sentence_index = SentenceIndex.build(text, chunks)
+
+                start = time.perf_counter()
+                term_counts = build_tfidf_model(chunk_list)
+                count_ms = 1000 * (time.perf_counter() - start)
+
+                same_top, reference_ms, counts_ms = 0, 0.0, 0.0
+                for question in questions:
+                    start = time.perf_counter()
+                    reference = reference_similarities(chunk_list, question)
+                    reference_ms += 1000 * (time.perf_counter() - start)
+                    start = time.perf_counter()
+                    scores = term_counts.similarities(question)
+                    counts_ms += 1000 * (time.perf_counter() - start)
+
+                    same_top += top_chunks(reference) == top_chunks(scores)
+                    if not np.array_equal(reference, scores):
+                        differences += 1
+                        print(f"[{name}] similarities differ for {question!r}")
+                    expected = _answer_from_chunks(text, chunks, sentence_index, question, ReferenceScores(chunk_list))
+                    answer = _answer_from_chunks(text, chunks, sentence_index, question, term_counts)
+                    if answer != expected:
+                        differences += 1
+                        print(f"[{name}] answer differs for {question!r}:\n  expected {expected!r}\n  got      {answer!r}")
+
+        print(f"{name}: {len(chunks)} chunks, {len(questions)} questions, same top-2 chunks for "
+              f"{same_top}/{len(questions)}; counted once in {count_ms:.1f} ms, per question "
+              f"{reference_ms / len(questions):.2f} ms (per-request fit) vs {counts_ms / len(questions):.2f} ms")
+
+    print(f"\nSimilarities and answers: {differences} differences")
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Shared test setup for the PDF Quest API.
+The database, uploads and artifacts go to a temporary directory, so the tests never touch
+the development data. Run from the backend directory:
+
+    python -m pytest tests
+"""
+import os
+import tempfile
+
+# Must be set before the app modules read their configuration
+_test_dir = tempfile.mkdtemp(prefix="pdfquest-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_dir, 'test.db')}"
+os.environ["ARTIFACT_DIR"] = os.path.join(_test_dir, "artifacts")
+os.environ["CPU_WORKERS"] = "0"
+
+import pytest
+
+from app.database import SessionLocal, create_tables
+
+
+@pytest.fixture
+def db():
+    """A database session on the test database."""
+    create_tables()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,163 @@
+"""
+Tests for the text cleaning engine in app/utils/text_cleaning.py.
+The engine must give exactly the same results as the previous per-line regex
+implementation of qa_service_light, kept below as the reference.
+"""
+import random
+import re
+
+from app.utils import text_cleaning
+
+
+def reference_clean_text(text):
+    """The previous clean_text of qa_service_light, unchanged."""
+    lines = text.split('\n')
+    cleaned_lines = []
+    for line in lines:
+        line = line.strip()
+        if re.match(r'^\s*Java\s*-\s*', line, re.IGNORECASE):
+            continue
+        if re.match(r'^\s*\w+\s*-\s*\w+', line) and len(line) < 50:
+            continue
+        if line.endswith(':') and len(line) < 60:
+            continue
+        if any(word in line.lower() for word in ['explore the', 'chapter', 'tutorial', 'furthermore']):
+            continue
+        cleaned_lines.append(line)
+
+    text = ' '.join(cleaned_lines)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'^\s*[•\-\*]\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\b\d+\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n\s*\n', '\n', text)
+    return text.strip()
+
+
+def reference_is_meaningful_sentence(sentence):
+    """The previous is_meaningful_sentence of qa_service_light, unchanged."""
+    sentence = sentence.strip()
+    if len(sentence) < 40:
+        return False
+    if sentence.endswith(':') or sentence.endswith('...'):
+        return False
+    if 'java -' in sentence.lower() or ' - ' in sentence:
+        return False
+    toc_words = ['explore', 'chapter', 'tutorial', 'following', 'furthermore']
+    if any(word in sentence.lower() for word in toc_words):
+        return False
+    verbs = ['is', 'are', 'was', 'were', 'has', 'have', 'had', 'can', 'will', 'would', 'should', 'must', 'does', 'do', 'did']
+    has_verb = any(f' {verb} ' in f' {sentence.lower()} ' for verb in verbs)
+    if not has_verb:
+        return False
+    common_words = ['the', 'a', 'an', 'to', 'for', 'of', 'in', 'on', 'at', 'by', 'with']
+    return any(f' {word} ' in f' {sentence.lower()} ' for word in common_words)
+
+
+def reference_meaningful_sentences(text):
+    """The previous sentence filtering of qa_service_light, unchanged."""
+    return [s.strip() for s in re.split(r'[.!?]+', text) if reference_is_meaningful_sentence(s)]
+
+
+# Lines typical of extracted PDF pages: content, headings, table-of-contents entries, page numbers
+SAMPLE_LINES = [
+    "The garbage collector reclaims memory that is no longer referenced by the program.",
+    "A class can have several constructors, and each one must call a constructor of the parent class.",
+    "Java - Overview",
+    "JAVA  -  Basic Syntax",
+    "Variables - Types",
+    "Chapter 4: Exceptions",
+    "In this tutorial you will learn how the interpreter works.",
+    "Explore the following sections for more details.",
+    "Furthermore, the compiler performs several optimizations.",
+    "Contents:",
+    "• Threads are scheduled by the operating system and share the same heap.",
+    "- An interface is a contract that the implementing class has to fulfil.",
+    "* The stack holds the frames of the methods that are being executed.",
+    "   ",
+    "",
+    "42",
+    "Streams were added in version 8 to process collections with a fluent API.",
+    "It is important to close every resource that was opened by the application.",
+    "\tTabs\tand  multiple   spaces are normalized here as well.",
+    "Ünïcödé text is handled the same way as ASCII text in the index.",
+]
+
+# Inputs at the boundaries of the rules: line and sentence lengths, Unicode whitespace,
+# characters whose case mapping changes their length, non-ASCII digits
+EDGE_CASES = [
+    "",
+    "\n",
+    "\n\n\n",
+    " \t \r\n \x0b\x0c ",
+    "Java -",
+    "java-",
+    " JAVA\t-\tsyntax",
+    "word - word",
+    "word-word" + "x" * 40,  # 49 characters: dropped as a heading
+    "word-word" + "x" * 41,  # 50 characters: kept
+    "Title" + "y" * 53 + ":",  # 59 characters: dropped
+    "Title" + "y" * 54 + ":",  # 60 characters: kept
+    "A line ending in a page number 12",
+    "A line ending in a page number 12   \nand another 7",
+    "Arabic-indic digit ٣",
+    "Non-breaking\xa0space and file\x1cseparator in the text",
+    "İstanbul is a city on the Bosphorus with a long history of trade.",
+    "KELVIN sign K is the same as the letter in the alphabet for all of us.",
+    "• - * bullets at the start",
+    "It is a sentence of the minimum length o!",  # 40 characters before the "!": kept
+    "It is a sentence of the minimum lengths!",  # 39 characters: dropped
+    "It is a sentence that is a bit short...",
+    "This is the end of the line:",
+    "The explorer is in the middle of the map, far from home.",
+    "The value - which is the default - is used for the file.",
+    ". . . ! ? .!?",
+]
+
+# Characters for the randomized comparison (whitespace, punctuation, Unicode edge cases)
+FUZZ_ALPHABET = list("abcdejvaJVA_ -:.!?•*\t\n\r\x1c\xa0İK0123456789٣") + [
+    " is ", " the ", " a ", "Java -", "explore the", "chapter", "tutorial", "furthermore", "following", "...",
+]
+
+# Random texts compared against the reference
+FUZZ_CASES = 5000
+
+
+def build_document(pages, seed=0):
+    """Build a synthetic document of roughly 40 lines per page."""
+    rng = random.Random(seed)
+    lines = []
+    for page in range(1, pages + 1):
+        lines.extend(rng.choice(SAMPLE_LINES) for _ in range(40))
+        lines.append(str(page))
+    return "\n".join(lines)
+
+
+def assert_matches_reference(text):
+    assert text_cleaning.clean_text(text) == reference_clean_text(text), text
+    assert text_cleaning.meaningful_sentences(text) == reference_meaningful_sentences(text), text
+    for sentence in text.split("."):
+        assert text_cleaning.is_meaningful_sentence(sentence) == reference_is_meaningful_sentence(sentence), sentence
+
+
+def test_sample_lines_match_reference():
+    for line in SAMPLE_LINES:
+        assert_matches_reference(line)
+
+
+def test_edge_cases_match_reference():
+    for text in EDGE_CASES:
+        assert_matches_reference(text)
+    assert_matches_reference("\n".join(EDGE_CASES))
+
+
+def test_document_matches_reference():
+    document = build_document(20)
+    assert_matches_reference(document)
+    # Sentences are filtered on cleaned text in the QA backends
+    assert_matches_reference(text_cleaning.clean_text(document))
+
+
+def test_random_texts_match_reference():
+    rng = random.Random(0)
+    for _ in range(FUZZ_CASES):
+        assert_matches_reference("".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 120))))
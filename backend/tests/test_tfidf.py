@@ -0,0 +1,126 @@
+"""
+Tests for the light backend's TF-IDF chunk scoring.
+Chunks are scored from term counts computed once per document (app/utils/tfidf.py); the
+scores and answers must be exactly those of fitting a vectorizer over the chunks plus the
+question on every request, as the backend used to do.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.database import Document, DocumentText
+from app.services.qa_service_light import _answer_from_chunks, get_cleaned_chunks, simple_answer_question
+from app.utils.artifact_store import write_text_artifact
+from app.utils.chunking import chunk_texts
+
+SECTIONS = [
+    ("Returns", "Items can be returned within thirty days of delivery. Refunds are issued within five "
+                "business days once the returned item has been inspected by the warehouse team."),
+    ("Shipping", "Standard shipping is free on orders over fifty dollars. Express shipping costs fourteen "
+                 "dollars and delivers within two business days to most addresses."),
+    ("Warranty", "Tents come with a two-year warranty against manufacturing defects. Backpacks carry a "
+                 "lifetime warranty on zips and buckles, but not on fabric wear."),
+    ("Loyalty", "Loyalty points expire after eighteen months without a purchase. Gift cards never expire "
+                "and can be combined with loyalty points at checkout."),
+    ("Care", "A waterproof jacket should be washed at thirty degrees with a technical detergent and "
+             "reproofed every few washes to keep its water repellency."),
+]
+
+FILLER = ("General information: the company was founded by a group of climbers and remains committed "
+          "to quality outdoor equipment for every season and every budget. ")
+
+# Several chunks, with terms shared by every chunk (removed by max_df)
+HANDBOOK = "\n".join(f"{title}\n{FILLER * 6}{text}\n" for title, text in SECTIONS)
+
+# A single chunk: with the question, the vectorizer sees only two documents
+SHORT = "The interpreter reads each line of the program and executes it before reading the next one. " * 3
+
+QUESTIONS = [
+    "How long do I have to return an item?",
+    "How much does express shipping cost?",
+    "Do backpacks have a warranty on zips?",
+    "When do loyalty points expire?",
+    "How should I wash a waterproof jacket?",
+    "How does the interpreter execute a program?",
+    "What is read first?",
+    # Terms that appear in no chunk
+    "Are xylophones compatible with quantum zebras?",
+    "",
+]
+
+
+def reference_similarities(chunks, question):
+    """Score chunks the way the backend used to: a fresh vectorizer fit per question."""
+    vectorizer = TfidfVectorizer(
+        stop_words='english',
+        max_features=200,
+        ngram_range=(1, 2),
+        min_df=1,
+        max_df=0.95
+    )
+    tfidf_matrix = vectorizer.fit_transform(chunks + [question])
+    return cosine_similarity(tfidf_matrix[-1], tfidf_matrix[:-1])[0]
+
+
+class ReferenceScores:
+    """Scores chunks with the reference fit, in place of the stored term counts."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def similarities(self, question):
+        return reference_similarities(self.chunks, question)
+
+
+def create_document(db, text, directory):
+    """Store a document whose extracted text is `text` (no PDF parsing involved)."""
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    file_path = os.path.join(directory, f"{content_hash}.pdf")
+    with open(file_path, "wb") as f:
+        f.write(text.encode("utf-8"))
+    write_text_artifact(content_hash, text)
+
+    document = Document(filename="test.pdf", file_path=file_path)
+    db.add(document)
+    db.flush()
+    stat = os.stat(file_path)
+    db.add(DocumentText(
+        document_id=document.id, content_hash=content_hash,
+        file_size=stat.st_size, file_mtime=stat.st_mtime, char_count=len(text)
+    ))
+    db.commit()
+    return document
+
+
+@pytest.fixture(params=[HANDBOOK, SHORT], ids=["handbook", "single chunk"])
+def document(request, db, tmp_path):
+    return create_document(db, request.param, tmp_path)
+
+
+def test_chunk_counts(db, tmp_path):
+    for text, single in [(HANDBOOK, False), (SHORT, True)]:
+        with get_cleaned_chunks(create_document(db, text, tmp_path), db) as (_, chunks, term_counts, _):
+            assert term_counts is not None
+            assert (len(chunks) == 1) == single
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_similarities_match_per_question_fit(document, db, question):
+    with get_cleaned_chunks(document, db) as (text, chunks, term_counts, _):
+        chunk_list = list(chunk_texts(text, chunks))
+        expected = reference_similarities(chunk_list, question)
+        assert np.array_equal(term_counts.similarities(question), expected)
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_answers_match_per_question_fit(document, db, question):
+    with get_cleaned_chunks(document, db) as (text, chunks, _, sentence_index):
+        chunk_list = list(chunk_texts(text, chunks))
+        expected = _answer_from_chunks(text, chunks, sentence_index, question, ReferenceScores(chunk_list))
+
+    result = simple_answer_question(document.id, question, db)
+    assert result["answer"] == expected